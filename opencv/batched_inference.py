@@ -0,0 +1,142 @@
+# Batched DNN Face Inference
+# A cv2.dnn forward pass over a single 300x300 image leaves most of the CPU's vector
+# throughput unused. FaceBatcher collects images from any number of callers (one
+# thread per camera, or the tiles of one frame) and runs them through the network
+# as one blobFromImages batch with a single forward pass, then hands each caller
+# the faces of its own image.
+# A background thread forms the batches. It takes the first waiting image and then
+# waits up to max_wait_ms for more, up to max_batch images, so batching adds at most
+# max_wait_ms to a frame's latency. Images already queued are always taken at once.
+# With a grid, detectMultiScale() splits the frame into overlapping tiles (the same
+# layout as tiled_detection.py) and sends the tiles plus the whole frame as one batch.
+# Each tile keeps the faces centred in its own cell that fit inside its overlap; the
+# whole frame adds the large faces; the boxes are merged with non-maximum suppression.
+# The batch forward time is recorded in the profiler as the 'batch' stage.
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from boxes import non_max_suppression
+from face_detectors import within_size
+from instrumentation import profiler
+from tiled_detection import grid_tiles, in_cell
+
+
+class FaceBatcher:
+    # detector: a backend with detect_batch(images) -> [(boxes, scores)] (DnnFaceDetector)
+    # grid: (columns, rows) of tiles per frame in detectMultiScale(), or None for whole frames
+    def __init__(self, detector, max_batch=8, max_wait_ms=5.0, grid=None, overlap=None, nms_threshold=0.3):
+        self.detector = detector
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.grid = tuple(grid) if grid else None
+        self.overlap = overlap
+        self.nms_threshold = nms_threshold
+
+        self.batches = 0
+        self.images = 0
+
+        self.requests = queue.Queue()
+        self.worker = threading.Thread(target=self._run, name='face-batcher', daemon=True)
+        self.worker.start()
+
+    # Queue one image; the future resolves to its (boxes, scores)
+    def submit(self, image):
+        future = Future()
+        self.requests.put((image, future))
+        return future
+
+    # Faces in one image, as an (N, 4) int32 array (blocks until its batch has run)
+    def detect(self, image):
+        return self.submit(image).result()[0]
+
+    # (boxes, scores) for several images, queued together so they share batches
+    def detect_many(self, images):
+        futures = [self.submit(image) for image in images]
+        return [future.result() for future in futures]
+
+    # Same arguments as CascadeClassifier.detectMultiScale, so the labs can use it as their cascade
+    def detectMultiScale(self, image, scaleFactor=1.1, minNeighbors=3, flags=0, minSize=(0, 0), maxSize=(0, 0)):
+        boxes = self.detect(image) if self.grid is None else self.detect_tiled(image)
+        return within_size(boxes, minSize, maxSize)
+
+    # Faces of one frame from a single batch of its overlapping tiles and the whole frame
+    def detect_tiled(self, image):
+        tiles, margin = grid_tiles(image.shape, self.grid, self.overlap)
+        results = self.detect_many([image[y0:y1, x0:x1] for x0, y0, x1, y1, *_ in tiles] + [image])
+
+        found = [results[-1][0]]
+        scores = [results[-1][1]]
+        for tile, (boxes, tile_scores) in zip(tiles, results):
+            boxes = boxes + (tile[0], tile[1], 0, 0)
+            keep = in_cell(boxes, tile) & (boxes[:, 2] <= 2 * margin) & (boxes[:, 3] <= 2 * margin)
+            found.append(boxes[keep])
+            scores.append(tile_scores[keep])
+        boxes = np.concatenate(found)
+        return boxes[non_max_suppression(boxes, np.concatenate(scores), self.nms_threshold)]
+
+    # Average number of images per forward pass so far
+    def mean_batch_size(self):
+        return self.images / self.batches if self.batches else 0.0
+
+    # Stop the batching thread after the queued images are done
+    def close(self):
+        self.requests.put(None)
+        self.worker.join()
+
+    def _run(self):
+        while True:
+            request = self.requests.get()
+            if request is None:
+                return
+            batch = [request]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                try:
+                    request = self.requests.get(timeout=timeout) if timeout > 0 else self.requests.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    self._process(batch)
+                    return
+                batch.append(request)
+            self._process(batch)
+
+    def _process(self, batch):
+        t0 = time.perf_counter()
+        try:
+            results = self.detector.detect_batch([image for image, _ in batch])
+        except Exception as error:
+            for _, future in batch:
+                future.set_exception(error)
+            return
+        profiler.record('batch', (time.perf_counter() - t0) * 1000.0)
+        self.batches += 1
+        self.images += len(batch)
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+# Add the DNN batching options to a face lab's command line parser
+def add_batching_args(parser):
+    parser.add_argument('--batch-tiles', type=int, nargs=2, metavar=('COLUMNS', 'ROWS'),
+                        help='With --detector dnn, run the tiles of each frame and the whole frame as one batch')
+    parser.add_argument('--max-batch', type=int, default=8, help='Most images per DNN forward pass')
+    parser.add_argument('--max-wait-ms', type=float, default=5.0,
+                        help='Longest wait for more images before a partial batch runs')
+    return parser
+
+
+# A FaceBatcher around the backend if --batch-tiles was given, otherwise None
+def batcher_from_args(backend, args):
+    if not args.batch_tiles:
+        return None
+    if not hasattr(backend, 'detect_batch'):
+        print("Error: --batch-tiles needs the dnn detector backend")
+        raise SystemExit(1)
+    return FaceBatcher(backend, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms, grid=args.batch_tiles)
@@ -0,0 +1,76 @@
+# Benchmark: DNN Face Inference Throughput vs Batch Size
+# Simulates several cameras, each on its own thread, sending synthetic frames to one
+# FaceBatcher around a cv2.dnn face model. For every maximum batch size it reports:
+# - total throughput (frames per second over all cameras)
+# - per-frame latency, median and p95 (submit to result, including the batching wait)
+# - the average batch size the batcher actually formed
+# Batch size 1 is the one-frame-per-forward-pass baseline. A model file is required;
+# no DNN face model ships with OpenCV (see face_detectors.py).
+# Usage:
+#   python bench_batched_inference.py --dnn-model res10_300x300_ssd_iter_140000.caffemodel \
+#       --dnn-config deploy.prototxt --cameras 4 --batch-sizes 1 2 4 8
+
+import argparse
+import threading
+import time
+
+from batched_inference import FaceBatcher
+from bench_labs import RESOLUTIONS, synthetic_face_scene
+from face_detectors import DnnFaceDetector
+from headless import latency_summary
+
+
+# Every camera sends its frames one after another; returns (elapsed s, per-frame latencies ms)
+def run_cameras(batcher, cameras):
+    latencies = [[] for _ in cameras]
+
+    def camera(index, frames):
+        for frame in frames:
+            t0 = time.perf_counter()
+            batcher.detect(frame)
+            latencies[index].append((time.perf_counter() - t0) * 1000.0)
+
+    threads = [threading.Thread(target=camera, args=(index, frames)) for index, frames in enumerate(cameras)]
+    t0 = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - t0, [value for values in latencies for value in values]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched DNN face inference throughput benchmark")
+    parser.add_argument('--dnn-model', required=True, help='cv2.dnn face model (.onnx or .caffemodel)')
+    parser.add_argument('--dnn-config', help='Network config for --dnn-model (e.g. a Caffe .prototxt)')
+    parser.add_argument('--cameras', type=int, default=4, help='Simulated cameras (threads)')
+    parser.add_argument('--frames', type=int, default=30, help='Frames per camera')
+    parser.add_argument('--resolution', default='720p', choices=list(RESOLUTIONS))
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    args = parser.parse_args()
+
+    try:
+        detector = DnnFaceDetector(args.dnn_model, args.dnn_config)
+    except IOError as error:
+        print(f"Error: {error}")
+        raise SystemExit(1)
+
+    width, height = RESOLUTIONS[args.resolution]
+    cameras = [[synthetic_face_scene(width, height, t, 1 + index % 4, seed=index) for t in range(args.frames)]
+               for index in range(args.cameras)]
+    detector.detect(cameras[0][0])
+
+    print(f"{args.cameras} cameras x {args.frames} frames of {width}x{height}, max wait {args.max_wait_ms} ms")
+    print(f"{'max batch':>9} {'frames/s':>9} {'median ms':>9} {'p95 ms':>8} {'mean batch':>10}")
+    for max_batch in args.batch_sizes:
+        batcher = FaceBatcher(detector, max_batch=max_batch, max_wait_ms=args.max_wait_ms)
+        elapsed, latencies = run_cameras(batcher, cameras)
+        batcher.close()
+        stats = latency_summary(latencies)
+        print(f"{max_batch:>9} {len(latencies) / elapsed:>9.1f} {stats['median_ms']:>9.2f} "
+              f"{stats['p95_ms']:>8.2f} {batcher.mean_batch_size():>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
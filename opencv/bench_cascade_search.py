@@ -0,0 +1,99 @@
+# Benchmark: Cascade Search Speed vs Recall
+# Runs the lab8/lab10 face cascade over a clip with several CascadeSearch settings:
+# downscaling, ROI-restricted search with periodic full sweeps, and adaptive face size
+# limits. For each setting it reports the cascade time per frame and the recall and
+# precision against a plain full-resolution detectMultiScale on the same frames.
+# Without --source a synthetic clip with moving cartoon faces is used.
+# Usage:
+#   python bench_cascade_search.py --source classroom.mp4 --max-frames 100
+#   python bench_cascade_search.py --resolution 4K --faces 20
+
+import argparse
+import time
+
+import cv2
+
+from bench_labs import RESOLUTIONS, synthetic_face_scene
+from boxes import count_matches
+from cascade_search import CascadeSearch
+from detector_registry import detectors
+from frame_grabber import open_source
+
+# Settings compared with the full-resolution baseline: name -> CascadeSearch options
+SETTINGS = {
+    'full frame': {},
+    'downscale 0.75': {'downscale': 0.75},
+    'downscale 0.5': {'downscale': 0.5},
+    'downscale 0.33': {'downscale': 0.33},
+    'roi': {'roi': True},
+    'adaptive size': {'adaptive_size': True},
+    'roi + adaptive': {'roi': True, 'adaptive_size': True},
+    'downscale 0.5 + roi': {'downscale': 0.5, 'roi': True},
+    'downscale 0.5 + roi + adaptive': {'downscale': 0.5, 'roi': True, 'adaptive_size': True},
+}
+
+
+# Grayscale frames of the clip (or of the synthetic face scene)
+def load_frames(args):
+    if args.source is None:
+        width, height = RESOLUTIONS[args.resolution]
+        return [cv2.cvtColor(synthetic_face_scene(width, height, t, args.faces), cv2.COLOR_BGR2GRAY)
+                for t in range(args.max_frames)]
+
+    cap = open_source(args.source)
+    frames = []
+    while len(frames) < args.max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame)
+    cap.release()
+    return frames
+
+
+# Run search over the frames; returns (ms per frame, per-frame boxes)
+def run_search(search, frames):
+    results = []
+    t0 = time.perf_counter()
+    for gray in frames:
+        results.append(search(gray))
+    return (time.perf_counter() - t0) * 1000.0 / len(frames), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cascade search speed vs recall benchmark")
+    parser.add_argument('--source', help='Video file or image directory (default: synthetic face clip)')
+    parser.add_argument('--resolution', default='1080p', choices=list(RESOLUTIONS), help='Synthetic clip resolution')
+    parser.add_argument('--faces', type=int, default=6, help='Faces in the synthetic clip')
+    parser.add_argument('--max-frames', type=int, default=30, help='Frames to process')
+    parser.add_argument('--settings', nargs='+', default=list(SETTINGS), choices=list(SETTINGS))
+    args = parser.parse_args()
+
+    frames = load_frames(args)
+    if not frames:
+        print(f"Error: Could not read frames from {args.source}")
+        raise SystemExit(1)
+    cascade = detectors.get('face')
+
+    def new_search(**options):
+        return CascadeSearch(cascade, scale_factor=1.1, min_neighbors=5, min_size=(30, 30), **options)
+
+    baseline_ms, reference = run_search(new_search(), frames)
+    reference_count = sum(len(boxes) for boxes in reference)
+    print(f"{len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}, "
+          f"{reference_count} faces found by the full-frame baseline")
+
+    print(f"{'setting':<32} {'ms/frame':>9} {'speedup':>8} {'recall':>7} {'precision':>9} {'sweeps':>7}")
+    for name in args.settings:
+        search = new_search(**SETTINGS[name])
+        ms, results = run_search(search, frames)
+        matched = sum(count_matches(ref, found) for ref, found in zip(reference, results))
+        detected = sum(len(found) for found in results)
+        recall = matched / reference_count if reference_count else 1.0
+        precision = matched / detected if detected else 1.0
+        print(f"{name:<32} {ms:>9.1f} {baseline_ms / ms:>7.2f}x {recall:>7.3f} {precision:>9.3f} "
+              f"{search.full_sweeps:>7}")
+
+
+if __name__ == "__main__":
+    main()
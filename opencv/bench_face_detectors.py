@@ -0,0 +1,147 @@
+# Benchmark: Face Detector Backends (Haar vs LBP vs cv2.dnn)
+# Runs every available face detector backend (face_detectors.py) over a labelled image
+# set and reports, per backend:
+# - latency per image (median and p95)
+# - throughput (images per second)
+# - recall and precision against the labelled face boxes (IoU >= --iou)
+# It then names the cheapest backend whose recall meets --min-recall, which is the one
+# to deploy at a site with that accuracy requirement.
+# A labelled set is a directory of images with a labels.csv file: one "image,x,y,w,h"
+# row per face, and a row with only the image name for an image without faces.
+# Without --images a synthetic labelled set is generated; --write-synthetic DIR saves
+# it to disk as a starting point. Backends whose model file is not given or cannot be
+# loaded are reported as skipped.
+# Usage:
+#   python bench_face_detectors.py --images site_faces/ --lbp-model lbpcascade_frontalface_improved.xml \
+#       --dnn-model res10_300x300_ssd_iter_140000.caffemodel --dnn-config deploy.prototxt
+#   python bench_face_detectors.py --write-synthetic synthetic_faces/
+
+import argparse
+import collections
+import csv
+import os
+import time
+
+import cv2
+
+from bench_labs import RESOLUTIONS, synthetic_face_scene
+from boxes import count_matches
+from face_detectors import create_face_detector
+from headless import latency_summary
+
+
+# [(name, image, (N, 4) boxes)] from a directory with a labels.csv file
+def load_labelled_images(directory):
+    labels = collections.OrderedDict()
+    with open(os.path.join(directory, 'labels.csv'), newline='') as file:
+        for row in csv.reader(file):
+            if not row or row[0] == 'image':
+                continue
+            boxes = labels.setdefault(row[0], [])
+            if len(row) >= 5 and row[1]:
+                boxes.append(tuple(int(value) for value in row[1:5]))
+
+    images = []
+    for name, boxes in labels.items():
+        image = cv2.imread(os.path.join(directory, name))
+        if image is None:
+            print(f"Warning: could not read {name}, skipped")
+            continue
+        images.append((name, image, boxes))
+    return images
+
+
+# Synthetic labelled images with a varying number of faces
+def synthetic_labelled_images(count, resolution):
+    width, height = RESOLUTIONS[resolution]
+    images = []
+    for index in range(count):
+        boxes = []
+        image = synthetic_face_scene(width, height, t=index, count=1 + index % 8, seed=index, boxes=boxes)
+        images.append((f'synthetic_{index:03d}.png', image, boxes))
+    return images
+
+
+def write_labelled_images(directory, images):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, 'labels.csv'), 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['image', 'x', 'y', 'w', 'h'])
+        for name, image, boxes in images:
+            cv2.imwrite(os.path.join(directory, name), image)
+            for box in boxes or [()]:
+                writer.writerow([name, *box])
+
+
+# Per-image latencies (ms) and per-image detected boxes
+def run_backend(detector, images):
+    detector.detect(images[0][1])
+    latencies = []
+    results = []
+    for _, image, _ in images:
+        t0 = time.perf_counter()
+        results.append(detector.detect(image))
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+    return latencies, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Face detector backend benchmark")
+    parser.add_argument('--images', help='Labelled image directory with labels.csv (default: synthetic set)')
+    parser.add_argument('--synthetic-count', type=int, default=40, help='Images in the synthetic set')
+    parser.add_argument('--resolution', default='720p', choices=list(RESOLUTIONS), help='Synthetic image resolution')
+    parser.add_argument('--write-synthetic', metavar='DIR', help='Write the synthetic labelled set to DIR and exit')
+    parser.add_argument('--haar-model', help='Haar cascade XML (default: OpenCV frontal face)')
+    parser.add_argument('--lbp-model', help='LBP cascade XML, e.g. lbpcascade_frontalface_improved.xml')
+    parser.add_argument('--dnn-model', help='cv2.dnn face model (.onnx or .caffemodel)')
+    parser.add_argument('--dnn-config', help='Network config for --dnn-model (e.g. a Caffe .prototxt)')
+    parser.add_argument('--dnn-confidence', type=float, default=0.5)
+    parser.add_argument('--iou', type=float, default=0.5, help='IoU needed to match a labelled face')
+    parser.add_argument('--min-recall', type=float, default=0.9, help='Recall the recommended backend must meet')
+    args = parser.parse_args()
+
+    if args.images:
+        images = load_labelled_images(args.images)
+    else:
+        images = synthetic_labelled_images(args.synthetic_count, args.resolution)
+    if args.write_synthetic:
+        write_labelled_images(args.write_synthetic, images)
+        print(f"Wrote {len(images)} labelled images to {args.write_synthetic}")
+        return
+    if not images:
+        print(f"Error: no labelled images in {args.images}")
+        raise SystemExit(1)
+
+    labelled = sum(len(boxes) for _, _, boxes in images)
+    print(f"{len(images)} images, {labelled} labelled faces")
+    print(f"{'backend':<8} {'median ms':>9} {'p95 ms':>8} {'img/s':>7} {'recall':>7} {'precision':>9}")
+
+    backends = [('haar', args.haar_model, None, {}), ('lbp', args.lbp_model, None, {}),
+                ('dnn', args.dnn_model, args.dnn_config, {'confidence': args.dnn_confidence})]
+    qualifying = []
+    for backend, model, config, options in backends:
+        try:
+            detector = create_face_detector(backend, model, config, **options)
+        except IOError as error:
+            print(f"{backend:<8} skipped: {error}")
+            continue
+
+        latencies, results = run_backend(detector, images)
+        stats = latency_summary(latencies)
+        matched = sum(count_matches(boxes, found, args.iou) for (_, _, boxes), found in zip(images, results))
+        detected = sum(len(found) for found in results)
+        recall = matched / labelled if labelled else 1.0
+        precision = matched / detected if detected else 1.0
+        print(f"{backend:<8} {stats['median_ms']:>9.2f} {stats['p95_ms']:>8.2f} {stats['fps']:>7.1f} "
+              f"{recall:>7.3f} {precision:>9.3f}")
+        if recall >= args.min_recall:
+            qualifying.append((stats['mean_ms'], backend))
+
+    if qualifying:
+        print(f"Cheapest backend with recall >= {args.min_recall}: {min(qualifying)[1]}")
+    else:
+        print(f"No backend reached recall {args.min_recall}")
+
+
+if __name__ == "__main__":
+    main()
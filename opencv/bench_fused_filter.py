@@ -0,0 +1,139 @@
+# Benchmark: Two-Pass vs Fused Blur + Sharpen
+# Compares gui_1's GaussianBlur -> filter2D(sharpen) chain with the single filter2D pass
+# that uses the cached fused kernel, at 720p, 1080p and 4K. It also checks that both give
+# the same result. They can differ slightly, because the two-pass version rounds the
+# blurred image to 8 bits before sharpening and the image borders are handled per pass.
+# The fused stage lost at every setting, so it is defined here rather than in filters.py.
+# Usage: python bench_fused_filter.py [--strengths 1 3 5 10] [--repeat 20]
+
+import argparse
+import functools
+import time
+
+import cv2
+import numpy as np
+
+from filters import SHARPEN_KERNEL, BlurStage, FilterPipeline, SharpenStage
+from frame_grabber import SyntheticSource
+from headless import latency_summary
+
+RESOLUTIONS = {'720p': (1280, 720), '1080p': (1920, 1080), '4K': (3840, 2160)}
+
+# Largest per-pixel difference accepted away from the borders. Rounding the blurred image
+# to 8 bits costs up to 0.5 per pixel, and the sharpening kernel's absolute weights add up
+# to 9, so the two results can differ by up to 4.5 levels
+MAX_INTERIOR_DIFF = 5
+
+
+# ksize x ksize Gaussian kernel, identical to the one cv2.GaussianBlur uses with sigma 0
+def gaussian_kernel_2d(ksize):
+    kernel = cv2.getGaussianKernel(ksize, 0)
+    return kernel @ kernel.T
+
+
+# Full 2D convolution of two small kernels. Convolution is associative, so filtering
+# with the result is the same as filtering with a and then with b (up to rounding)
+def combine_kernels(a, b):
+    combined = np.zeros((a.shape[0] + b.shape[0] - 1, a.shape[1] + b.shape[1] - 1))
+    for (i, j), weight in np.ndenumerate(b[::-1, ::-1]):
+        if weight:
+            combined[i:i + a.shape[0], j:j + a.shape[1]] += weight * a
+    return combined
+
+
+# Cached single-pass kernel for a (blur kernel size, sharpen on/off) setting
+@functools.lru_cache(maxsize=32)
+def fused_kernel(blur_ksize, sharpen):
+    kernel = gaussian_kernel_2d(blur_ksize) if blur_ksize > 1 else np.ones((1, 1))
+    if sharpen:
+        kernel = combine_kernels(kernel, SHARPEN_KERNEL)
+    kernel = kernel.astype(np.float32)
+    # The cached array is shared by every caller
+    kernel.setflags(write=False)
+    return kernel
+
+
+# Blur followed by sharpening in one filter2D pass with the fused kernel, reading its
+# settings from an existing BlurStage and SharpenStage so it can stand in for both.
+# The fused kernel is not separable, so it costs more arithmetic than the two passes:
+# bench_fused_filter.py measured it slower at every blur strength (720p, blur 1/3/5/10:
+# 0.84x/0.23x/0.12x/0.12x the speed of two passes), so gui_1 uses the two-pass chain
+# and this stage lives here, next to the measurement
+class FusedBlurSharpenStage:
+    def __init__(self, blur_stage, sharpen_stage):
+        self.blur_stage = blur_stage
+        self.sharpen_stage = sharpen_stage
+
+    def enabled(self):
+        return self.blur_stage.enabled() or self.sharpen_stage.enabled()
+
+    def apply(self, src, dst=None):
+        # With only one of the two filters on there is nothing to fuse
+        if not self.sharpen_stage.enabled():
+            return self.blur_stage.apply(src, dst)
+        if not self.blur_stage.enabled():
+            return self.sharpen_stage.apply(src, dst)
+        return cv2.filter2D(src, -1, fused_kernel(self.blur_stage.ksize, True), dst=dst)
+
+
+# Time pipeline.process(frame) and return the latency summary
+def time_pipeline(pipeline, frame, repeat):
+    pipeline.process(frame)  # warm-up: allocates the buffers and builds the fused kernel
+    latencies = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        pipeline.process(frame)
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+    return latency_summary(latencies)
+
+
+# Compare the two outputs; returns (max diff in the interior, max diff overall, mean diff)
+def compare_outputs(two_pass, fused, border):
+    diff = np.abs(two_pass.astype(np.int16) - fused.astype(np.int16))
+    interior = diff[border:-border, border:-border]
+    return int(interior.max()), int(diff.max()), float(diff.mean())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Two-pass vs fused blur + sharpen benchmark")
+    parser.add_argument('--strengths', type=int, nargs='+', default=[1, 3, 5, 10], help='Blur strengths to test')
+    parser.add_argument('--resolutions', nargs='+', default=list(RESOLUTIONS), choices=list(RESOLUTIONS))
+    parser.add_argument('--repeat', type=int, default=20, help='Timed runs per setting')
+    args = parser.parse_args()
+
+    blur_stage = BlurStage()
+    sharpen_stage = SharpenStage(True)
+    two_pass = FilterPipeline([blur_stage, sharpen_stage])
+    fused = FilterPipeline([FusedBlurSharpenStage(blur_stage, sharpen_stage)])
+
+    print(f"{'resolution':>10} {'blur':>4} {'two-pass ms':>12} {'fused ms':>9} {'speedup':>8} "
+          f"{'max diff (interior/all)':>24} {'mean diff':>9}")
+    failures = 0
+    for name in args.resolutions:
+        width, height = RESOLUTIONS[name]
+        _, frame = SyntheticSource(width, height).read()
+
+        for strength in args.strengths:
+            blur_stage.set_strength(strength)
+            two_pass_stats = time_pipeline(two_pass, frame, args.repeat)
+            fused_stats = time_pipeline(fused, frame, args.repeat)
+
+            # Both pipelines own their output buffers, so compare fresh results
+            border = blur_stage.ksize // 2 + 1
+            interior_diff, max_diff, mean_diff = compare_outputs(two_pass.process(frame).copy(),
+                                                                 fused.process(frame), border)
+            if interior_diff > MAX_INTERIOR_DIFF:
+                failures += 1
+
+            speedup = two_pass_stats['median_ms'] / fused_stats['median_ms']
+            print(f"{name:>10} {strength:>4} {two_pass_stats['median_ms']:>12.2f} {fused_stats['median_ms']:>9.2f} "
+                  f"{speedup:>7.2f}x {interior_diff:>12}/{max_diff:<11} {mean_diff:>9.3f}")
+
+    if failures:
+        print(f"Equivalence check FAILED for {failures} setting(s) (interior diff > {MAX_INTERIOR_DIFF})")
+        raise SystemExit(1)
+    print(f"Equivalence check passed (interior diff <= {MAX_INTERIOR_DIFF} for every setting)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# Test Harness and Benchmark for the Identity Tracker
+# Feeds IdentityTracker synthetic box sequences shaped like a classroom:
+# - faces sit on a grid of seats, jitter a few pixels and drift slowly
+# - some faces disappear for a while and come back
+# - a few faces arrive late
+# - detection order is shuffled on every frame
+# - one spurious box (a false detection) shows up for a single frame
+# It checks four things. Every face keeps the same ID for the whole sequence. Exactly
+# the seats that have been empty for longer than the threshold (and not yet forgotten)
+# are flagged absent. The spurious seat is dropped once it has been empty for
+# forget_after seconds, while no real seat is. update() stays fast. Association time is reported as median and p99, and the run
+# fails (exit code 1) if the median is over the budget.
+# Usage: python bench_identity_tracker.py [--faces 50] [--frames 300] [--forget-after 10] [--budget-ms 1.0]
+
+import argparse
+import time
+
+import numpy as np
+
+from headless import latency_summary
+from identity_tracker import IdentityTracker
+
+
+# Ground-truth boxes per frame: a list of (face indices, (N, 4) boxes) in shuffled order
+# Also returns a spurious box, below the last row of seats, for one frame of the caller's choice
+def synthetic_sequence(faces, frames, fps, seed=0):
+    rng = np.random.default_rng(seed)
+    cols = int(np.ceil(np.sqrt(faces * 16 / 9)))
+    seat = np.arange(faces)
+    base = np.stack([(seat % cols) * 120 + 40, (seat // cols) * 140 + 40], axis=1).astype(np.float64)
+    sizes = rng.uniform(60, 90, faces)
+    phases = rng.uniform(0, 2 * np.pi, faces)
+
+    # Absence intervals (in frames) for a third of the faces, and late arrivals for a few
+    present = np.ones((frames, faces), dtype=bool)
+    for face in rng.choice(faces, size=faces // 3, replace=False):
+        start = rng.integers(0, frames - 1)
+        present[start:start + rng.integers(int(fps), int(4 * fps)), face] = False
+    for face in rng.choice(faces, size=max(1, faces // 10), replace=False):
+        present[:rng.integers(1, frames // 2), face] = False
+
+    sequence = []
+    for frame in range(frames):
+        drift = 8 * np.stack([np.sin(frame / 40 + phases), np.cos(frame / 50 + phases)], axis=1)
+        jitter = rng.normal(0, 2, size=(faces, 2))
+        size = sizes * (1 + 0.03 * np.sin(frame / 30 + phases)) + rng.normal(0, 1, faces)
+        boxes = np.column_stack([base + drift + jitter, size, size])
+
+        visible = np.flatnonzero(present[frame])
+        rng.shuffle(visible)
+        sequence.append((visible, np.rint(boxes[visible]).astype(np.int32)))
+
+    spurious = np.array([[40, (faces // cols + 1) * 140 + 100, 70, 70]], dtype=np.int32)
+    return sequence, present, spurious
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Identity tracker test harness and benchmark")
+    parser.add_argument('--faces', type=int, default=50, help='Faces (seats) in the synthetic classroom')
+    parser.add_argument('--frames', type=int, default=300, help='Frames in the sequence')
+    parser.add_argument('--fps', type=float, default=15.0, help='Frame rate used for the timestamps')
+    parser.add_argument('--threshold', type=float, default=2.0, help='Seconds before a seat is flagged absent')
+    parser.add_argument('--forget-after', type=float,
+                        help='Seconds before an empty seat is dropped (default: 5 x --threshold, as in lab8)')
+    parser.add_argument('--spurious-frame', type=int, default=10, help='Frame with the one spurious box')
+    parser.add_argument('--budget-ms', type=float, default=1.0, help='Median update() time allowed')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    forget_after = args.forget_after if args.forget_after is not None else 5 * args.threshold
+    if (args.frames - 1 - args.spurious_frame) / args.fps <= forget_after:
+        print("Error: the sequence ends before the spurious seat can be forgotten; use more --frames")
+        raise SystemExit(1)
+
+    sequence, present, spurious = synthetic_sequence(args.faces, args.frames, args.fps, args.seed)
+    tracker = IdentityTracker(forget_after=forget_after)
+    identity = {}
+    # Time each seat ID was last seen, real faces and the spurious box alike
+    last_seen = {}
+    spurious_id = None
+    id_errors = 0
+    flag_errors = 0
+    latencies = []
+
+    for frame, (visible, boxes) in enumerate(sequence):
+        now = frame / args.fps
+        if frame == args.spurious_frame:
+            boxes = np.concatenate([boxes, spurious])
+        t0 = time.perf_counter()
+        assigned = tracker.update(boxes, now)
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+
+        if frame == args.spurious_frame:
+            spurious_id = int(assigned[-1])
+            last_seen[spurious_id] = now
+            assigned = assigned[:-1]
+        # Every face must keep the ID it got when it was first seen
+        for face, seat_id in zip(visible, assigned):
+            if identity.setdefault(face, seat_id) != seat_id:
+                id_errors += 1
+            last_seen[int(seat_id)] = now
+
+        # Exactly the seats that have been empty for longer than the threshold, but not
+        # yet for longer than forget_after, are flagged
+        flagged = set(tracker.ids[:tracker.count][tracker.absent(now, args.threshold)].tolist())
+        expected = {seat_id for seat_id, seen in last_seen.items()
+                    if args.threshold < now - seen <= forget_after}
+        flag_errors += len(flagged ^ expected)
+
+    stats = latency_summary(latencies)
+    print(f"{args.faces} faces, {args.frames} frames, {len(tracker)} seats, "
+          f"{int((~present).sum())} face-frames missing")
+    print(f"update(): median {stats['median_ms']:.3f} ms, p99 {stats['p99_ms']:.3f} ms, "
+          f"max {stats['max_ms']:.3f} ms")
+    print(f"ID switches: {id_errors}, wrong absence flags: {flag_errors}")
+    spurious_kept = spurious_id in tracker.ids[:tracker.count]
+    print(f"Spurious seat {spurious_id}: {'still tracked' if spurious_kept else 'dropped'} "
+          f"after {forget_after:g} s empty")
+
+    failed = False
+    if len(tracker) != args.faces or id_errors or flag_errors or spurious_kept:
+        print("Identity check FAILED")
+        failed = True
+    if stats['median_ms'] > args.budget_ms:
+        print(f"Median update() time is over the {args.budget_ms} ms budget")
+        failed = True
+    if failed:
+        raise SystemExit(1)
+    print("Identity check passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+# Benchmark Suite for the Lab Processing Functions
+# Times each lab's processing function on deterministic synthetic frames at 480p, 720p,
+# 1080p and 4K, and reports min/median/p99 latency and frames/s. Everything runs headless
+# on the CPU, so no camera or display is needed. Results can be saved as JSON and compared
+# with an earlier run; a function whose median latency got slower than the threshold is
+# flagged as a regression (and the exit code is 1).
+# Usage:
+#   python bench_labs.py --output baseline.json
+#   python bench_labs.py --compare baseline.json --threshold 10
+#   python bench_labs.py --functions detect_motion track_object --resolutions 1080p 4K
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import time
+
+import cv2
+import numpy as np
+
+from headless import latency_summary
+
+RESOLUTIONS = {'480p': (640, 480), '720p': (1280, 720), '1080p': (1920, 1080), '4K': (3840, 2160)}
+
+
+# Deterministic synthetic scene: noisy gradient, a blue ball (lab11), a bright hand-like
+# star (lab12) and a grey block that moves with shift (lab7 motion)
+def synthetic_scene(width, height, shift=0, seed=0):
+    rng = np.random.default_rng(seed)
+    scene = np.empty((height, width, 3), dtype=np.uint8)
+    scene[:] = np.linspace(40, 200, width, dtype=np.uint8)[None, :, None]
+    noise = rng.integers(-12, 13, size=(height, width, 3), dtype=np.int16)
+    scene = np.clip(scene.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+    unit = min(width, height)
+    # Blue ball in HSV range [100..140, 150..255, 50..255]
+    cv2.circle(scene, (width // 5, height // 3), unit // 12, (220, 60, 20), -1)
+
+    # Five-pointed star with deep notches, so the gesture code finds convexity defects
+    center = np.array([width * 0.65, height * 0.55])
+    angles = np.linspace(0, 2 * np.pi, 10, endpoint=False) - np.pi / 2
+    radii = np.where(np.arange(10) % 2 == 0, unit * 0.25, unit * 0.08)
+    points = center + np.stack([np.cos(angles) * radii, np.sin(angles) * radii], axis=1)
+    cv2.fillPoly(scene, [points.astype(np.int32)], (250, 250, 250))
+
+    # Block that moves between frames
+    size = unit // 6
+    x = width // 10 + shift
+    y = height - size - height // 10
+    cv2.rectangle(scene, (x, y), (x + size, y + size), (90, 90, 90), -1)
+    return scene
+
+
+# Cartoon face (skin ellipse, brows, eyes, nose and mouth) that the frontal face Haar
+# cascade detects; size is roughly the face width in pixels
+def draw_synthetic_face(image, center_x, center_y, size):
+    def scaled(value):
+        return max(1, int(size * value))
+
+    cv2.ellipse(image, (center_x, center_y), (scaled(0.42), scaled(0.55)), 0, 0, 360, (150, 170, 210), -1)
+    for side in (-1, 1):
+        eye_x = center_x + side * scaled(0.18)
+        eye_y = center_y - scaled(0.14)
+        # Brow, white of the eye with a dark outline, iris and a highlight (so the eye cascade fires too)
+        cv2.ellipse(image, (eye_x, eye_y - scaled(0.1)), (scaled(0.12), scaled(0.03)), 0, 0, 360, (40, 50, 60), -1)
+        cv2.ellipse(image, (eye_x, eye_y), (scaled(0.1), scaled(0.05)), 0, 0, 360, (235, 235, 235), -1)
+        cv2.ellipse(image, (eye_x, eye_y), (scaled(0.1), scaled(0.05)), 0, 0, 360, (40, 40, 40), scaled(0.01))
+        cv2.circle(image, (eye_x, eye_y), scaled(0.035), (30, 30, 30), -1)
+        cv2.circle(image, (eye_x + scaled(0.01), eye_y - scaled(0.01)), scaled(0.008), (250, 250, 250), -1)
+    cv2.ellipse(image, (center_x, center_y + scaled(0.08)), (scaled(0.05), scaled(0.12)), 0, 0, 360,
+                (130, 150, 190), -1)
+    cv2.ellipse(image, (center_x, center_y + scaled(0.28)), (scaled(0.14), scaled(0.04)), 0, 0, 360,
+                (80, 80, 140), -1)
+
+
+# Frame t of a deterministic clip with count faces drifting over a noisy background
+# Faces are laid out on a grid, so they never overlap. If a boxes list is given, the
+# square x, y, w, h box of every face is appended to it (labels for detector benchmarks)
+def synthetic_face_scene(width, height, t=0, count=3, seed=0, boxes=None):
+    rng = np.random.default_rng(seed)
+    scene = np.clip(90 + rng.normal(0, 8, (height, width, 3)), 0, 255).astype(np.uint8)
+
+    cols = max(1, int(np.ceil(np.sqrt(count * width / height))))
+    rows = int(np.ceil(count / cols))
+    cell_w, cell_h = width // cols, height // rows
+    sizes = rng.uniform(0.45, 0.7, count) * min(cell_w, cell_h / 1.3)
+    phases = rng.uniform(0, 2 * np.pi, count)
+    for index in range(count):
+        row, col = divmod(index, cols)
+        drift = 0.1 * min(cell_w, cell_h)
+        center_x = int(cell_w * (col + 0.5) + drift * np.sin(t / 15 + phases[index]))
+        center_y = int(cell_h * (row + 0.5) + drift * np.cos(t / 20 + phases[index]))
+        draw_synthetic_face(scene, center_x, center_y, int(sizes[index]))
+        if boxes is not None:
+            side = int(1.1 * sizes[index])
+            boxes.append((center_x - side // 2, center_y - side // 2, side, side))
+    return cv2.GaussianBlur(scene, (5, 5), 0)
+
+
+# Face boxes scaled to the frame, used to drive the eye detector in mask_eyes
+def synthetic_faces(width, height):
+    size = min(width, height) // 4
+    return np.array([[width // 10, height // 10, size, size],
+                     [width // 2, height // 8, size, size]])
+
+
+# Each case builds, for one scene, a function that runs the lab function on a fresh copy
+# of the frame (the copy is made outside the timed region)
+def case_adjust_brightness_contrast(frame, next_frame):
+    import lab_opencv_lab1 as lab1
+    return lambda image: lab1.adjust_brightness_contrast(image, 20, 1.3)
+
+
+def case_apply_blur(frame, next_frame):
+    import lab_opencv_lab2 as lab2
+    return lambda image: lab2.apply_blur(image, 11)
+
+
+def case_sharpen_image(frame, next_frame):
+    import lab_opencv_lab3 as lab3
+    return lab3.sharpen_image
+
+
+def case_enhance_red_channel(frame, next_frame):
+    import lab_opencv_lab6 as lab6
+    return lambda image: lab6.enhance_red_channel(image, 40)
+
+
+def case_enhance_red_regions(frame, next_frame):
+    import lab_opencv_lab6 as lab6
+    faces = synthetic_faces(frame.shape[1], frame.shape[0])
+    return lambda image: lab6.enhance_red_regions(image, faces, 40)
+
+
+def case_detect_motion(frame, next_frame):
+    import lab_opencv_lab7 as lab7
+    return lambda image: lab7.detect_motion(next_frame, image)
+
+
+def case_detect_people(frame, next_frame):
+    import lab_opencv_lab9 as lab9
+    return lambda image: lab9.detect_people(image, 0)
+
+
+def case_mask_eyes(frame, next_frame):
+    import lab_opencv_lab10 as lab10
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    faces = synthetic_faces(frame.shape[1], frame.shape[0])
+    return lambda image: lab10.mask_eyes(image, faces, gray)
+
+
+def case_track_object(frame, next_frame):
+    import lab_opencv_lab11 as lab11
+    return lambda image: lab11.track_object(image, lab11.hsv_lower, lab11.hsv_upper)
+
+
+def case_detect_gesture(frame, next_frame):
+    import lab_opencv_lab12 as lab12
+    contour = lab12.segment_hand(frame)
+    return lambda image: lab12.detect_gesture(image, contour)
+
+
+CASES = {
+    'adjust_brightness_contrast': case_adjust_brightness_contrast,
+    'apply_blur': case_apply_blur,
+    'sharpen_image': case_sharpen_image,
+    'enhance_red_channel': case_enhance_red_channel,
+    'enhance_red_regions': case_enhance_red_regions,
+    'detect_motion': case_detect_motion,
+    'detect_people': case_detect_people,
+    'mask_eyes': case_mask_eyes,
+    'track_object': case_track_object,
+    'detect_gesture': case_detect_gesture,
+}
+
+
+# Time run(copy of frame) repeat times after warmup untimed runs
+def time_case(run, frame, repeat, warmup):
+    for _ in range(warmup):
+        run(frame.copy())
+    latencies = []
+    for _ in range(repeat):
+        image = frame.copy()
+        t0 = time.perf_counter()
+        run(image)
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+    return latency_summary(latencies)
+
+
+# Describe the machine so saved results can be compared fairly
+def environment_info():
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'opencv_threads': cv2.getNumThreads(),
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+    }
+
+
+# Compare two result sets; returns the list of (key, baseline ms, current ms, change %) regressions
+def compare_results(baseline, current, threshold_percent):
+    regressions = []
+    print(f"\n{'benchmark':<40} {'baseline ms':>12} {'current ms':>11} {'change':>8}")
+    for key, stats in current.items():
+        if key not in baseline:
+            continue
+        before = baseline[key]['median_ms']
+        after = stats['median_ms']
+        change = (after - before) / before * 100.0 if before > 0 else 0.0
+        flag = '  REGRESSION' if change > threshold_percent else ''
+        print(f"{key:<40} {before:>12.3f} {after:>11.3f} {change:>+7.1f}%{flag}")
+        if flag:
+            regressions.append((key, before, after, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the lab processing functions on synthetic frames")
+    parser.add_argument('--functions', nargs='+', default=list(CASES), choices=list(CASES))
+    parser.add_argument('--resolutions', nargs='+', default=list(RESOLUTIONS), choices=list(RESOLUTIONS))
+    parser.add_argument('--repeat', type=int, default=20, help='Timed runs per function and resolution')
+    parser.add_argument('--warmup', type=int, default=2, help='Untimed runs before timing')
+    parser.add_argument('--threads', type=int, default=None, help='cv2.setNumThreads value (default: OpenCV default)')
+    parser.add_argument('--output', help='Save the results to this JSON file')
+    parser.add_argument('--compare', help='Compare with the results saved in this JSON file')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='Flag a regression when the median latency grows by more than this percentage')
+    args = parser.parse_args()
+
+    if args.threads is not None:
+        cv2.setNumThreads(args.threads)
+
+    results = {}
+    print(f"{'benchmark':<40} {'min ms':>8} {'median ms':>10} {'p99 ms':>8} {'frames/s':>9}")
+    for resolution in args.resolutions:
+        width, height = RESOLUTIONS[resolution]
+        frame = synthetic_scene(width, height)
+        next_frame = synthetic_scene(width, height, shift=width // 20)
+
+        for name in args.functions:
+            run = CASES[name](frame, next_frame)
+            stats = time_case(run, frame, args.repeat, args.warmup)
+            key = f"{name}@{resolution}"
+            results[key] = stats
+            print(f"{key:<40} {stats['min_ms']:>8.3f} {stats['median_ms']:>10.3f} "
+                  f"{stats['p99_ms']:>8.3f} {stats['fps']:>9.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'environment': environment_info(), 'results': results}, file, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = compare_results(baseline['results'], results, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0f}%")
+            raise SystemExit(1)
+        print(f"\nNo regressions above {args.threshold:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# Benchmark: Motion Engines for Bed Monitoring
+# Runs lab7's MotionDetector with every motion engine (frame diff, running average,
+# MOG2, KNN), each at full, half and quarter resolution, over a bed-monitoring clip. For
+# every setting it reports:
+# - the motion analysis time per frame
+# - false-positive boxes: boxes reported on frames where nothing in the scene moves,
+#   including the ghost a background model leaves where the patient lay until it has
+#   learned the new scene
+# - the share of moving frames on which motion was reported
+# The still frames of a recorded clip are given with --still-frames (frame ranges such
+# as 0-39,61-119). Without --source a synthetic clip is used: a patient lying in bed,
+# with camera noise and a slow lighting drift, who moves only during known intervals.
+# Usage:
+#   python bench_motion_engines.py
+#   python bench_motion_engines.py --source bed_night.mp4 --still-frames 0-299,420-899
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from bench_labs import RESOLUTIONS
+from frame_grabber import open_source
+from motion_detection import MotionDetector
+
+# Settings compared: name -> MotionDetector options
+SETTINGS = {
+    'diff': {'engine': 'diff'},
+    'average': {'engine': 'average'},
+    'mog2': {'engine': 'mog2'},
+    'knn': {'engine': 'knn'},
+    'diff 0.5': {'engine': 'diff', 'downscale': 0.5},
+    'average 0.5': {'engine': 'average', 'downscale': 0.5},
+    'mog2 0.5': {'engine': 'mog2', 'downscale': 0.5},
+    'knn 0.5': {'engine': 'knn', 'downscale': 0.5},
+    'diff 0.25': {'engine': 'diff', 'downscale': 0.25},
+    'average 0.25': {'engine': 'average', 'downscale': 0.25},
+    'mog2 0.25': {'engine': 'mog2', 'downscale': 0.25},
+    'knn 0.25': {'engine': 'knn', 'downscale': 0.25},
+}
+
+# Frame ranges in which the synthetic patient moves
+SYNTHETIC_MOVES = ((40, 55), (120, 135))
+
+
+# Synthetic bed-monitoring clip; returns (frames, boolean array of still frames)
+def synthetic_bed_clip(width, height, frames, seed=0):
+    rng = np.random.default_rng(seed)
+    room = np.full((height, width, 3), 70, dtype=np.uint8)
+    cv2.rectangle(room, (width // 5, height // 3), (4 * width // 5, 5 * height // 6), (150, 140, 130), -1)
+    cv2.rectangle(room, (width // 5, height // 3), (width // 3, 5 * height // 6), (210, 210, 210), -1)
+
+    still = np.ones(frames, dtype=bool)
+    offset = 0.0
+    clip = []
+    for index in range(frames):
+        # The patient rolls one way during the first movement and back during the second
+        for number, (start, end) in enumerate(SYNTHETIC_MOVES):
+            if start <= index < end:
+                still[index] = False
+                offset += width / 60 * (-1) ** number
+        frame = room.copy()
+        # Patient: head and body, shifted while moving
+        head = (int(width // 4 + offset), height // 2)
+        cv2.circle(frame, head, height // 14, (150, 170, 210), -1)
+        cv2.ellipse(frame, (int(width // 2 + offset), height // 2), (width // 5, height // 10), 0, 0, 360,
+                    (120, 90, 80), -1)
+        # Slow lighting drift and camera noise
+        light = 4 * np.sin(index / 25)
+        noise = rng.normal(light, 3, frame.shape)
+        clip.append(np.clip(frame + noise, 0, 255).astype(np.uint8))
+    return clip, still
+
+
+# Boolean array of still frames from a range list such as "0-39,61-119"
+def parse_still_frames(text, frames):
+    still = np.zeros(frames, dtype=bool)
+    for part in text.split(','):
+        start, _, end = part.partition('-')
+        still[int(start):int(end or start) + 1] = True
+    return still
+
+
+def load_clip(args):
+    if args.source is None:
+        width, height = RESOLUTIONS[args.resolution]
+        return synthetic_bed_clip(width, height, args.max_frames)
+
+    cap = open_source(args.source)
+    frames = []
+    while len(frames) < args.max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    still = parse_still_frames(args.still_frames, len(frames)) if args.still_frames else np.zeros(len(frames), bool)
+    return frames, still
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Motion engine cost and false-positive benchmark")
+    parser.add_argument('--source', help='Recorded clip (default: synthetic bed clip)')
+    parser.add_argument('--still-frames', help='Frame ranges without real motion in --source, e.g. 0-39,61-119')
+    parser.add_argument('--resolution', default='720p', choices=list(RESOLUTIONS), help='Synthetic clip resolution')
+    parser.add_argument('--max-frames', type=int, default=200, help='Frames to process')
+    parser.add_argument('--warmup', type=int, default=20, help='Leading frames not scored (background learning)')
+    parser.add_argument('--settings', nargs='+', default=list(SETTINGS), choices=list(SETTINGS))
+    args = parser.parse_args()
+
+    frames, still = load_clip(args)
+    if not frames:
+        print(f"Error: Could not read frames from {args.source}")
+        raise SystemExit(1)
+    scored = np.arange(len(frames)) >= args.warmup
+    moving = scored & ~still
+    print(f"{len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}, "
+          f"{int((scored & still).sum())} still and {int(moving.sum())} moving frames scored")
+
+    print(f"{'setting':<14} {'ms/frame':>9} {'false boxes':>12} {'moving frames hit':>18}")
+    for name in args.settings:
+        detector = MotionDetector(**SETTINGS[name])
+        counts = np.zeros(len(frames), dtype=np.int64)
+        t0 = time.perf_counter()
+        for index, frame in enumerate(frames):
+            counts[index] = len(detector.update(frame))
+        ms = (time.perf_counter() - t0) * 1000.0 / len(frames)
+
+        false_boxes = int(counts[scored & still].sum())
+        hit_rate = (counts[moving] > 0).mean() if moving.any() else float('nan')
+        print(f"{name:<14} {ms:>9.2f} {false_boxes:>12} {hit_rate:>18.3f}")
+
+
+if __name__ == "__main__":
+    main()
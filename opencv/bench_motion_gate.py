@@ -0,0 +1,132 @@
+# Benchmark and Correctness Check: Motion-Gated Face Detection
+# Runs the face cascade over a mostly static corridor clip, first on every frame and
+# then behind MotionGate (whole-frame and region mode). For every setting it reports:
+# - ms per frame, including the motion check
+# - how often the cascade ran on the whole frame or on motion regions, and how many
+#   frames it was skipped on
+# - recall and precision of the gated boxes against the ungated boxes of each frame
+# The run fails (exit code 1) if recall or precision drops below --min-recall.
+# Without --source a synthetic clip is used: a guard sits still at a desk all the time,
+# and a visitor walks in, stands for a while and walks out again. A recorded clip can be
+# given with --source; the ungated run is the reference, so it needs no labels.
+# Usage:
+#   python bench_motion_gate.py [--resolution 720p] [--refresh 30]
+#   python bench_motion_gate.py --source corridor.mp4 --max-frames 600
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from bench_labs import RESOLUTIONS, draw_synthetic_face
+from boxes import count_matches
+from detector_registry import detectors
+from frame_grabber import open_source
+from motion_gate import MotionGate
+
+# Frames of the synthetic clip in which the visitor walks in, stands, and walks out
+SYNTHETIC_VISIT = (40, 90, 150, 200)
+
+
+# Synthetic corridor clip (grayscale frames) with camera noise
+def synthetic_corridor_clip(width, height, frames, seed=0):
+    rng = np.random.default_rng(seed)
+    corridor = np.empty((height, width, 3), dtype=np.uint8)
+    corridor[:] = np.linspace(60, 140, width, dtype=np.uint8)[None, :, None]
+    cv2.rectangle(corridor, (0, 3 * height // 4), (width, height), (80, 80, 90), -1)
+    cv2.rectangle(corridor, (width // 10, height // 2), (width // 4, 3 * height // 4), (50, 70, 100), -1)
+
+    size = height // 5
+    enter, stand, leave, gone = SYNTHETIC_VISIT
+    centre_x = width // 2
+    clip = []
+    for index in range(frames):
+        scene = corridor.copy()
+        # The guard at the desk
+        draw_synthetic_face(scene, width // 6, height // 3, size)
+        # The visitor, from the left edge to the middle and on to the right edge
+        if enter <= index < stand:
+            x = int(size + (centre_x - size) * (index - enter) / (stand - enter))
+        elif stand <= index < leave:
+            x = centre_x
+        elif leave <= index < gone:
+            x = int(centre_x + (width - size - centre_x) * (index - leave) / (gone - leave))
+        else:
+            x = None
+        if x is not None:
+            draw_synthetic_face(scene, x, height // 2, size)
+        noisy = np.clip(scene + rng.normal(0, 3, scene.shape), 0, 255).astype(np.uint8)
+        clip.append(cv2.cvtColor(cv2.GaussianBlur(noisy, (5, 5), 0), cv2.COLOR_BGR2GRAY))
+    return clip
+
+
+def load_clip(args):
+    if args.source is None:
+        width, height = RESOLUTIONS[args.resolution]
+        return synthetic_corridor_clip(width, height, args.max_frames)
+
+    cap = open_source(args.source)
+    frames = []
+    while len(frames) < args.max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    cap.release()
+    return frames
+
+
+# Run detect over the frames; returns (ms per frame, per-frame boxes)
+def run_detection(detect, frames):
+    results = []
+    t0 = time.perf_counter()
+    for gray in frames:
+        results.append(np.asarray(detect(gray)).reshape(-1, 4))
+    return (time.perf_counter() - t0) * 1000.0 / len(frames), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Motion-gated face detection benchmark")
+    parser.add_argument('--source', help='Recorded clip (default: synthetic corridor clip)')
+    parser.add_argument('--resolution', default='720p', choices=list(RESOLUTIONS), help='Synthetic clip resolution')
+    parser.add_argument('--max-frames', type=int, default=240, help='Frames to process')
+    parser.add_argument('--refresh', type=int, default=30, help='Gate refresh interval (frames)')
+    parser.add_argument('--downscale', type=float, default=0.25, help='Scale of the motion check')
+    parser.add_argument('--min-recall', type=float, default=0.95, help='Lowest acceptable recall and precision')
+    args = parser.parse_args()
+
+    frames = load_clip(args)
+    if not frames:
+        print(f"Error: Could not read frames from {args.source}")
+        raise SystemExit(1)
+    face_cascade = detectors.get('face')
+
+    def detect(gray):
+        return face_cascade.detectMultiScale(gray, 1.1, 5, minSize=(30, 30))
+
+    reference_ms, reference = run_detection(detect, frames)
+    print(f"{len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}, "
+          f"{sum(len(boxes) for boxes in reference)} faces found ungated")
+    print(f"{'setting':<14} {'ms/frame':>9} {'full runs':>10} {'region runs':>12} {'skipped':>8} "
+          f"{'recall':>7} {'precision':>9}")
+    print(f"{'ungated':<14} {reference_ms:>9.2f} {len(frames):>10} {0:>12} {0:>8} {1.0:>7.3f} {1.0:>9.3f}")
+
+    failed = False
+    for name, regions in (('gate', False), ('gate regions', True)):
+        gate = MotionGate(detect, refresh_interval=args.refresh, downscale=args.downscale, regions=regions)
+        ms, results = run_detection(gate.update, frames)
+        matched = sum(count_matches(expected, found) for expected, found in zip(reference, results))
+        recall = matched / max(1, sum(len(boxes) for boxes in reference))
+        precision = matched / max(1, sum(len(boxes) for boxes in results))
+        failed |= recall < args.min_recall or precision < args.min_recall
+        print(f"{name:<14} {ms:>9.2f} {gate.full_runs:>10} {gate.region_runs:>12} {gate.skipped:>8} "
+              f"{recall:>7.3f} {precision:>9.3f}")
+
+    if failed:
+        print(f"FAILED: gated recall or precision below {args.min_recall}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# Benchmark and Correctness Check: Tiled Parallel Cascade
+# Runs the face cascade over synthetic 4K face scenes, first as one detectMultiScale
+# call and then through TiledCascade with 1..N worker threads. It reports ms per frame
+# and the speedup over the single call for every worker count, and the recall and
+# precision of the tiled result against the single call. The run fails (exit code 1)
+# if recall or precision drops below --min-recall.
+# The speedup is bounded by the number of cores: on a single core the tiled search is a
+# little slower than one call, because of the tile overlap and the extra coarse pass.
+# Usage: python bench_tiled_cascade.py [--resolution 4K] [--faces 20] [--tiles 2 2] [--max-workers 8]
+
+import argparse
+import os
+import time
+
+import cv2
+
+from bench_labs import RESOLUTIONS, synthetic_face_scene
+from boxes import count_matches
+from detector_registry import detectors
+from tiled_detection import TiledCascade
+
+
+# Run detect over the frames; returns (ms per frame, per-frame boxes)
+def run_detection(detect, frames):
+    results = []
+    t0 = time.perf_counter()
+    for gray in frames:
+        results.append(detect(gray))
+    return (time.perf_counter() - t0) * 1000.0 / len(frames), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiled parallel cascade benchmark and correctness check")
+    parser.add_argument('--resolution', default='4K', choices=list(RESOLUTIONS), help='Synthetic scene resolution')
+    parser.add_argument('--faces', type=int, default=20, help='Faces per synthetic scene')
+    parser.add_argument('--frames', type=int, default=5, help='Synthetic scenes to process')
+    parser.add_argument('--tiles', type=int, nargs=2, default=(2, 2), metavar=('COLUMNS', 'ROWS'))
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1, help='Largest worker count to time')
+    parser.add_argument('--min-recall', type=float, default=0.95, help='Recall and precision required')
+    args = parser.parse_args()
+
+    width, height = RESOLUTIONS[args.resolution]
+    frames = [cv2.cvtColor(synthetic_face_scene(width, height, t, args.faces), cv2.COLOR_BGR2GRAY)
+              for t in range(args.frames)]
+    cascade = detectors.get('face')
+
+    def single(gray):
+        return cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
+
+    baseline_ms, reference = run_detection(single, frames)
+    reference_count = sum(len(boxes) for boxes in reference)
+    print(f"{len(frames)} frames of {width}x{height}, {args.tiles[0]}x{args.tiles[1]} tiles, "
+          f"{os.cpu_count()} cores, {reference_count} faces found by the single call")
+    print(f"{'workers':>7} {'ms/frame':>9} {'speedup':>8} {'recall':>7} {'precision':>9}")
+    print(f"{'single':>7} {baseline_ms:>9.1f} {1.0:>7.2f}x {1.0:>7.3f} {1.0:>9.3f}")
+
+    failed = False
+    for workers in range(1, args.max_workers + 1):
+        tiled = TiledCascade('face', grid=args.tiles, workers=workers)
+        # The first call loads the per-thread classifiers; keep it out of the timing
+        tiled.detectMultiScale(frames[0], scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
+        ms, results = run_detection(
+            lambda gray: tiled.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30)), frames)
+        tiled.close()
+
+        matched = sum(count_matches(ref, found) for ref, found in zip(reference, results))
+        detected = sum(len(found) for found in results)
+        recall = matched / reference_count if reference_count else 1.0
+        precision = matched / detected if detected else 1.0
+        print(f"{workers:>7} {ms:>9.1f} {baseline_ms / ms:>7.2f}x {recall:>7.3f} {precision:>9.3f}")
+        failed |= recall < args.min_recall or precision < args.min_recall
+
+    if failed:
+        print("Tiled detection check FAILED")
+        raise SystemExit(1)
+    print("Tiled detection check passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# Box Geometry Helpers
+# Vectorized helpers for the x, y, w, h boxes that detectMultiScale returns. They
+# compute IoU between all pairs of boxes, run non-maximum suppression, drop duplicate
+# boxes, and count how many reference boxes a detector found. Whole box lists are
+# handled with NumPy broadcasting instead of Python loops over pairs.
+
+import numpy as np
+
+
+# Boxes as an (N, 4) float array; accepts lists, tuples and the empty tuple detectMultiScale returns
+def as_boxes(boxes):
+    return np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+
+
+# IoU of every box in a against every box in b: an (len(a), len(b)) matrix
+def iou_matrix(a, b):
+    a = as_boxes(a)
+    b = as_boxes(b)
+    ax0, ay0 = a[:, 0:1], a[:, 1:2]
+    ax1, ay1 = ax0 + a[:, 2:3], ay0 + a[:, 3:4]
+    bx0, by0 = b[:, 0], b[:, 1]
+    bx1, by1 = bx0 + b[:, 2], by0 + b[:, 3]
+
+    overlap_w = np.clip(np.minimum(ax1, bx1) - np.maximum(ax0, bx0), 0, None)
+    overlap_h = np.clip(np.minimum(ay1, by1) - np.maximum(ay0, by0), 0, None)
+    intersection = overlap_w * overlap_h
+    union = (a[:, 2:3] * a[:, 3:4]) + (b[:, 2] * b[:, 3]) - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+
+# Greedy non-maximum suppression: keep the highest scoring box, drop every box that
+# overlaps it by more than threshold IoU, and repeat with the next surviving box.
+# All pairwise IoUs are computed in one vectorized call. Without scores, earlier boxes
+# win. Returns the indices of the kept boxes, best first
+def non_max_suppression(boxes, scores=None, threshold=0.3):
+    boxes = as_boxes(boxes)
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.intp)
+    order = np.arange(len(boxes)) if scores is None else np.argsort(-np.asarray(scores), kind='stable')
+    overlaps = iou_matrix(boxes, boxes) > threshold
+    alive = np.ones(len(boxes), dtype=bool)
+    keep = []
+    for index in order:
+        if alive[index]:
+            keep.append(index)
+            alive &= ~overlaps[index]
+    return np.asarray(keep, dtype=np.intp)
+
+
+# Drop boxes that overlap an earlier (kept) box by more than threshold IoU
+def remove_duplicates(boxes, threshold=0.5):
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    if len(boxes) < 2:
+        return boxes
+    return boxes[np.sort(non_max_suppression(boxes, None, threshold))]
+
+
+# Number of reference boxes matched by a detected box with IoU >= threshold (each used once)
+def count_matches(reference, detected, threshold=0.5):
+    ious = iou_matrix(reference, detected)
+    matches = 0
+    while ious.size and ious.max() >= threshold:
+        row, col = np.unravel_index(np.argmax(ious), ious.shape)
+        ious[row, :] = 0
+        ious[:, col] = 0
+        matches += 1
+    return matches
@@ -0,0 +1,135 @@
+# Cascade Search Front End
+# detectMultiScale on a full-resolution frame with scaleFactor=1.1 and minSize=(30, 30)
+# scans many pyramid levels that never contain a face at a fixed mounting distance.
+# CascadeSearch wraps a cascade with three options that cut this work:
+#   downscale     - run the cascade on a smaller copy of the frame and map the boxes
+#                   back to full resolution
+#   roi           - search only expanded windows around the previous frame's faces,
+#                   with a full-frame sweep every full_sweep_interval frames (and
+#                   whenever there are no faces to follow). Each window only looks for
+#                   faces within size_slack of the face it follows
+#   adaptive_size - limit the full-frame sweeps to the face widths of recent detections
+#                   (within size_slack), with an unconstrained sweep every
+#                   size_reset_interval sweeps so faces of a new size are still found
+# With none of them enabled it behaves exactly like a plain detectMultiScale call.
+# Calling a CascadeSearch returns an (N, 4) array of full-resolution x, y, w, h boxes.
+
+import collections
+import math
+
+import cv2
+import numpy as np
+
+from boxes import remove_duplicates
+
+
+class CascadeSearch:
+    def __init__(self, cascade, scale_factor=1.1, min_neighbors=5, min_size=(30, 30), max_size=None,
+                 downscale=1.0, roi=False, roi_margin=0.25, full_sweep_interval=10,
+                 adaptive_size=False, size_slack=0.5, size_history=30, size_reset_interval=5):
+        self.cascade = cascade
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = tuple(min_size)
+        self.max_size = tuple(max_size) if max_size else None
+        self.downscale = downscale
+        self.roi = roi
+        self.roi_margin = roi_margin
+        self.full_sweep_interval = full_sweep_interval
+        self.adaptive_size = adaptive_size
+        self.size_slack = size_slack
+        self.size_reset_interval = size_reset_interval
+
+        self.previous = np.empty((0, 4), dtype=np.int32)
+        self.widths = collections.deque(maxlen=size_history)
+        self.frames_since_sweep = None
+        self.sweeps_since_reset = 0
+
+        self.full_sweeps = 0
+        self.roi_searches = 0
+
+    # Apply the command line options added by add_search_args()
+    def configure(self, args):
+        self.downscale = args.downscale
+        self.roi = args.roi_search
+        self.full_sweep_interval = args.full_sweep_interval
+        self.adaptive_size = args.adaptive_size
+
+    def __call__(self, gray_frame):
+        sweep = (not self.roi or len(self.previous) == 0 or self.frames_since_sweep is None
+                 or self.frames_since_sweep >= self.full_sweep_interval)
+
+        if sweep:
+            min_size, max_size = self._sweep_size_limits()
+            boxes = self._detect(gray_frame, 0, 0, min_size, max_size)
+            self.frames_since_sweep = 1
+            self.full_sweeps += 1
+        else:
+            found = [self._detect(gray_frame[y0:y1, x0:x1], x0, y0, min_size, max_size)
+                     for x0, y0, x1, y1, min_size, max_size in self._windows(gray_frame.shape)]
+            # Windows of neighbouring faces can overlap and find the same face twice
+            boxes = remove_duplicates(np.concatenate(found))
+            self.frames_since_sweep += 1
+            self.roi_searches += 1
+
+        self.previous = boxes
+        self.widths.extend(boxes[:, 2].tolist())
+        return boxes
+
+    # minSize/maxSize (full resolution) for a full-frame sweep
+    def _sweep_size_limits(self):
+        if not (self.adaptive_size and self.widths):
+            return self.min_size, self.max_size
+        self.sweeps_since_reset += 1
+        if self.sweeps_since_reset >= self.size_reset_interval:
+            self.sweeps_since_reset = 0
+            return self.min_size, self.max_size
+        return self._size_range(min(self.widths), max(self.widths))
+
+    # (minSize, maxSize) covering widths low..high with size_slack either side
+    def _size_range(self, low, high):
+        low = max(self.min_size[0], int(low * (1.0 - self.size_slack)))
+        high = math.ceil(high * (1.0 + self.size_slack))
+        return (low, low), (high, high)
+
+    # Search windows (x0, y0, x1, y1, minSize, maxSize) around the previous faces
+    def _windows(self, shape):
+        frame_height, frame_width = shape[:2]
+        windows = []
+        for x, y, w, h in self.previous:
+            margin = int(max(w, h) * self.roi_margin)
+            windows.append((max(0, x - margin), max(0, y - margin),
+                            min(frame_width, x + w + margin), min(frame_height, y + h + margin))
+                           + self._size_range(w, w))
+        return windows
+
+    # Run the cascade on image (downscaled if requested) and return full-resolution boxes
+    def _detect(self, image, offset_x, offset_y, min_size, max_size):
+        scale = self.downscale
+        if scale != 1.0:
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        scaled_min = tuple(max(1, round(size * scale)) for size in min_size)
+        scaled_max = tuple(round(size * scale) for size in max_size) if max_size else (0, 0)
+
+        faces = self.cascade.detectMultiScale(image, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors,
+                                              minSize=scaled_min, maxSize=scaled_max)
+        boxes = np.asarray(faces, dtype=np.float64).reshape(-1, 4)
+        if scale != 1.0:
+            boxes = np.rint(boxes / scale)
+        boxes = boxes.astype(np.int32)
+        boxes[:, 0] += offset_x
+        boxes[:, 1] += offset_y
+        return boxes
+
+
+# Add the cascade search options to a face lab's command line parser
+def add_search_args(parser):
+    parser.add_argument('--downscale', type=float, default=1.0,
+                        help='Run the face cascade on the frame scaled by this factor (e.g. 0.5)')
+    parser.add_argument('--roi-search', action='store_true',
+                        help="Search only around the previous frame's faces between full-frame sweeps")
+    parser.add_argument('--full-sweep-interval', type=int, default=10,
+                        help='Frames between full-frame sweeps with --roi-search')
+    parser.add_argument('--adaptive-size', action='store_true',
+                        help='Limit the face size range to the sizes of recent detections')
+    return parser
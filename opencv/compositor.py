@@ -0,0 +1,119 @@
+# Preallocated View Compositor
+# Labs 1-7 and gui_1 used to build their "original | processed" window with
+# np.hstack((frame, processed)), which allocates and copies a double-width image on
+# every frame. A Compositor owns one canvas per layout and hands out views (panes)
+# of it. Images are copied into a pane, or a processing stage writes its output
+# straight into the pane with dst=compositor.pane(i). The canvas is reallocated only
+# when the pane size or channel count changes. Grayscale images placed on a colour
+# canvas are converted into the pane in place, without a temporary image.
+#
+# Layouts:
+#   'side_by_side' - panes in one row (the np.hstack replacement)
+#   'grid'         - rows x cols panes
+#   'pip'          - pane 0 fills the canvas, the other panes are small insets in its
+#                    top-right corner (picture-in-picture)
+
+import math
+
+import cv2
+import numpy as np
+
+LAYOUTS = ('side_by_side', 'grid', 'pip')
+
+
+class Compositor:
+    def __init__(self, layout='side_by_side', panes=2, cols=None, pip_scale=0.25, pip_margin=10):
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown layout: {layout}")
+        self.layout = layout
+        self.panes = panes
+        if layout == 'side_by_side':
+            self.cols = panes
+        else:
+            self.cols = cols or math.ceil(math.sqrt(panes))
+        self.rows = math.ceil(panes / self.cols)
+        self.pip_scale = pip_scale
+        self.pip_margin = pip_margin
+
+        self.canvas = None
+        self.geometry = None
+        self.views = []
+        # Scratch buffers for images that must be resized before channel promotion
+        self.scratch = {}
+
+    # Make sure the canvas fits panes of pane_height x pane_width with the given channel
+    # count; it is reallocated only when this geometry changes. Returns the canvas
+    def prepare(self, pane_height, pane_width, channels=3):
+        geometry = (pane_height, pane_width, channels)
+        if geometry == self.geometry:
+            return self.canvas
+
+        if self.layout == 'pip':
+            shape = (pane_height, pane_width)
+        else:
+            shape = (pane_height * self.rows, pane_width * self.cols)
+        if channels > 1:
+            shape += (channels,)
+
+        # Zero-filled so unused grid cells stay black
+        self.canvas = np.zeros(shape, dtype=np.uint8)
+        self.geometry = geometry
+        self.views = [self._pane_view(index, pane_height, pane_width) for index in range(self.panes)]
+        return self.canvas
+
+    def _pane_view(self, index, pane_height, pane_width):
+        if self.layout == 'pip':
+            if index == 0:
+                return self.canvas
+            # Insets are stacked downwards along the right edge of the main pane
+            inset_height = max(1, int(pane_height * self.pip_scale))
+            inset_width = max(1, int(pane_width * self.pip_scale))
+            x = pane_width - inset_width - self.pip_margin
+            y = self.pip_margin + (index - 1) * (inset_height + self.pip_margin)
+            return self.canvas[y:y + inset_height, x:x + inset_width]
+
+        row, col = divmod(index, self.cols)
+        y = row * pane_height
+        x = col * pane_width
+        return self.canvas[y:y + pane_height, x:x + pane_width]
+
+    # View of pane index; stages can write their output into it directly
+    def pane(self, index):
+        return self.views[index]
+
+    # Copy image into pane index, resizing it and promoting grayscale to colour as needed
+    def place(self, index, image):
+        view = self.views[index]
+        same_size = image.shape[:2] == view.shape[:2]
+        image_channels = image.shape[2] if image.ndim == 3 else 1
+        view_channels = view.shape[2] if view.ndim == 3 else 1
+
+        if image_channels == view_channels:
+            if same_size:
+                np.copyto(view, image)
+            else:
+                cv2.resize(image, (view.shape[1], view.shape[0]), dst=view, interpolation=cv2.INTER_AREA)
+            return view
+
+        if image_channels != 1:
+            raise ValueError(f"Cannot place a {image_channels}-channel image on a {view_channels}-channel canvas")
+
+        # Grayscale on a colour canvas: resize into a scratch buffer if needed, then convert in place
+        if not same_size:
+            scratch = self.scratch.get(index)
+            if scratch is None or scratch.shape != view.shape[:2]:
+                scratch = np.empty(view.shape[:2], dtype=np.uint8)
+                self.scratch[index] = scratch
+            cv2.resize(image, (view.shape[1], view.shape[0]), dst=scratch, interpolation=cv2.INTER_AREA)
+            image = scratch
+        cv2.cvtColor(image, cv2.COLOR_GRAY2BGR, dst=view)
+        return view
+
+    # Lay out the given images (one per pane) and return the canvas. Pane size comes from
+    # the first image; the canvas is colour if any image is
+    def compose(self, *images):
+        channels = max(image.shape[2] if image.ndim == 3 else 1 for image in images)
+        self.prepare(images[0].shape[0], images[0].shape[1], channels)
+        for index, image in enumerate(images):
+            self.place(index, image)
+        return self.canvas
@@ -0,0 +1,82 @@
+# Eye Box Cache
+# Lab10 used to run the eye cascade inside every face on every frame, so the cascade
+# cost grew with the number of faces. EyeBoxCache stores each face's eye boxes as
+# fractions of the face box. While a face stays roughly in place it reuses them,
+# scaled to the face's current size. Eye detection runs again only for a face that:
+# - is new,
+# - moved by more than move_threshold face widths,
+# - changed size by more than scale_threshold, or
+# - has reused its boxes for refresh_interval frames.
+# The bounded refresh keeps the privacy mask up to date. A refresh that finds no eyes
+# keeps the previous boxes, so a blink never unmasks a face.
+
+import numpy as np
+
+from boxes import as_boxes, iou_matrix
+
+
+class EyeBoxCache:
+    # detect_eyes(face_gray) returns eye boxes relative to the face ROI (like detectMultiScale)
+    def __init__(self, detect_eyes, move_threshold=0.1, scale_threshold=0.1, refresh_interval=10):
+        self.detect_eyes = detect_eyes
+        self.move_threshold = move_threshold
+        self.scale_threshold = scale_threshold
+        self.refresh_interval = refresh_interval
+
+        self.faces = np.empty((0, 4))
+        self.eyes = []
+        self.ages = np.empty(0, dtype=np.int64)
+
+        self.detections = 0
+        self.reuses = 0
+
+    # Eye boxes for every face, relative to the face ROI, in face order
+    def lookup(self, gray_frame, faces):
+        faces = as_boxes(faces)
+        matches = self._match(faces)
+        eyes = []
+        ages = np.zeros(len(faces), dtype=np.int64)
+
+        for index, (x, y, w, h) in enumerate(faces.astype(int)):
+            cached = matches[index]
+            if cached >= 0 and self.ages[cached] + 1 < self.refresh_interval:
+                relative = self.eyes[cached]
+                ages[index] = self.ages[cached] + 1
+                self.reuses += 1
+            else:
+                found = self.detect_eyes(gray_frame[y:y+h, x:x+w])
+                relative = as_boxes(found) / (w, h, w, h)
+                if len(relative) == 0 and cached >= 0:
+                    relative = self.eyes[cached]
+                self.detections += 1
+            eyes.append(relative)
+
+        self.faces = faces
+        self.eyes = eyes
+        self.ages = ages
+        return [np.rint(relative * (w, h, w, h)).astype(int) for relative, (x, y, w, h) in zip(eyes, faces)]
+
+    # Index of the cached face each face continues, or -1 if it is new, moved or rescaled
+    # A face and a cached face are paired only when each is the other's best overlap, so
+    # no cached entry is claimed by two faces
+    def _match(self, faces):
+        matches = np.full(len(faces), -1, dtype=np.int64)
+        if not len(faces) or not len(self.faces):
+            return matches
+
+        overlap = iou_matrix(faces, self.faces)
+        best = overlap.argmax(axis=1)
+        mutual = overlap.argmax(axis=0)[best] == np.arange(len(faces))
+        mutual &= overlap[np.arange(len(faces)), best] > 0
+        previous = self.faces[best]
+        shift = np.linalg.norm((faces[:, :2] + faces[:, 2:] / 2) - (previous[:, :2] + previous[:, 2:] / 2), axis=1)
+        moved = shift > self.move_threshold * previous[:, 2]
+        rescaled = np.abs(faces[:, 2] / previous[:, 2] - 1.0) > self.scale_threshold
+        keep = mutual & ~(moved | rescaled)
+        matches[keep] = best[keep]
+        return matches
+
+    # Fraction of face lookups that reused cached eye boxes
+    def reuse_rate(self):
+        total = self.detections + self.reuses
+        return self.reuses / total if total else 0.0
@@ -0,0 +1,183 @@
+# Face Detector Backends
+# The face labs were hard-wired to the frontal face Haar cascade. This module puts
+# three interchangeable backends behind the cascade's own detectMultiScale() call:
+#   haar - a Haar cascade (default: OpenCV's haarcascade_frontalface_default.xml)
+#   lbp  - an LBP cascade; cheaper than Haar, a little less accurate. The pip OpenCV
+#          package ships no LBP files, so pass --detector-model with e.g.
+#          lbpcascade_frontalface_improved.xml from OpenCV's data/lbpcascades
+#   dnn  - a cv2.dnn SSD face detector read from a local model file (.onnx, or a
+#          .caffemodel with its .prototxt such as res10_300x300_ssd_iter_140000)
+# Because every backend answers detectMultiScale(), CascadeSearch, the detect-then-track
+# update and the labs use them unchanged. The DNN backend ignores scaleFactor and
+# minNeighbors (it has a confidence threshold instead) but honours minSize and maxSize.
+# detect(image) runs a backend with its own default settings; bench_face_detectors.py
+# uses it to compare the backends on a labelled image set.
+# The cascades work on grayscale. The DNN was trained on colour images, so its color
+# attribute is True and the labs pass it the BGR frame instead of their grayscale copy.
+# Models are loaded through the detector registry, so load times reach the profiler.
+# Registry names carry the model's full normalized path, so two models with the same
+# file name in different directories stay apart.
+# A missing or unreadable model raises IOError; face_backend_from_args() reports it
+# and exits instead of failing later inside the frame loop.
+
+import os
+
+import cv2
+import numpy as np
+
+from detector_registry import detectors
+
+
+# The image as a single-channel 8-bit frame
+def as_gray(image):
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+
+
+# The image as a 3-channel BGR frame
+def as_bgr(image):
+    return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR) if image.ndim == 2 else image
+
+
+# Registry name of a model file: prefix plus the normalized absolute path
+def model_key(prefix, path):
+    return f'{prefix}:{os.path.normcase(os.path.abspath(path))}'
+
+
+# The boxes between minSize and maxSize ((0, 0) = no upper limit), like detectMultiScale
+def within_size(boxes, min_size=(0, 0), max_size=(0, 0)):
+    keep = (boxes[:, 2] >= min_size[0]) & (boxes[:, 3] >= min_size[1])
+    if max_size and max_size[0]:
+        keep &= (boxes[:, 2] <= max_size[0]) & (boxes[:, 3] <= max_size[1])
+    return boxes[keep]
+
+
+class CascadeFaceDetector:
+    backend = 'haar'
+    color = False
+
+    # model: cascade XML path (None uses the registry's 'face' cascade)
+    def __init__(self, model=None, scale_factor=1.1, min_neighbors=5, min_size=(30, 30)):
+        if model is None:
+            self.name = 'face'
+        else:
+            if not os.path.isfile(model):
+                raise IOError(f"Cascade file not found: {model}")
+            self.name = model_key('face', model)
+            detectors.register_cascade(self.name, model)
+        self.cascade = detectors.get(self.name)
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = tuple(min_size)
+
+    def detectMultiScale(self, image, scaleFactor=1.1, minNeighbors=3, flags=0, minSize=(0, 0), maxSize=(0, 0)):
+        return self.cascade.detectMultiScale(as_gray(image), scaleFactor=scaleFactor, minNeighbors=minNeighbors,
+                                             flags=flags, minSize=tuple(minSize), maxSize=tuple(maxSize))
+
+    # Faces with the detector's own settings, as an (N, 4) int32 array
+    def detect(self, image):
+        faces = self.detectMultiScale(image, self.scale_factor, self.min_neighbors, minSize=self.min_size)
+        return np.asarray(faces, dtype=np.int32).reshape(-1, 4)
+
+
+class LbpFaceDetector(CascadeFaceDetector):
+    backend = 'lbp'
+
+    def __init__(self, model=None, scale_factor=1.1, min_neighbors=5, min_size=(30, 30)):
+        if model is None:
+            raise IOError("The LBP backend needs a cascade file, e.g. lbpcascade_frontalface_improved.xml")
+        super().__init__(model, scale_factor, min_neighbors, min_size)
+
+
+# Read a cv2.dnn network; a Caffe model needs its .prototxt as config
+def load_net(model, config=None):
+    for path in (model, config):
+        if path and not os.path.isfile(path):
+            raise IOError(f"Model file not found: {path}")
+    try:
+        return cv2.dnn.readNet(model, config or '')
+    except cv2.error as error:
+        raise IOError(f"Could not read model {model}: {' '.join(str(error).split())}") from error
+
+
+class DnnFaceDetector:
+    backend = 'dnn'
+    color = True
+
+    # input_size and mean match the OpenCV res10 SSD face model; confidence is the
+    # lowest score kept
+    def __init__(self, model=None, config=None, input_size=(300, 300), mean=(104.0, 177.0, 123.0),
+                 confidence=0.5, swap_rb=False):
+        if model is None:
+            raise IOError("The DNN backend needs a model file, e.g. face.onnx or res10_300x300_ssd_iter_140000.caffemodel")
+        self.name = model_key('face-dnn', model)
+        if config:
+            self.name += '|' + model_key('config', config)
+        detectors.register(self.name, lambda: load_net(model, config))
+        self.net = detectors.get(self.name)
+        self.input_size = tuple(input_size)
+        self.mean = mean
+        self.confidence = confidence
+        self.swap_rb = swap_rb
+
+    # Faces and their scores, as an (N, 4) int32 array and an (N,) float array
+    def detect_with_scores(self, image):
+        return self.detect_batch([image])[0]
+
+    # (boxes, scores) for every image, from one forward pass over a blobFromImages batch.
+    # Each SSD output row carries the index of its image, which routes it back
+    def detect_batch(self, images):
+        images = [as_bgr(image) for image in images]
+        blob = cv2.dnn.blobFromImages(images, 1.0, self.input_size, self.mean, swapRB=self.swap_rb, crop=False)
+        self.net.setInput(blob)
+        rows = self.net.forward().reshape(-1, 7)
+        return [self.parse(rows[rows[:, 0] == index], image.shape) for index, image in enumerate(images)]
+
+    # SSD output rows (image_id, label, score, x0, y0, x1, y1), corners relative to the frame
+    def parse(self, output, shape):
+        height, width = shape[:2]
+        rows = output.reshape(-1, 7)
+        rows = rows[rows[:, 2] >= self.confidence]
+        corners = np.clip(rows[:, 3:7], 0.0, 1.0) * (width, height, width, height)
+        boxes = np.rint(np.column_stack([corners[:, :2], corners[:, 2:] - corners[:, :2]])).astype(np.int32)
+        keep = (boxes[:, 2] > 0) & (boxes[:, 3] > 0)
+        return boxes[keep], rows[keep, 2]
+
+    def detect(self, image):
+        return self.detect_with_scores(image)[0]
+
+    def detectMultiScale(self, image, scaleFactor=1.1, minNeighbors=3, flags=0, minSize=(0, 0), maxSize=(0, 0)):
+        return within_size(self.detect(image), minSize, maxSize)
+
+
+BACKENDS = {'haar': CascadeFaceDetector, 'lbp': LbpFaceDetector, 'dnn': DnnFaceDetector}
+
+
+# A face detector backend by name; model/config are file paths (see the backends above)
+def create_face_detector(backend, model=None, config=None, **options):
+    if backend == 'dnn':
+        return DnnFaceDetector(model, config, **options)
+    return BACKENDS[backend](model, **options)
+
+
+# Add the face detector backend options to a face lab's command line parser
+def add_detector_args(parser):
+    parser.add_argument('--detector', default='haar', choices=list(BACKENDS),
+                        help='Face detector backend')
+    parser.add_argument('--detector-model', help='Cascade XML (haar, lbp) or network file (dnn) for the backend')
+    parser.add_argument('--detector-config', help='Network config for the dnn backend (e.g. a Caffe .prototxt)')
+    parser.add_argument('--detector-confidence', type=float, default=0.5,
+                        help='Lowest face score kept by the dnn backend')
+    return parser
+
+
+# The backend chosen on the command line; exits with a message if its model cannot be loaded
+def face_backend_from_args(args):
+    if getattr(args, 'tiles', None) and args.detector == 'dnn':
+        print("Error: --tiles works with the cascade backends (haar, lbp) only")
+        raise SystemExit(1)
+    options = {'confidence': args.detector_confidence} if args.detector == 'dnn' else {}
+    try:
+        return create_face_detector(args.detector, args.detector_model, args.detector_config, **options)
+    except IOError as error:
+        print(f"Error: {error}")
+        raise SystemExit(1)
@@ -0,0 +1,137 @@
+# Detect-Then-Track Face Pipeline
+# Running the Haar cascade on every frame dominates the CPU time of the face labs.
+# DetectThenTrack runs the cascade only every N frames, and immediately when tracking
+# confidence drops. In between it follows each face by template matching in a small
+# search window around its last position. Matching works on a downscaled copy of the
+# window and the face, so it costs a fraction of a millisecond per face.
+# N adapts to the measured cascade latency: the cascade's cost averaged over N frames
+# stays within detect_budget_ms per frame. A fast cascade runs on every frame and a
+# slow one runs every few frames, between min_interval and max_interval.
+# update() returns the same (N, 4) array of x, y, w, h boxes as detectMultiScale, so
+# the labs' attention and eye masking logic work unchanged.
+
+import math
+import time
+
+import cv2
+import numpy as np
+
+from instrumentation import profiler
+
+# Faces are matched at this template width (pixels) whatever their size in the frame
+TEMPLATE_WIDTH = 32
+
+
+class DetectThenTrack:
+    # detect(gray_frame) returns face boxes (e.g. a bound detectMultiScale call)
+    def __init__(self, detect, detect_budget_ms=5.0, min_interval=1, max_interval=30,
+                 search_margin=0.5, min_score=0.6, interval=None):
+        self.detect = detect
+        self.detect_budget_ms = detect_budget_ms
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.search_margin = search_margin
+        self.min_score = min_score
+        # A fixed interval disables the adaptation
+        self.fixed_interval = interval
+        self.interval = interval or min_interval
+
+        self.boxes = np.empty((0, 4), dtype=np.int32)
+        self.templates = []
+        self.scores = np.empty(0, dtype=np.float32)
+        self.frames_since_detection = None
+        self.detect_ms = None
+
+        self.detections = 0
+        self.tracked_frames = 0
+        self.redetections = 0
+
+    # Face boxes for the next frame of the sequence
+    def update(self, gray_frame):
+        # With no faces the interval still applies, so an empty scene is not scanned on every frame
+        due = self.frames_since_detection is None or self.frames_since_detection >= self.interval
+        if not due:
+            with profiler.stage('track'):
+                tracked = self._track(gray_frame)
+            if tracked:
+                self.frames_since_detection += 1
+                self.tracked_frames += 1
+                return self.boxes
+            # A face was lost: find it again with the cascade right away
+            self.redetections += 1
+        return self._detect(gray_frame)
+
+    def _detect(self, gray_frame):
+        t0 = time.perf_counter()
+        faces = self.detect(gray_frame)
+        elapsed_ms = (time.perf_counter() - t0) * 1000.0
+        profiler.record('cascade', elapsed_ms)
+
+        self.detections += 1
+        self.frames_since_detection = 1
+        self.detect_ms = elapsed_ms if self.detect_ms is None else 0.8 * self.detect_ms + 0.2 * elapsed_ms
+        if self.fixed_interval is None:
+            interval = math.ceil(self.detect_ms / self.detect_budget_ms) if self.detect_budget_ms > 0 else 1
+            self.interval = min(max(interval, self.min_interval), self.max_interval)
+
+        self.boxes = np.asarray(faces, dtype=np.int32).reshape(-1, 4)
+        self.templates = [self._template(gray_frame, box) for box in self.boxes]
+        self.scores = np.ones(len(self.boxes), dtype=np.float32)
+        return self.boxes
+
+    # Downscaled face patch used as the matching template
+    def _template(self, gray_frame, box):
+        x, y, w, h = box
+        scale = min(1.0, TEMPLATE_WIDTH / w)
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        return scale, cv2.resize(gray_frame[y:y+h, x:x+w], size, interpolation=cv2.INTER_AREA)
+
+    # Move every box to its best match inside its search window; False if any face was lost
+    def _track(self, gray_frame):
+        frame_height, frame_width = gray_frame.shape[:2]
+        boxes = self.boxes.copy()
+        for index, (box, (scale, template)) in enumerate(zip(self.boxes, self.templates)):
+            x, y, w, h = box
+            margin_x = int(w * self.search_margin)
+            margin_y = int(h * self.search_margin)
+            x0, y0 = max(0, x - margin_x), max(0, y - margin_y)
+            x1, y1 = min(frame_width, x + w + margin_x), min(frame_height, y + h + margin_y)
+
+            window_size = (round((x1 - x0) * scale), round((y1 - y0) * scale))
+            if window_size[0] < template.shape[1] or window_size[1] < template.shape[0]:
+                return False
+            window = cv2.resize(gray_frame[y0:y1, x0:x1], window_size, interpolation=cv2.INTER_AREA)
+
+            result = cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED)
+            _, score, _, (best_x, best_y) = cv2.minMaxLoc(result)
+            if score < self.min_score:
+                return False
+            boxes[index, 0] = x0 + round(best_x / scale)
+            boxes[index, 1] = y0 + round(best_y / scale)
+            self.scores[index] = score
+
+        self.boxes = boxes
+        return True
+
+    # Fraction of frames on which the cascade ran
+    def detection_rate(self):
+        frames = self.detections + self.tracked_frames
+        return self.detections / frames if frames else 0.0
+
+
+# Add the detect-then-track options to a face lab's command line parser
+def add_tracking_args(parser):
+    parser.add_argument('--track', action='store_true',
+                        help='Run the face cascade every few frames and track the faces in between')
+    parser.add_argument('--detect-budget', type=float, default=5.0,
+                        help='Cascade time per frame (ms, averaged over the interval) that sets the detection interval')
+    parser.add_argument('--detect-interval', type=int, default=None,
+                        help='Run the cascade every this many frames instead of adapting the interval')
+    return parser
+
+
+# Face detection function for a lab: detect itself, or a tracker's update with --track
+def face_detector_from_args(detect, args):
+    if not args.track:
+        return detect
+    return DetectThenTrack(detect, detect_budget_ms=args.detect_budget, interval=args.detect_interval).update
@@ -0,0 +1,200 @@
+# Threaded Frame Grabber
+# Every lab used to call cap.read() at the top of its main loop, so camera latency
+# added up with processing time and unread frames piled up inside the driver.
+# FrameGrabber reads frames on a background thread into a small ring buffer that
+# drops the oldest frame when it is full. The main loop always gets the newest frame,
+# and the grabber counts how many frames were dropped along the way.
+# It works the same way with a webcam, a video file, a directory of images or a
+# synthetic source, so the labs can also run on machines without a camera.
+
+import collections
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# File extensions that are read as still images instead of video
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff')
+
+
+# Frame source that plays a list of image files like a video
+class ImageSequenceSource:
+    def __init__(self, paths):
+        self.paths = list(paths)
+        self.index = 0
+
+    def isOpened(self):
+        return self.index < len(self.paths)
+
+    def read(self):
+        # Skip files that cannot be decoded instead of ending the sequence
+        while self.index < len(self.paths):
+            frame = cv2.imread(self.paths[self.index])
+            self.index += 1
+            if frame is not None:
+                return True, frame
+        return False, None
+
+    def get(self, prop_id):
+        if prop_id == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self.paths))
+        if prop_id == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.index)
+        return 0.0
+
+    def release(self):
+        self.index = len(self.paths)
+
+
+# Deterministic synthetic frame source (gradient background with a moving square)
+class SyntheticSource:
+    def __init__(self, width=640, height=480, num_frames=None, seed=0):
+        self.width = width
+        self.height = height
+        self.num_frames = num_frames
+        self.index = 0
+
+        # Build a fixed noisy gradient once so every run produces the same frames
+        rng = np.random.default_rng(seed)
+        gradient = np.linspace(0, 255, width, dtype=np.float32)
+        background = np.empty((height, width, 3), dtype=np.float32)
+        background[:] = gradient[None, :, None]
+        background += rng.normal(0, 8, size=background.shape)
+        self.background = np.clip(background, 0, 255).astype(np.uint8)
+
+    def isOpened(self):
+        return self.num_frames is None or self.index < self.num_frames
+
+    def read(self):
+        if not self.isOpened():
+            return False, None
+
+        # Move a square across the frame so consecutive frames differ
+        frame = self.background.copy()
+        size = max(8, min(self.width, self.height) // 6)
+        x = (self.index * 7) % max(1, self.width - size)
+        y = (self.index * 3) % max(1, self.height - size)
+        cv2.rectangle(frame, (x, y), (x + size, y + size), (255, 120, 0), -1)
+        self.index += 1
+        return True, frame
+
+    def get(self, prop_id):
+        if prop_id == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop_id == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop_id == cv2.CAP_PROP_FRAME_COUNT and self.num_frames is not None:
+            return float(self.num_frames)
+        if prop_id == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.index)
+        return 0.0
+
+    def release(self):
+        self.num_frames = self.index
+
+
+# Open a camera index, video file, image file, image directory or source object
+def open_source(source):
+    # Anything with a read() method (VideoCapture, SyntheticSource, ...) is used as is
+    if hasattr(source, 'read'):
+        return source
+
+    if isinstance(source, int) or (isinstance(source, str) and source.isdigit()):
+        return cv2.VideoCapture(int(source))
+
+    if os.path.isdir(source):
+        names = sorted(name for name in os.listdir(source) if name.lower().endswith(IMAGE_EXTENSIONS))
+        return ImageSequenceSource(os.path.join(source, name) for name in names)
+
+    if source.lower().endswith(IMAGE_EXTENSIONS):
+        return ImageSequenceSource([source])
+
+    return cv2.VideoCapture(source)
+
+
+# Background capture thread with a drop-oldest ring buffer
+class FrameGrabber:
+    def __init__(self, source=0, buffer_size=2, fps=None):
+        self.cap = open_source(source)
+        self.buffer = collections.deque(maxlen=buffer_size)
+        self.condition = threading.Condition()
+
+        # Frames read from the source and frames discarded without being consumed
+        self.grabbed = 0
+        self.dropped = 0
+
+        # Optional pacing, e.g. to play a video file at camera speed
+        self.frame_interval = 1.0 / fps if fps else 0.0
+
+        self.running = self.cap.isOpened()
+        self.thread = threading.Thread(target=self._grab_loop, daemon=True)
+        if self.running:
+            self.thread.start()
+
+    # Keep reading frames until the source ends or release() is called
+    def _grab_loop(self):
+        next_time = time.perf_counter()
+        while self.running:
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+
+            with self.condition:
+                # A full deque silently discards its oldest frame on append
+                if len(self.buffer) == self.buffer.maxlen:
+                    self.dropped += 1
+                self.buffer.append(frame)
+                self.grabbed += 1
+                self.condition.notify()
+
+            if self.frame_interval:
+                next_time += self.frame_interval
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_time = time.perf_counter()
+
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    def isOpened(self):
+        return self.running or len(self.buffer) > 0
+
+    # Same contract as cv2.VideoCapture.read(): returns (ret, frame)
+    # With latest=True the newest frame is returned and older buffered frames are dropped;
+    # with latest=False frames are returned oldest first
+    def read(self, latest=True, timeout=None):
+        with self.condition:
+            self.condition.wait_for(lambda: self.buffer or not self.running, timeout)
+            if not self.buffer:
+                return False, None
+
+            if latest:
+                frame = self.buffer.pop()
+                self.dropped += len(self.buffer)
+                self.buffer.clear()
+            else:
+                frame = self.buffer.popleft()
+            return True, frame
+
+    def get(self, prop_id):
+        return self.cap.get(prop_id)
+
+    # Stop the capture thread and release the underlying source
+    def release(self):
+        self.running = False
+        if self.thread.is_alive():
+            self.thread.join()
+        self.cap.release()
+        with self.condition:
+            self.buffer.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
@@ -0,0 +1,176 @@
+# Headless Batch Mode
+# Runs a lab's per-frame processing function over a video file, an image file or a
+# directory of images without opening any window. This is how the labs run on edge
+# boxes with no display. It also measures throughput without the cv2.waitKey(1) sleep
+# and GUI event handling that every interactive loop pays for on each frame.
+# The annotated frames go to a video file, or the per-frame results go to a CSV/JSON
+# lines file. Frames/s and per-frame latency are printed when the run finishes.
+
+import argparse
+import csv
+import json
+import time
+
+import cv2
+import numpy as np
+
+from frame_grabber import open_source
+from instrumentation import add_profiler_args, profiler
+
+# Output extensions written with cv2.VideoWriter, and the codec used for each
+VIDEO_CODECS = {'.mp4': 'mp4v', '.avi': 'MJPG', '.mov': 'mp4v', '.mkv': 'mp4v'}
+
+
+# Build the command line parser shared by every lab; labs add their own options to it
+def lab_arg_parser(description):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--source', help='Video file, image file or image directory to process headless (no GUI)')
+    parser.add_argument('--output', help='Annotated video (.mp4/.avi/.mov/.mkv) or results file (.csv/.jsonl)')
+    parser.add_argument('--max-frames', type=int, default=None, help='Stop after this many frames')
+    add_profiler_args(parser)
+    return parser
+
+
+# Convert NumPy values in a per-frame result into plain JSON types
+def to_jsonable(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    if isinstance(value, dict):
+        return {key: to_jsonable(item) for key, item in value.items()}
+    return value
+
+
+# Summarize a list of per-frame latencies (in milliseconds)
+def latency_summary(latencies_ms):
+    samples = np.asarray(latencies_ms, dtype=np.float64)
+    if samples.size == 0:
+        return {'frames': 0}
+    mean = float(samples.mean())
+    return {
+        'frames': int(samples.size),
+        'min_ms': float(samples.min()),
+        'mean_ms': mean,
+        'median_ms': float(np.median(samples)),
+        'p95_ms': float(np.percentile(samples, 95)),
+        'p99_ms': float(np.percentile(samples, 99)),
+        'max_ms': float(samples.max()),
+        'fps': 1000.0 / mean if mean > 0 else float('inf'),
+    }
+
+
+# Writes either annotated frames to a video file or per-frame results to a text file
+class OutputWriter:
+    def __init__(self, path, fps=30.0):
+        self.path = path
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.extension = path.lower()[path.rfind('.'):] if path and '.' in path else ''
+        self.video = None
+        self.frame_size = None
+        self.file = None
+        self.csv_writer = None
+
+        if path is None:
+            return
+        if self.extension == '.csv':
+            self.file = open(path, 'w', newline='')
+            self.csv_writer = csv.writer(self.file)
+            self.csv_writer.writerow(['frame', 'latency_ms', 'result'])
+        elif self.extension == '.jsonl':
+            self.file = open(path, 'w')
+        elif self.extension not in VIDEO_CODECS:
+            raise ValueError(f"Unsupported output type: {path}")
+
+    def write(self, index, frame, result, latency_ms):
+        if self.extension in VIDEO_CODECS:
+            self._write_frame(frame)
+        elif self.csv_writer is not None:
+            self.csv_writer.writerow([index, f"{latency_ms:.3f}", json.dumps(to_jsonable(result))])
+        elif self.file is not None:
+            record = {'frame': index, 'latency_ms': round(latency_ms, 3), 'result': to_jsonable(result)}
+            self.file.write(json.dumps(record) + '\n')
+
+    def _write_frame(self, frame):
+        # Video files need 3-channel frames of one fixed size
+        if frame.ndim == 2:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        if self.video is None:
+            self.frame_size = (frame.shape[1], frame.shape[0])
+            fourcc = cv2.VideoWriter_fourcc(*VIDEO_CODECS[self.extension])
+            self.video = cv2.VideoWriter(self.path, fourcc, self.fps, self.frame_size)
+        if (frame.shape[1], frame.shape[0]) != self.frame_size:
+            frame = cv2.resize(frame, self.frame_size)
+        self.video.write(frame)
+
+    def close(self):
+        if self.video is not None:
+            self.video.release()
+        if self.file is not None:
+            self.file.close()
+
+
+# Frame rate of a source, or default when it has none (image files and directories)
+def source_fps(source, default=30.0):
+    cap = open_source(source)
+    fps = cap.get(cv2.CAP_PROP_FPS) if cap.isOpened() else 0.0
+    cap.release()
+    return fps if fps and fps > 0 else default
+
+
+# Run process(frame) over every frame of the source without any GUI
+# process returns either the annotated frame or a tuple (annotated_frame, result)
+def run_headless(process, source, output=None, max_frames=None):
+    cap = open_source(source)
+    if not cap.isOpened():
+        print(f"Error: Could not open source {source}")
+        return None
+
+    writer = OutputWriter(output, cap.get(cv2.CAP_PROP_FPS))
+    latencies = []
+    start_time = time.perf_counter()
+
+    try:
+        while max_frames is None or len(latencies) < max_frames:
+            with profiler.stage('capture'):
+                ret, frame = cap.read()
+            if not ret:
+                break
+
+            # Only the processing call is timed; decoding and writing are excluded
+            t0 = time.perf_counter()
+            processed = process(frame)
+            latency_ms = (time.perf_counter() - t0) * 1000.0
+            profiler.record('process', latency_ms)
+
+            if isinstance(processed, tuple):
+                processed, result = processed
+            else:
+                result = None
+
+            with profiler.stage('write'):
+                writer.write(len(latencies), processed, result, latency_ms)
+            latencies.append(latency_ms)
+            profiler.frame_done()
+    finally:
+        cap.release()
+        writer.close()
+        profiler.close()
+
+    elapsed = time.perf_counter() - start_time
+    stats = latency_summary(latencies)
+    stats['wall_fps'] = len(latencies) / elapsed if elapsed > 0 else 0.0
+
+    if latencies:
+        print(f"Processed {stats['frames']} frames in {elapsed:.2f} s "
+              f"({stats['wall_fps']:.1f} frames/s including I/O)")
+        print(f"Per-frame latency: mean {stats['mean_ms']:.2f} ms, median {stats['median_ms']:.2f} ms, "
+              f"p95 {stats['p95_ms']:.2f} ms, max {stats['max_ms']:.2f} ms "
+              f"({stats['fps']:.1f} frames/s processing only)")
+    else:
+        print("No frames were processed")
+    if output:
+        print(f"Output written to {output}")
+    return stats
@@ -0,0 +1,134 @@
+# Multi-Face Identity Tracker
+# Lab8 used to follow a single face (faces[0]) and a single last-seen time, which cannot
+# monitor a classroom of 30-40 students. IdentityTracker gives every face (seat) its own
+# ID and matches each frame's detections to the known seats. The matching cost is
+# 1 - IoU plus the centroid distance in face widths, computed for all seat/detection
+# pairs at once with NumPy. Pairs that are each other's cheapest partner are matched
+# together; the leftovers are matched again until nothing changes, which takes one or
+# two rounds for faces that do not overlap.
+# Seat state is kept in flat arrays (one row per seat): ID, last box, first and last
+# seen time. A seat keeps its last box while its face is missing, so the face is matched
+# back to the same ID when it returns. absent() flags every seat whose face has not been
+# seen for longer than a threshold, each seat independently.
+
+import numpy as np
+
+from boxes import as_boxes, iou_matrix
+
+
+class IdentityTracker:
+    # max_shift: largest centroid move (in face widths) between two sightings of a face
+    # forget_after: seconds after which an absent seat is dropped (None keeps it forever)
+    def __init__(self, max_shift=1.0, forget_after=None, capacity=64):
+        self.max_shift = max_shift
+        self.forget_after = forget_after
+        self.next_id = 0
+
+        self.count = 0
+        self.ids = np.empty(capacity, dtype=np.int64)
+        self.boxes = np.empty((capacity, 4), dtype=np.float64)
+        self.first_seen = np.empty(capacity, dtype=np.float64)
+        self.last_seen = np.empty(capacity, dtype=np.float64)
+
+    def __len__(self):
+        return self.count
+
+    # Match the detections of one frame (seen at time now) to the seats
+    # Returns the seat ID of every detection, in detection order
+    def update(self, faces, now):
+        detections = as_boxes(faces)
+        assigned = np.full(len(detections), -1, dtype=np.int64)
+
+        if self.count and len(detections):
+            seats, matches = self._associate(detections)
+            self.boxes[seats] = detections[matches]
+            self.last_seen[seats] = now
+            assigned[matches] = self.ids[seats]
+
+        # Detections that matched no seat start a new one
+        for index in np.flatnonzero(assigned < 0):
+            assigned[index] = self._add(detections[index], now)
+
+        if self.forget_after is not None:
+            self._forget(now)
+        return assigned
+
+    # Cost of every (seat, detection) pair; pairs that moved too far cost infinity
+    def cost_matrix(self, detections):
+        seats = self.boxes[:self.count]
+        seat_centers = seats[:, :2] + seats[:, 2:] / 2
+        detection_centers = detections[:, :2] + detections[:, 2:] / 2
+        distance = np.linalg.norm(seat_centers[:, None, :] - detection_centers[None, :, :], axis=2)
+        shift = distance / np.maximum(seats[:, 2:3], 1.0)
+
+        cost = 1.0 - iou_matrix(seats, detections) + shift
+        cost[shift > self.max_shift] = np.inf
+        return cost
+
+    # Mutual-best matching on the cost matrix; returns matched (seat rows, detection indices)
+    def _associate(self, detections):
+        cost = self.cost_matrix(detections)
+        seat_rows = []
+        detection_columns = []
+        rows = np.arange(cost.shape[0])
+        while cost.size and np.isfinite(cost).any():
+            best_detection = cost.argmin(axis=1)
+            best_seat = cost.argmin(axis=0)
+            mutual = best_seat[best_detection] == rows
+            mutual &= np.isfinite(cost[rows, best_detection])
+            if not mutual.any():
+                break
+            matched_rows = rows[mutual]
+            matched_columns = best_detection[mutual]
+            seat_rows.append(matched_rows)
+            detection_columns.append(matched_columns)
+            cost[matched_rows, :] = np.inf
+            cost[:, matched_columns] = np.inf
+
+        if not seat_rows:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+        return np.concatenate(seat_rows), np.concatenate(detection_columns)
+
+    def _add(self, box, now):
+        if self.count == len(self.ids):
+            self._grow()
+        row = self.count
+        self.ids[row] = self.next_id
+        self.boxes[row] = box
+        self.first_seen[row] = now
+        self.last_seen[row] = now
+        self.count += 1
+        self.next_id += 1
+        return self.ids[row]
+
+    def _grow(self):
+        capacity = 2 * len(self.ids)
+        for name in ('ids', 'boxes', 'first_seen', 'last_seen'):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    # Drop seats that have been absent for longer than forget_after
+    def _forget(self, now):
+        keep = np.flatnonzero(now - self.last_seen[:self.count] <= self.forget_after)
+        if len(keep) == self.count:
+            return
+        for name in ('ids', 'boxes', 'first_seen', 'last_seen'):
+            array = getattr(self, name)
+            array[:len(keep)] = array[keep]
+        self.count = len(keep)
+
+    # Seconds since each seat's face was last seen
+    def absence(self, now):
+        return now - self.last_seen[:self.count]
+
+    # Boolean mask of seats whose face has been missing for longer than threshold seconds
+    def absent(self, now, threshold):
+        return self.absence(now) > threshold
+
+    # Per-seat state as plain records: [{'id', 'box', 'absent_s'}, ...]
+    def seats(self, now):
+        absence = self.absence(now)
+        return [{'id': int(self.ids[row]), 'box': self.boxes[row].astype(int).tolist(),
+                 'absent_s': round(float(absence[row]), 3)} for row in range(self.count)]
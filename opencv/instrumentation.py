@@ -0,0 +1,208 @@
+# Per-Stage Latency Instrumentation
+# When a lab stutters, this shows which stage is responsible: capture, colour
+# conversion, detection, drawing or imshow. The main loops wrap each stage in
+# "with profiler.stage('name'):". When profiling is off, stage() returns a shared
+# no-op context, so the hooks cost one attribute check.
+# When profiling is on, the profiler keeps the last `window` timings of every stage
+# (a rolling histogram) and reports p50/p95/p99. It can draw FPS and per-stage
+# milliseconds onto the displayed frame. It can also rewrite a CSV or Prometheus
+# text-format file every few seconds for a local scraper to read. The Prometheus file
+# follows the summary conventions: latencies in seconds, quantiles over the recent
+# window, and _sum/_count cumulative since the start, so they only ever grow.
+# The command line options come from add_profiler_args(); every lab has them:
+#   --profile                 collect timings and print a summary at exit
+#   --profile-overlay         draw FPS and per-stage ms onto the displayed frame
+#   --profile-out FILE        write the numbers to FILE (.prom = Prometheus text, else CSV)
+#   --profile-interval SECS   how often FILE is rewritten
+
+import collections
+import csv
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+
+# Context manager returned by stage() while profiling is off
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NULL_STAGE = _NullStage()
+
+
+# Sample window (ms) of one stage, plus the count and total of every sample since the start
+class _StageSamples(collections.deque):
+    def __init__(self, window):
+        super().__init__(maxlen=window)
+        self.total_count = 0
+        self.total_ms = 0.0
+
+    def append(self, elapsed_ms):
+        super().append(elapsed_ms)
+        self.total_count += 1
+        self.total_ms += elapsed_ms
+
+
+# Context manager that appends the elapsed time (ms) to a stage's sample window
+class _StageTimer:
+    __slots__ = ('samples', 'start')
+
+    def __init__(self, samples):
+        self.samples = samples
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.samples.append((time.perf_counter() - self.start) * 1000.0)
+        return False
+
+
+class StageProfiler:
+    def __init__(self, window=300):
+        self.enabled = False
+        self.overlay = False
+        self.export_path = None
+        self.flush_interval = 5.0
+        self.name = 'lab'
+        self.window = window
+        self.samples = {}
+        self.frame_times = collections.deque(maxlen=window)
+        self.last_flush = time.monotonic()
+
+    # Switch profiling on from the parsed command line options
+    def configure(self, args, name=None):
+        self.overlay = args.profile_overlay
+        self.export_path = args.profile_out
+        self.flush_interval = args.profile_interval
+        self.enabled = args.profile or self.overlay or self.export_path is not None
+        self.name = name or os.path.splitext(os.path.basename(sys.argv[0]))[0] or 'lab'
+
+    # Time a block: with profiler.stage('detect'): ...
+    def stage(self, name):
+        if not self.enabled:
+            return NULL_STAGE
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = _StageSamples(self.window)
+        return _StageTimer(samples)
+
+    # Record a timing measured elsewhere (ms)
+    def record(self, name, elapsed_ms):
+        if not self.enabled:
+            return
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples[name] = _StageSamples(self.window)
+        samples.append(elapsed_ms)
+
+    # Mark the end of one loop iteration (for FPS) and rewrite the export file when due
+    def frame_done(self):
+        if not self.enabled:
+            return
+        self.frame_times.append(time.perf_counter())
+        if self.export_path and time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    # Frames per second over the recent window
+    def fps(self):
+        if len(self.frame_times) < 2:
+            return 0.0
+        elapsed = self.frame_times[-1] - self.frame_times[0]
+        return (len(self.frame_times) - 1) / elapsed if elapsed > 0 else 0.0
+
+    # Rolling statistics per stage: {stage: {'count', 'mean', 'p50', 'p95', 'p99'}} (ms),
+    # plus 'total_count' and 'total_ms' over every sample since the start
+    def summary(self):
+        stats = {}
+        for name, samples in self.samples.items():
+            if not samples:
+                continue
+            values = np.fromiter(samples, dtype=np.float64, count=len(samples))
+            p50, p95, p99 = np.percentile(values, (50, 95, 99))
+            stats[name] = {'count': len(values), 'mean': float(values.mean()),
+                           'p50': float(p50), 'p95': float(p95), 'p99': float(p99),
+                           'total_count': samples.total_count, 'total_ms': samples.total_ms}
+        return stats
+
+    # Draw FPS and per-stage p50/p95 in the bottom-left corner of image (in place), away
+    # from the counters the labs draw at the top
+    def draw_overlay(self, image):
+        if not (self.enabled and self.overlay):
+            return image
+        lines = [f"FPS {self.fps():.1f}"]
+        for name, stats in self.summary().items():
+            lines.append(f"{name} {stats['p50']:.1f} ms (p95 {stats['p95']:.1f})")
+
+        color = (0, 255, 255) if image.ndim == 3 else 255
+        top = image.shape[0] - 10 - (len(lines) - 1) * 18
+        for row, line in enumerate(lines):
+            y = top + row * 18
+            cv2.putText(image, line, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, 0, 3)
+            cv2.putText(image, line, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+        return image
+
+    # Rewrite the export file (atomically, so a scraper never reads a partial file)
+    def flush(self):
+        self.last_flush = time.monotonic()
+        if not self.export_path:
+            return
+        temp_path = self.export_path + '.tmp'
+        with open(temp_path, 'w', newline='') as file:
+            if self.export_path.endswith('.prom'):
+                self._write_prometheus(file)
+            else:
+                self._write_csv(file)
+        os.replace(temp_path, self.export_path)
+
+    def _write_csv(self, file):
+        writer = csv.writer(file)
+        writer.writerow(['timestamp', 'lab', 'stage', 'count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms'])
+        timestamp = f"{time.time():.3f}"
+        for name, stats in self.summary().items():
+            writer.writerow([timestamp, self.name, name, stats['count'], f"{stats['mean']:.3f}",
+                             f"{stats['p50']:.3f}", f"{stats['p95']:.3f}", f"{stats['p99']:.3f}"])
+        writer.writerow([timestamp, self.name, 'fps', len(self.frame_times), f"{self.fps():.3f}", '', '', ''])
+
+    def _write_prometheus(self, file):
+        file.write("# HELP lab_stage_latency_seconds Per-stage latency in seconds (quantiles over the recent window)\n")
+        file.write("# TYPE lab_stage_latency_seconds summary\n")
+        for name, stats in self.summary().items():
+            labels = f'lab="{self.name}",stage="{name}"'
+            for quantile, key in (('0.5', 'p50'), ('0.95', 'p95'), ('0.99', 'p99')):
+                file.write(f'lab_stage_latency_seconds{{{labels},quantile="{quantile}"}} {stats[key] / 1000.0:.6f}\n')
+            file.write(f"lab_stage_latency_seconds_sum{{{labels}}} {stats['total_ms'] / 1000.0:.6f}\n")
+            file.write(f"lab_stage_latency_seconds_count{{{labels}}} {stats['total_count']}\n")
+        file.write("# HELP lab_fps Frames per second over the recent window\n")
+        file.write("# TYPE lab_fps gauge\n")
+        file.write(f'lab_fps{{lab="{self.name}"}} {self.fps():.3f}\n')
+
+    # Print the per-stage summary and write the export file one last time
+    def close(self):
+        if not self.enabled:
+            return
+        print(f"Stage latency over the most recent {self.window} frames at most (FPS {self.fps():.1f}):")
+        for name, stats in self.summary().items():
+            print(f"  {name:<12} p50 {stats['p50']:7.2f} ms   p95 {stats['p95']:7.2f} ms   p99 {stats['p99']:7.2f} ms")
+        self.flush()
+
+
+# Add the profiling options to a lab's command line parser
+def add_profiler_args(parser):
+    parser.add_argument('--profile', action='store_true', help='Collect per-stage timings and print them at exit')
+    parser.add_argument('--profile-overlay', action='store_true', help='Draw FPS and per-stage ms onto the frame')
+    parser.add_argument('--profile-out', help='Write per-stage timings to this file (.prom = Prometheus text, else CSV)')
+    parser.add_argument('--profile-interval', type=float, default=5.0, help='Seconds between --profile-out rewrites')
+    return parser
+
+
+# Profiler shared by the whole process
+profiler = StageProfiler()
@@ -1,82 +1,124 @@
 import cv2
-import numpy as np
+
+from frame_grabber import FrameGrabber
+from compositor import Compositor
+from filters import BlurStage, BrightnessContrastStage, FilterPipeline, SharpenStage
+from headless import lab_arg_parser, run_headless
+from instrumentation import profiler
 
 # Function to adjust brightness and contrast
 def adjust_brightness_contrast(image, brightness=0, contrast=1.0):
-    return cv2.convertScaleAbs(image, alpha=contrast, beta=brightness)
+    return BrightnessContrastStage(brightness, contrast).apply(image)
 
 # Function to apply smoothing (blurring)
 def apply_smoothing(image, blur_strength=1):
     if blur_strength > 0:
-        return cv2.GaussianBlur(image, (2 * blur_strength + 1, 2 * blur_strength + 1), 0)
+        return BlurStage(2 * blur_strength + 1).apply(image)
     else:
         return image
 
 # Function to apply sharpening
 def apply_sharpening(image):
-    kernel = np.array([[0, -1, 0],
-                       [-1, 5, -1],
-                       [0, -1, 0]])
-    return cv2.filter2D(image, -1, kernel)
+    return SharpenStage().apply(image)
 
 # Callback functions for trackbars (dummy function, trackbars will update via getTrackbarPos)
 def on_trackbar_change(val):
     pass
 
-# Setup the OpenCV window with trackbars
-cv2.namedWindow('Adjustments')
-
-# Create trackbars for brightness, contrast, blur strength, and sharpening
-cv2.createTrackbar('Brightness', 'Adjustments', 50, 100, on_trackbar_change)  # Default brightness 50
-cv2.createTrackbar('Contrast', 'Adjustments', 10, 30, on_trackbar_change)     # Default contrast 10 (mapped to 1.0)
-cv2.createTrackbar('Blur', 'Adjustments', 0, 10, on_trackbar_change)          # Blur strength from 0 (off) to 10
-cv2.createTrackbar('Sharpen', 'Adjustments', 0, 1, on_trackbar_change)        # Sharpen off (0) or on (1)
-
-# Start capturing video from camera
-cap = cv2.VideoCapture(0)
-
-while True:
-    # Capture frame-by-frame from the camera
-    ret, frame = cap.read()
-    if not ret:
-        print("Failed to capture image. Exiting...")
-        break
-
-    # Get the values from the trackbars
-    brightness = cv2.getTrackbarPos('Brightness', 'Adjustments') - 50   # Adjust brightness (-50 to 50)
-    contrast = cv2.getTrackbarPos('Contrast', 'Adjustments') / 10.0     # Adjust contrast (0.1 to 3.0)
-    blur_strength = cv2.getTrackbarPos('Blur', 'Adjustments')           # Blur strength (0 to 10)
-    sharpen = cv2.getTrackbarPos('Sharpen', 'Adjustments')              # Sharpen (0 or 1)
-
-    # Adjust brightness and contrast
-    adjusted_image = adjust_brightness_contrast(frame, brightness, contrast)
-
-    # Apply blur (smoothing)
-    smoothed_image = apply_smoothing(adjusted_image, blur_strength)
-
-    # Apply sharpening if requested
-    if sharpen == 1:
-        output_image = apply_sharpening(smoothed_image)
-    else:
-        output_image = smoothed_image
-
-    # Display original and adjusted images side by side
-    combined_image = np.hstack((frame, output_image))
-    cv2.imshow('Original (Left) | Adjusted (Right)', combined_image)
-
-    # Wait for key press
-    key = cv2.waitKey(1)
-
-    # Press 's' to save both the original and processed images
-    if key == ord('s'):
-        cv2.imwrite('original_image.png', frame)
-        cv2.imwrite('adjusted_image.png', output_image)
-        print("Images saved as original_image.png and adjusted_image.png")
-
-    # Press 'q' to exit the loop
-    if key == ord('q'):
-        break
-
-# Release the camera and close all windows
-cap.release()
-cv2.destroyAllWindows()
+# Adjustment chain: each stage writes into a buffer owned by the pipeline,
+# and stages that are switched off are skipped
+adjust_stage = BrightnessContrastStage()
+blur_stage = BlurStage()
+sharpen_stage = SharpenStage(False)
+pipeline = FilterPipeline([adjust_stage, blur_stage, sharpen_stage])
+
+# Preallocated "original | adjusted" canvas
+compositor = Compositor()
+
+# Function to run the full adjustment chain on one frame
+# (the result is reused by the next call, so copy it if it must be kept);
+# with out (e.g. a compositor pane) the result is written straight into it
+def process_frame(frame, brightness=0, contrast=1.0, blur_strength=0, sharpen=0, out=None):
+    adjust_stage.brightness = brightness
+    adjust_stage.contrast = contrast
+    blur_stage.set_strength(blur_strength)
+    sharpen_stage.on = sharpen == 1
+    return pipeline.process(frame, out)
+
+if __name__ == "__main__":
+    parser = lab_arg_parser("Brightness, contrast, blur and sharpening adjustments")
+    parser.add_argument('--brightness', type=int, default=0, help='Brightness offset (-50 to 50)')
+    parser.add_argument('--contrast', type=float, default=1.0, help='Contrast gain (0.1 to 3.0)')
+    parser.add_argument('--blur', type=int, default=0, help='Blur strength (0 to 10)')
+    parser.add_argument('--sharpen', action='store_true', help='Apply sharpening')
+    parser.add_argument('--lut', action='store_true', help='Apply brightness/contrast with a cached lookup table')
+    args = parser.parse_args()
+    profiler.configure(args)
+    adjust_stage.use_lut = args.lut
+
+    # Headless mode: process a video file or image directory with fixed settings
+    if args.source:
+        run_headless(lambda frame: process_frame(frame, args.brightness, args.contrast, args.blur, int(args.sharpen)),
+                     args.source, args.output, args.max_frames)
+        exit()
+
+    # Setup the OpenCV window with trackbars
+    cv2.namedWindow('Adjustments')
+
+    # Create trackbars for brightness, contrast, blur strength, and sharpening
+    cv2.createTrackbar('Brightness', 'Adjustments', 50, 100, on_trackbar_change)  # Default brightness 50
+    cv2.createTrackbar('Contrast', 'Adjustments', 10, 30, on_trackbar_change)     # Default contrast 10 (mapped to 1.0)
+    cv2.createTrackbar('Blur', 'Adjustments', 0, 10, on_trackbar_change)          # Blur strength from 0 (off) to 10
+    cv2.createTrackbar('Sharpen', 'Adjustments', 0, 1, on_trackbar_change)        # Sharpen off (0) or on (1)
+
+    # Start capturing video from camera
+    cap = FrameGrabber(0)
+
+    while True:
+        # Capture frame-by-frame from the camera
+        with profiler.stage('capture'):
+            ret, frame = cap.read()
+        if not ret:
+            print("Failed to capture image. Exiting...")
+            break
+
+        # Get the values from the trackbars
+        brightness = cv2.getTrackbarPos('Brightness', 'Adjustments') - 50   # Adjust brightness (-50 to 50)
+        contrast = cv2.getTrackbarPos('Contrast', 'Adjustments') / 10.0     # Adjust contrast (0.1 to 3.0)
+        blur_strength = cv2.getTrackbarPos('Blur', 'Adjustments')           # Blur strength (0 to 10)
+        sharpen = cv2.getTrackbarPos('Sharpen', 'Adjustments')              # Sharpen (0 or 1)
+
+        # Copy the original into the left half of the canvas
+        with profiler.stage('compose'):
+            compositor.prepare(frame.shape[0], frame.shape[1])
+            compositor.place(0, frame)
+
+        # Adjust brightness and contrast, apply blur (smoothing) and sharpening if requested,
+        # writing the result straight into the right half of the canvas
+        with profiler.stage('process'):
+            output_image = process_frame(frame, brightness, contrast, blur_strength, sharpen, out=compositor.pane(1))
+
+        # Display original and adjusted images side by side
+        profiler.draw_overlay(compositor.canvas)
+        with profiler.stage('imshow'):
+            cv2.imshow('Original (Left) | Adjusted (Right)', compositor.canvas)
+
+        # Wait for key press
+        with profiler.stage('waitkey'):
+            key = cv2.waitKey(1)
+        profiler.frame_done()
+
+        # Press 's' to save both the original and processed images
+        if key == ord('s'):
+            cv2.imwrite('original_image.png', frame)
+            cv2.imwrite('adjusted_image.png', output_image)
+            print("Images saved as original_image.png and adjusted_image.png")
+
+        # Press 'q' to exit the loop
+        if key == ord('q'):
+            break
+
+    # Release the camera and close all windows
+    cap.release()
+    cv2.destroyAllWindows()
+    profiler.close()
@@ -8,59 +8,99 @@
 # Display the original image and the adjusted image side by side
 
 import cv2
-import numpy as np
+
+from frame_grabber import FrameGrabber
+from compositor import Compositor
+from filters import BrightnessContrastStage, FilterPipeline
+from headless import lab_arg_parser, run_headless
+from instrumentation import profiler
 
 # Function to adjust brightness and contrast
 def adjust_brightness_contrast(image, brightness=0, contrast=1.0):
     # Apply brightness and contrast adjustments
-    adjusted = cv2.convertScaleAbs(image, alpha=contrast, beta=brightness)
+    adjusted = BrightnessContrastStage(brightness, contrast).apply(image)
     return adjusted
 
+# Brightness/contrast stage driven by the trackbars, writing into a reusable buffer
+adjust_stage = BrightnessContrastStage()
+pipeline = FilterPipeline([adjust_stage])
+
+# Preallocated "original | adjusted" canvas
+compositor = Compositor()
+
 # Function to update the brightness and contrast from trackbars
 def update_values(x):
     # Get values from trackbars
     brightness = cv2.getTrackbarPos('Brightness', 'Adjustments') - 50
     contrast = cv2.getTrackbarPos('Contrast', 'Adjustments') / 50.0
     # Apply adjustments
-    adjusted_img = adjust_brightness_contrast(frame, brightness, contrast)
-    # Combine original and adjusted images side by side
-    combined = np.hstack((frame, adjusted_img))
-    cv2.imshow('Adjustments', combined)
-
-# Capture video from the webcam
-cap = cv2.VideoCapture(0)
+    adjust_stage.brightness = brightness
+    adjust_stage.contrast = contrast
+    # Combine original and adjusted images side by side: the original is copied into the
+    # left half of the canvas and the result is written straight into the right half
+    with profiler.stage('process'):
+        compositor.prepare(frame.shape[0], frame.shape[1])
+        compositor.place(0, frame)
+        pipeline.process(frame, out=compositor.pane(1))
+    profiler.draw_overlay(compositor.canvas)
+    with profiler.stage('imshow'):
+        cv2.imshow('Adjustments', compositor.canvas)
 
-# Check if the camera opened successfully
-if not cap.isOpened():
-    print("Error: Could not open video stream")
-    exit()
+if __name__ == "__main__":
+    parser = lab_arg_parser("Lab 1: brightness and contrast adjustment")
+    parser.add_argument('--brightness', type=int, default=0, help='Brightness offset (-50 to 50)')
+    parser.add_argument('--contrast', type=float, default=1.0, help='Contrast gain (0.0 to 2.0)')
+    parser.add_argument('--lut', action='store_true', help='Apply brightness/contrast with a cached lookup table')
+    args = parser.parse_args()
+    profiler.configure(args)
+    adjust_stage.use_lut = args.lut
 
-# Read a frame to initialize the windows and trackbars
-ret, frame = cap.read()
+    # Headless mode: adjust every frame of a video file or image directory
+    if args.source:
+        adjust_stage.brightness = args.brightness
+        adjust_stage.contrast = args.contrast
+        run_headless(pipeline.process, args.source, args.output, args.max_frames)
+        exit()
 
-# Create window to display adjustments
-cv2.namedWindow('Adjustments')
+    # Capture video from the webcam
+    cap = FrameGrabber(0)
 
-# Create trackbars for brightness and contrast adjustment
-cv2.createTrackbar('Brightness', 'Adjustments', 50, 100, update_values)
-cv2.createTrackbar('Contrast', 'Adjustments', 50, 100, update_values)
+    # Check if the camera opened successfully
+    if not cap.isOpened():
+        print("Error: Could not open video stream")
+        exit()
 
-# Display the original and adjusted images side by side
-while True:
+    # Read a frame to initialize the windows and trackbars
     ret, frame = cap.read()
-    if not ret:
-        print("Error: Could not read frame")
-        break
+
+    # Create window to display adjustments
+    cv2.namedWindow('Adjustments')
+
+    # Create trackbars for brightness and contrast adjustment
+    cv2.createTrackbar('Brightness', 'Adjustments', 50, 100, update_values)
+    cv2.createTrackbar('Contrast', 'Adjustments', 50, 100, update_values)
+
+    # Display the original and adjusted images side by side
+    while True:
+        with profiler.stage('capture'):
+            ret, frame = cap.read()
+        if not ret:
+            print("Error: Could not read frame")
+            break
     
-    # Update the window with current trackbar values
-    update_values(0)
+        # Update the window with current trackbar values
+        update_values(0)
     
-    # Break loop on 'q' key press
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
+        # Break loop on 'q' key press
+        with profiler.stage('waitkey'):
+            key = cv2.waitKey(1)
+        profiler.frame_done()
+        if key & 0xFF == ord('q'):
+            break
 
-# Release the capture and close windows
-cap.release()
-cv2.destroyAllWindows()
+    # Release the capture and close windows
+    cap.release()
+    cv2.destroyAllWindows()
+    profiler.close()
 
 
@@ -10,24 +10,60 @@
 
 import cv2
 
-# Load the pre-trained face and eye detection Haar cascades
-face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
+from batched_inference import add_batching_args, batcher_from_args
+from cascade_search import CascadeSearch, add_search_args
+from detector_registry import detectors
+from eye_cache import EyeBoxCache
+from face_detectors import add_detector_args, face_backend_from_args
+from face_tracking import add_tracking_args, face_detector_from_args
+from frame_grabber import FrameGrabber
+from headless import lab_arg_parser, run_headless
+from instrumentation import profiler
+from motion_gate import add_gate_args, motion_gate_from_args
+from tiled_detection import add_tiling_args, tiled_cascade_from_args
+
+# The pre-trained face and eye detection Haar cascades, loaded on first use
+face_cascade = detectors.lazy('face')
+eye_cascade = detectors.lazy('eye')
+
+# Face search front end: a plain full-frame detectMultiScale unless the downscale,
+# ROI or adaptive size options are given
+face_search = CascadeSearch(face_cascade, scale_factor=1.1, min_neighbors=5, min_size=(30, 30))
+
+# Function to detect faces in a grayscale frame (the BGR frame for a colour backend)
+def detect_faces(gray_frame):
+    return face_search(gray_frame)
+
+# Eyes are only searched in the top part of the face box. Eye boxes reach down to
+# about half the face height, and the cascade needs the whole eye inside its window
+EYE_REGION_HEIGHT = 0.6
+
+# Function to detect eyes in a grayscale face ROI (boxes are relative to the ROI)
+def detect_eyes(roi_gray):
+    upper_face = roi_gray[:int(roi_gray.shape[0] * EYE_REGION_HEIGHT)]
+    return eye_cascade.detectMultiScale(upper_face, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
 
 # Function to mask eyes in detected faces
-def mask_eyes(frame, faces):
+# With eye_cache, eye boxes are reused while a face stays in place (see eye_cache.py)
+def mask_eyes(frame, faces, gray_frame=None, eye_cache=None):
+    # Convert the frame to grayscale if the caller has not done so already
+    if gray_frame is None:
+        gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    # Find the eyes within each face region
+    if eye_cache is not None:
+        face_eyes = eye_cache.lookup(gray_frame, faces)
+    else:
+        face_eyes = [detect_eyes(gray_frame[y:y+h, x:x+w]) for (x, y, w, h) in faces]
+
     # Loop over each detected face
-    for (x, y, w, h) in faces:
+    for (x, y, w, h), eyes in zip(faces, face_eyes):
         # Draw a rectangle around the face (optional, for debugging or display purposes)
         cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 0), 2)
 
         # Get the region of interest (ROI) for the face
-        roi_gray = gray_frame[y:y+h, x:x+w]
         roi_color = frame[y:y+h, x:x+w]
 
-        # Detect eyes within the face region
-        eyes = eye_cascade.detectMultiScale(roi_gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
-
         # Loop over the detected eyes
         for (ex, ey, ew, eh) in eyes:
             # Mask the eyes by drawing black rectangles over them
@@ -35,35 +71,82 @@ def mask_eyes(frame, faces):
 
     return frame
 
-# Capture video from the webcam
-cap = cv2.VideoCapture(0)
-
-# Create a window for displaying the video feed with masked eyes
-cv2.namedWindow('Eye Masking', cv2.WINDOW_NORMAL)
-
-# Main loop to process the video feed
-while True:
-    # Capture the current frame from the webcam
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    # Convert the frame to grayscale for face and eye detection
-    gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-    # Detect faces in the frame
-    faces = face_cascade.detectMultiScale(gray_frame, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
-
-    # Mask the eyes in the detected faces
-    frame_with_masks = mask_eyes(frame, faces)
-
-    # Display the frame with masked eyes
-    cv2.imshow('Eye Masking', frame_with_masks)
-
-    # Break the loop if the user presses 'q'
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-# Release the webcam and close all OpenCV windows
-cap.release()
-cv2.destroyAllWindows()
+if __name__ == "__main__":
+    parser = lab_arg_parser("Lab 10: privacy eye masking")
+    add_search_args(parser)
+    add_tracking_args(parser)
+    add_tiling_args(parser)
+    add_detector_args(parser)
+    add_batching_args(parser)
+    add_gate_args(parser)
+    parser.add_argument('--eye-refresh', type=int, default=10,
+                        help='Re-detect the eyes of every face at least every this many frames (1 = every frame)')
+    args = parser.parse_args()
+    profiler.configure(args)
+    face_search.configure(args)
+    # The face detector backend, run on overlapping tiles in parallel threads with --tiles,
+    # or as one DNN batch of tiles per frame with --batch-tiles
+    backend = face_backend_from_args(args)
+    face_search.cascade = tiled_cascade_from_args(backend.name, args) or batcher_from_args(backend, args) or backend
+    detect = face_detector_from_args(detect_faces, args)
+    # With --motion-gate the detector is skipped on frames without motion
+    gate = motion_gate_from_args(detect, args)
+    detect = gate.update if gate else detect
+    eye_cache = EyeBoxCache(detect_eyes, refresh_interval=args.eye_refresh)
+
+    # Headless mode: mask the eyes in every frame and record the face boxes
+    if args.source:
+        def process_masking(image):
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            faces = detect(image if backend.color else gray)
+            return mask_eyes(image, faces, gray, eye_cache), faces
+
+        run_headless(process_masking, args.source, args.output, args.max_frames)
+        if gate:
+            print(gate.summary())
+        exit()
+
+    # Capture video from the webcam
+    cap = FrameGrabber(0)
+
+    # Create a window for displaying the video feed with masked eyes
+    cv2.namedWindow('Eye Masking', cv2.WINDOW_NORMAL)
+
+    # Main loop to process the video feed
+    while True:
+        # Capture the current frame from the webcam
+        with profiler.stage('capture'):
+            ret, frame = cap.read()
+        if not ret:
+            break
+
+        # Convert the frame to grayscale for face and eye detection
+        with profiler.stage('convert'):
+            gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        # Detect faces in the frame (a colour backend such as the DNN gets the BGR frame)
+        with profiler.stage('detect'):
+            faces = detect(frame if backend.color else gray_frame)
+
+        # Mask the eyes in the detected faces
+        with profiler.stage('mask'):
+            frame_with_masks = mask_eyes(frame, faces, gray_frame, eye_cache)
+
+        # Display the frame with masked eyes
+        profiler.draw_overlay(frame_with_masks)
+        with profiler.stage('imshow'):
+            cv2.imshow('Eye Masking', frame_with_masks)
+
+        # Break the loop if the user presses 'q'
+        with profiler.stage('waitkey'):
+            key = cv2.waitKey(1)
+        profiler.frame_done()
+        if key & 0xFF == ord('q'):
+            break
+
+    # Release the webcam and close all OpenCV windows
+    cap.release()
+    cv2.destroyAllWindows()
+    profiler.close()
+    if gate:
+        print(gate.summary())
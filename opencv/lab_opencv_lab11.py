@@ -11,6 +11,11 @@
 import cv2
 import numpy as np
 
+from blobs import find_blobs, largest_blob
+from frame_grabber import FrameGrabber
+from headless import lab_arg_parser, run_headless
+from instrumentation import profiler
+
 # Function to track a specific color (e.g., blue) and return the coordinates of the object
 def track_object(frame, hsv_lower, hsv_upper):
     # Convert the frame to the HSV color space
@@ -19,19 +24,17 @@ def track_object(frame, hsv_lower, hsv_upper):
     # Create a mask for the object based on the specified HSV range
     mask = cv2.inRange(hsv_frame, hsv_lower, hsv_upper)
 
-    # Find contours of the masked object
-    contours, _ = cv2.findContours(mask, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+    # Label the blobs of the mask (areas and boxes as arrays, no per-blob Python loop)
+    blobs = find_blobs(mask)
 
     # Initialize the center coordinates of the object
     object_center = None
 
-    # If any contours are found, process the largest one
-    if len(contours) > 0:
-        # Find the largest contour by area
-        largest_contour = max(contours, key=cv2.contourArea)
-
-        # Get the bounding box coordinates for the largest contour
-        (x, y, w, h) = cv2.boundingRect(largest_contour)
+    # If any blobs are found, process the largest one
+    largest = largest_blob(blobs)
+    if largest is not None:
+        # Get the bounding box coordinates of the largest blob
+        (x, y, w, h) = blobs.boxes[largest].tolist()
 
         # Draw a rectangle around the object
         cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
@@ -47,39 +50,57 @@ def track_object(frame, hsv_lower, hsv_upper):
 
     return frame, object_center
 
-# Capture video from the webcam
-cap = cv2.VideoCapture(0)
-
 # Define the HSV range for the object color (e.g., blue)
 hsv_lower = np.array([100, 150, 50])  # Lower bound for blue color
 hsv_upper = np.array([140, 255, 255])  # Upper bound for blue color
 
-# Create a window to display the tracking feed
-cv2.namedWindow('Object Tracking', cv2.WINDOW_NORMAL)
-
-# Main loop to process the video feed
-while True:
-    # Capture the current frame from the webcam
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    # Track the object based on the specified color
-    frame, object_center = track_object(frame, hsv_lower, hsv_upper)
-
-    # Display the frame with the tracked object
-    cv2.imshow('Object Tracking', frame)
-
-    # Optionally, send the object's coordinates to the robotic arm control system
-    if object_center:
-        # Send object_center coordinates to the robotic arm system (pseudo-code)
-        # robotic_arm.move_to(object_center)
-        pass
-
-    # Break the loop if the user presses 'q'
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-# Release the webcam and close all OpenCV windows
-cap.release()
-cv2.destroyAllWindows()
+if __name__ == "__main__":
+    args = lab_arg_parser("Lab 11: color object tracking").parse_args()
+    profiler.configure(args)
+
+    # Headless mode: track the object in every frame and record its center
+    if args.source:
+        run_headless(lambda image: track_object(image, hsv_lower, hsv_upper),
+                     args.source, args.output, args.max_frames)
+        exit()
+
+    # Capture video from the webcam
+    cap = FrameGrabber(0)
+
+    # Create a window to display the tracking feed
+    cv2.namedWindow('Object Tracking', cv2.WINDOW_NORMAL)
+
+    # Main loop to process the video feed
+    while True:
+        # Capture the current frame from the webcam
+        with profiler.stage('capture'):
+            ret, frame = cap.read()
+        if not ret:
+            break
+
+        # Track the object based on the specified color
+        with profiler.stage('track'):
+            frame, object_center = track_object(frame, hsv_lower, hsv_upper)
+
+        # Display the frame with the tracked object
+        profiler.draw_overlay(frame)
+        with profiler.stage('imshow'):
+            cv2.imshow('Object Tracking', frame)
+
+        # Optionally, send the object's coordinates to the robotic arm control system
+        if object_center:
+            # Send object_center coordinates to the robotic arm system (pseudo-code)
+            # robotic_arm.move_to(object_center)
+            pass
+
+        # Break the loop if the user presses 'q'
+        with profiler.stage('waitkey'):
+            key = cv2.waitKey(1)
+        profiler.frame_done()
+        if key & 0xFF == ord('q'):
+            break
+
+    # Release the webcam and close all OpenCV windows
+    cap.release()
+    cv2.destroyAllWindows()
+    profiler.close()
@@ -12,6 +12,11 @@ import cv2
 import numpy as np
 import math
 
+from frame_grabber import FrameGrabber
+from headless import lab_arg_parser, run_headless
+from instrumentation import profiler
+from motion_gate import add_gate_args, motion_gate_from_args
+
 # Function to detect hand gestures based on contours and convexity defects
 def detect_gesture(frame, contour):
     # Create a convex hull around the hand
@@ -53,19 +58,8 @@ def detect_gesture(frame, contour):
 
     return frame, finger_count
 
-# Capture video from the webcam
-cap = cv2.VideoCapture(0)
-
-# Create a window to display the gesture recognition feed
-cv2.namedWindow('Gesture Recognition', cv2.WINDOW_NORMAL)
-
-# Main loop to process the video feed
-while True:
-    # Capture the current frame from the webcam
-    ret, frame = cap.read()
-    if not ret:
-        break
-
+# Function to segment the hand and return its contour (the largest one), or None
+def segment_hand(frame):
     # Convert the frame to grayscale and apply Gaussian blur
     gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
     blur_frame = cv2.GaussianBlur(gray_frame, (35, 35), 0)
@@ -76,24 +70,77 @@ while True:
     # Find contours in the thresholded image
     contours, _ = cv2.findContours(thresh_frame, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
 
-    # If any contours are found, detect gestures
+    # Find the largest contour, which is assumed to be the hand
     if len(contours) > 0:
-        # Find the largest contour, which is assumed to be the hand
-        max_contour = max(contours, key=cv2.contourArea)
-
-        # Detect hand gestures
-        frame, finger_count = detect_gesture(frame, max_contour)
-
-        # Optionally, send the detected gesture to control the robotic surgery assistant
-        # robotic_surgery_assistant.execute_command(finger_count)
-
-    # Display the frame with the gesture recognition
-    cv2.imshow('Gesture Recognition', frame)
-
-    # Break the loop if the user presses 'q'
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-# Release the webcam and close all OpenCV windows
-cap.release()
-cv2.destroyAllWindows()
+        return max(contours, key=cv2.contourArea)
+    return None
+
+# Function to segment the hand and recognize the gesture in one frame
+# segment can be swapped for a motion-gated version of segment_hand (--motion-gate)
+def recognize_gesture(frame, segment=segment_hand):
+    max_contour = segment(frame)
+    if max_contour is None:
+        return frame, None
+    return detect_gesture(frame, max_contour)
+
+if __name__ == "__main__":
+    parser = lab_arg_parser("Lab 12: hand gesture recognition")
+    add_gate_args(parser, regions=False)
+    args = parser.parse_args()
+    profiler.configure(args)
+    # With --motion-gate the hand is segmented again only when something moved
+    gate = motion_gate_from_args(segment_hand, args)
+    segment = gate.update if gate else segment_hand
+
+    # Headless mode: recognize the gesture in every frame and record the finger count
+    if args.source:
+        run_headless(lambda image: recognize_gesture(image, segment), args.source, args.output, args.max_frames)
+        if gate:
+            print(gate.summary())
+        exit()
+
+    # Capture video from the webcam
+    cap = FrameGrabber(0)
+
+    # Create a window to display the gesture recognition feed
+    cv2.namedWindow('Gesture Recognition', cv2.WINDOW_NORMAL)
+
+    # Main loop to process the video feed
+    while True:
+        # Capture the current frame from the webcam
+        with profiler.stage('capture'):
+            ret, frame = cap.read()
+        if not ret:
+            break
+
+        # Segment the hand (the largest contour in the thresholded frame)
+        with profiler.stage('segment'):
+            max_contour = segment(frame)
+
+        # If a hand contour is found, detect gestures
+        if max_contour is not None:
+            # Detect hand gestures
+            with profiler.stage('gesture'):
+                frame, finger_count = detect_gesture(frame, max_contour)
+
+            # Optionally, send the detected gesture to control the robotic surgery assistant
+            # robotic_surgery_assistant.execute_command(finger_count)
+
+        # Display the frame with the gesture recognition
+        profiler.draw_overlay(frame)
+        with profiler.stage('imshow'):
+            cv2.imshow('Gesture Recognition', frame)
+
+        # Break the loop if the user presses 'q'
+        with profiler.stage('waitkey'):
+            key = cv2.waitKey(1)
+        profiler.frame_done()
+        if key & 0xFF == ord('q'):
+            break
+
+    # Release the webcam and close all OpenCV windows
+    cap.release()
+    cv2.destroyAllWindows()
+    profiler.close()
+    if gate:
+        print(gate.summary())
@@ -10,56 +10,91 @@
 # 3. Display both the original and blurred images side by side in real-time.
 
 import cv2
-import numpy as np
+
+from frame_grabber import FrameGrabber
+from compositor import Compositor
+from filters import BlurStage, FilterPipeline
+from headless import lab_arg_parser, run_headless
+from instrumentation import profiler
 
 # Function to apply blur effect
 def apply_blur(image, ksize):
-    if ksize > 0:
-        return cv2.GaussianBlur(image, (ksize, ksize), 0)
+    blur = BlurStage(ksize)
+    if blur.enabled():
+        return blur.apply(image)
     else:
         return image
 
+# Blur stage driven by the trackbar, writing into a reusable buffer
+blur_stage = BlurStage()
+pipeline = FilterPipeline([blur_stage])
+
+# Preallocated "original | blurred" canvas
+compositor = Compositor()
+
 # Function to update blur strength from the trackbar
 def update_blur(x):
     blur_strength = cv2.getTrackbarPos('Blur', 'Blur Effect')
-    # Ensure that blur kernel size is odd and >= 1
-    ksize = max(1, blur_strength * 2 + 1)
-    blurred_img = apply_blur(frame, ksize)
-    # Combine original and blurred images side by side
-    combined = np.hstack((frame, blurred_img))
-    cv2.imshow('Blur Effect', combined)
-
-# Capture video from the webcam
-cap = cv2.VideoCapture(0)
+    # Ensure that blur kernel size is odd and >= 1 (a size of 1 leaves the frame unchanged)
+    blur_stage.set_strength(blur_strength)
+    # Combine original and blurred images side by side: the original is copied into the
+    # left half of the canvas and the result is written straight into the right half
+    with profiler.stage('process'):
+        compositor.prepare(frame.shape[0], frame.shape[1])
+        compositor.place(0, frame)
+        pipeline.process(frame, out=compositor.pane(1))
+    profiler.draw_overlay(compositor.canvas)
+    with profiler.stage('imshow'):
+        cv2.imshow('Blur Effect', compositor.canvas)
 
-# Check if the camera opened successfully
-if not cap.isOpened():
-    print("Error: Could not open video stream")
-    exit()
+if __name__ == "__main__":
+    parser = lab_arg_parser("Lab 2: blur effect")
+    parser.add_argument('--blur', type=int, default=0, help='Blur strength (0 to 10)')
+    args = parser.parse_args()
+    profiler.configure(args)
 
-# Read a frame to initialize the windows and trackbars
-ret, frame = cap.read()
+    # Headless mode: blur every frame of a video file or image directory
+    if args.source:
+        run_headless(lambda frame: apply_blur(frame, max(1, args.blur * 2 + 1)),
+                     args.source, args.output, args.max_frames)
+        exit()
 
-# Create window to display the blur effect
-cv2.namedWindow('Blur Effect')
+    # Capture video from the webcam
+    cap = FrameGrabber(0)
 
-# Create a trackbar to control the blur strength (0 to 10)
-cv2.createTrackbar('Blur', 'Blur Effect', 0, 10, update_blur)
+    # Check if the camera opened successfully
+    if not cap.isOpened():
+        print("Error: Could not open video stream")
+        exit()
 
-# Display the original and blurred images side by side
-while True:
+    # Read a frame to initialize the windows and trackbars
     ret, frame = cap.read()
-    if not ret:
-        print("Error: Could not read frame")
-        break
+
+    # Create window to display the blur effect
+    cv2.namedWindow('Blur Effect')
+
+    # Create a trackbar to control the blur strength (0 to 10)
+    cv2.createTrackbar('Blur', 'Blur Effect', 0, 10, update_blur)
+
+    # Display the original and blurred images side by side
+    while True:
+        with profiler.stage('capture'):
+            ret, frame = cap.read()
+        if not ret:
+            print("Error: Could not read frame")
+            break
     
-    # Update the window with the current trackbar value
-    update_blur(0)
+        # Update the window with the current trackbar value
+        update_blur(0)
     
-    # Break loop on 'q' key press
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
+        # Break loop on 'q' key press
+        with profiler.stage('waitkey'):
+            key = cv2.waitKey(1)
+        profiler.frame_done()
+        if key & 0xFF == ord('q'):
+            break
 
-# Release the capture and close windows
-cap.release()
-cv2.destroyAllWindows()
+    # Release the capture and close windows
+    cap.release()
+    cv2.destroyAllWindows()
+    profiler.close()
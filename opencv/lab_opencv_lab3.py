@@ -12,59 +12,86 @@
 #
 
 import cv2
-import numpy as np
+
+from frame_grabber import FrameGrabber
+from compositor import Compositor
+from filters import FilterPipeline, SharpenStage
+from headless import lab_arg_parser, run_headless
+from instrumentation import profiler
 
 # Function to sharpen the image using a kernel
 def sharpen_image(image):
-    # Define the sharpening kernel
-    sharpening_kernel = np.array([[0, -1, 0],
-                                  [-1, 5, -1],
-                                  [0, -1, 0]])
-    sharpened = cv2.filter2D(image, -1, sharpening_kernel)
+    # Apply the 3x3 sharpening kernel
+    sharpened = SharpenStage().apply(image)
     return sharpened
 
+# Sharpening stage toggled by the trackbar, writing into a reusable buffer
+sharpen_stage = SharpenStage(False)
+pipeline = FilterPipeline([sharpen_stage])
+
+# Preallocated "original | sharpened" canvas
+compositor = Compositor()
+
 # Function to toggle sharpening based on the trackbar
 def toggle_sharpening(x):
     sharpen = cv2.getTrackbarPos('Sharpen', 'Sharpen Effect')
-    if sharpen == 1:
-        sharpened_img = sharpen_image(frame)
-    else:
-        sharpened_img = frame
-    # Combine original and sharpened images side by side
-    combined = np.hstack((frame, sharpened_img))
-    cv2.imshow('Sharpen Effect', combined)
-
-# Capture video from the webcam or load an image
-cap = cv2.VideoCapture(0)
+    # When sharpening is off the pipeline returns the frame itself
+    sharpen_stage.on = sharpen == 1
+    # Combine original and sharpened images side by side: the original is copied into the
+    # left half of the canvas and the result is written straight into the right half
+    with profiler.stage('process'):
+        compositor.prepare(frame.shape[0], frame.shape[1])
+        compositor.place(0, frame)
+        pipeline.process(frame, out=compositor.pane(1))
+    profiler.draw_overlay(compositor.canvas)
+    with profiler.stage('imshow'):
+        cv2.imshow('Sharpen Effect', compositor.canvas)
 
-# Check if the camera opened successfully
-if not cap.isOpened():
-    print("Error: Could not open video stream")
-    exit()
+if __name__ == "__main__":
+    args = lab_arg_parser("Lab 3: document sharpening").parse_args()
+    profiler.configure(args)
 
-# Read a frame to initialize the window and trackbars
-ret, frame = cap.read()
+    # Headless mode: sharpen every frame of a video file or image directory
+    if args.source:
+        run_headless(sharpen_image, args.source, args.output, args.max_frames)
+        exit()
 
-# Create window to display sharpening effect
-cv2.namedWindow('Sharpen Effect')
+    # Capture video from the webcam or load an image
+    cap = FrameGrabber(0)
 
-# Create a trackbar to toggle sharpening (0: Off, 1: On)
-cv2.createTrackbar('Sharpen', 'Sharpen Effect', 0, 1, toggle_sharpening)
+    # Check if the camera opened successfully
+    if not cap.isOpened():
+        print("Error: Could not open video stream")
+        exit()
 
-# Display the original and sharpened images side by side
-while True:
+    # Read a frame to initialize the window and trackbars
     ret, frame = cap.read()
-    if not ret:
-        print("Error: Could not read frame")
-        break
+
+    # Create window to display sharpening effect
+    cv2.namedWindow('Sharpen Effect')
+
+    # Create a trackbar to toggle sharpening (0: Off, 1: On)
+    cv2.createTrackbar('Sharpen', 'Sharpen Effect', 0, 1, toggle_sharpening)
+
+    # Display the original and sharpened images side by side
+    while True:
+        with profiler.stage('capture'):
+            ret, frame = cap.read()
+        if not ret:
+            print("Error: Could not read frame")
+            break
     
-    # Update the window based on the current trackbar value
-    toggle_sharpening(0)
+        # Update the window based on the current trackbar value
+        toggle_sharpening(0)
     
-    # Break loop on 'q' key press
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
+        # Break loop on 'q' key press
+        with profiler.stage('waitkey'):
+            key = cv2.waitKey(1)
+        profiler.frame_done()
+        if key & 0xFF == ord('q'):
+            break
 
-# Release the capture and close windows
-cap.release()
-cv2.destroyAllWindows()
+    # Release the capture and close windows
+    cap.release()
+    cv2.destroyAllWindows()
+    profiler.close()
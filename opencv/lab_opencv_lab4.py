@@ -1,23 +1,59 @@
 import cv2
-import numpy as np
 from tkinter import Tk, filedialog
 import os
 
+from compositor import Compositor
+from filters import BrightnessContrastStage, FilterPipeline
+from headless import lab_arg_parser, run_headless
+from instrumentation import profiler
+from result_cache import ResultCache
+
 # Function to adjust brightness and contrast
 def adjust_brightness_contrast(image, brightness=0, contrast=1.0):
     # Apply brightness and contrast adjustments
-    adjusted = cv2.convertScaleAbs(image, alpha=contrast, beta=brightness)
+    adjusted = BrightnessContrastStage(brightness, contrast).apply(image)
     return adjusted
 
+# Brightness/contrast stage driven by the trackbars, writing into a reusable buffer
+adjust_stage = BrightnessContrastStage()
+pipeline = FilterPipeline([adjust_stage])
+
+# Preallocated "original | adjusted" canvas (grayscale, like the X-ray image)
+compositor = Compositor()
+
+# Side-by-side results for recently used (brightness, contrast) pairs
+result_cache = ResultCache()
+
+# Trackbar values of the image currently on screen (None forces the first render)
+shown_params = None
+
 # Function to update brightness and contrast from trackbars
 def update_values(x):
+    global shown_params
     # Get values from trackbars
     brightness = cv2.getTrackbarPos('Brightness', 'Adjustments') - 50
     contrast = cv2.getTrackbarPos('Contrast', 'Adjustments') / 50.0
-    # Apply adjustments
-    adjusted_img = adjust_brightness_contrast(frame, brightness, contrast)
-    # Combine original and adjusted images side by side
-    combined = np.hstack((frame, adjusted_img))
+
+    # The image is static, so only recompute when a trackbar value changed
+    params = (brightness, contrast)
+    if params == shown_params:
+        return
+    shown_params = params
+
+    # Reuse the result for this setting if it was computed recently
+    combined = result_cache.get(params)
+    if combined is None:
+        # Apply adjustments
+        adjust_stage.brightness = brightness
+        adjust_stage.contrast = contrast
+        # Combine original and adjusted images side by side, writing the result straight
+        # into the right half of the canvas
+        compositor.prepare(frame.shape[0], frame.shape[1], 1)
+        compositor.place(0, frame)
+        pipeline.process(frame, out=compositor.pane(1))
+        # The canvas is reused for the next setting, so the cache keeps its own copy
+        combined = compositor.canvas.copy()
+        result_cache.put(params, combined)
     cv2.imshow('Adjustments', combined)
 
 # Function to open a file dialog for image selection
@@ -29,33 +65,55 @@ def get_image_path():
     root.destroy()
     return file_path
 
-# Ask user to select an image file
-file_path = get_image_path()
+if __name__ == "__main__":
+    parser = lab_arg_parser("Lab 4: X-ray brightness and contrast adjustment")
+    parser.add_argument('--brightness', type=int, default=0, help='Brightness offset (-50 to 50)')
+    parser.add_argument('--contrast', type=float, default=1.0, help='Contrast gain (0.0 to 2.0)')
+    parser.add_argument('--lut', action='store_true', help='Apply brightness/contrast with a cached lookup table')
+    parser.add_argument('--cache-mb', type=int, default=256, help='Memory budget for remembered results (MB)')
+    args = parser.parse_args()
+    profiler.configure(args)
+    adjust_stage.use_lut = args.lut
+    result_cache.max_bytes = args.cache_mb * 1024 * 1024
+
+    # Headless mode: X-ray images are adjusted in grayscale, as in the interactive mode
+    if args.source:
+        def process_xray(image):
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            adjust_stage.brightness = args.brightness
+            adjust_stage.contrast = args.contrast
+            return pipeline.process(gray)
+
+        run_headless(process_xray, args.source, args.output, args.max_frames)
+        exit()
+
+    # Ask user to select an image file
+    file_path = get_image_path()
 
-# Load the selected image
-if os.path.exists(file_path):
-    frame = cv2.imread(file_path, cv2.IMREAD_GRAYSCALE)
-    if frame is None:
-        print("Error: Could not load image")
+    # Load the selected image
+    if os.path.exists(file_path):
+        frame = cv2.imread(file_path, cv2.IMREAD_GRAYSCALE)
+        if frame is None:
+            print("Error: Could not load image")
+            exit()
+    else:
+        print("Error: No file selected or file not found")
         exit()
-else:
-    print("Error: No file selected or file not found")
-    exit()
 
-# Create window to display adjustments
-cv2.namedWindow('Adjustments')
+    # Create window to display adjustments
+    cv2.namedWindow('Adjustments')
 
-# Create trackbars for brightness and contrast adjustment
-cv2.createTrackbar('Brightness', 'Adjustments', 50, 100, update_values)
-cv2.createTrackbar('Contrast', 'Adjustments', 50, 100, update_values)
+    # Create trackbars for brightness and contrast adjustment
+    cv2.createTrackbar('Brightness', 'Adjustments', 50, 100, update_values)
+    cv2.createTrackbar('Contrast', 'Adjustments', 50, 100, update_values)
 
-# Display the original and adjusted images side by side
-while True:
-    # Update the window with the current trackbar values
-    update_values(0)
+    # Display the original and adjusted images side by side
+    while True:
+        # Update the window with the current trackbar values
+        update_values(0)
     
-    # Break loop on 'q' key press
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
+        # Break loop on 'q' key press
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            break
 
-cv2.destroyAllWindows()
+    cv2.destroyAllWindows()
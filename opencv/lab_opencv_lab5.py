@@ -1,30 +1,88 @@
 import cv2
-import numpy as np
 from tkinter import Tk, filedialog
 import os
 
+from compositor import Compositor
+from filters import BlurStage, FilterPipeline
+from headless import lab_arg_parser, run_headless
+from instrumentation import profiler
+from precompute import BackgroundPrecomputer
+from result_cache import ResultCache
+
+# Number of positions on the blur strength trackbar (0 to 10)
+BLUR_LEVELS = 11
+
 # Function to apply a blur filter to reduce noise
 def apply_blur(image, ksize):
     # If the kernel size is greater than 1, apply GaussianBlur
     if ksize > 1:
-        return cv2.GaussianBlur(image, (ksize, ksize), 0)
+        return BlurStage(ksize).apply(image)
     else:
         # If kernel size is 1, return the original image (no blurring)
         return image
 
+# Function to convert a trackbar blur strength into an odd kernel size (1 means no blur)
+def blur_kernel_size(blur_strength):
+    return blur_strength * 2 + 1 if blur_strength > 0 else 1
+
+# Function to render the side-by-side view for one blur strength (used by the precompute workers)
+def render_display_level(blur_strength):
+    # Each level keeps its own canvas; the blur is written straight into its right half
+    level_compositor = Compositor()
+    level_compositor.prepare(frame_resized.shape[0], frame_resized.shape[1], 1)
+    level_compositor.place(0, frame_resized)
+    FilterPipeline([BlurStage(blur_kernel_size(blur_strength))]).process(frame_resized, out=level_compositor.pane(1))
+    return level_compositor.canvas
+
+# Function to render the full-resolution blurred image for one blur strength (for export)
+def render_export_level(blur_strength):
+    return apply_blur(frame, blur_kernel_size(blur_strength))
+
+# Background renderers for every blur level (None unless --precompute is given)
+display_levels = None
+export_levels = None
+
+# Blur stage driven by the trackbar, writing into a reusable buffer
+blur_stage = BlurStage()
+pipeline = FilterPipeline([blur_stage])
+
+# Preallocated "original | blurred" canvas (grayscale, like the ultrasound image)
+compositor = Compositor()
+
+# Side-by-side results for recently used blur strengths
+result_cache = ResultCache()
+
+# Blur strength of the image currently on screen (None forces the first render)
+shown_strength = None
+
 # Function to update the blur strength using the trackbar
 def update_blur(val):
+    global shown_strength
     # Get the blur strength value from the trackbar
     blur_strength = cv2.getTrackbarPos('Blur Strength', 'Noise Reduction')
 
-    # Ensure that the kernel size is odd and greater than or equal to 3
-    ksize = blur_strength * 2 + 1 if blur_strength > 0 else 1
-
-    # Apply the blur to reduce noise
-    blurred_img = apply_blur(frame_resized.copy(), ksize)
-
-    # Combine the original and blurred images side by side for comparison
-    combined = np.hstack((frame_resized, blurred_img))
+    # The image is static, so only recompute when the strength changed
+    if blur_strength == shown_strength:
+        return
+    shown_strength = blur_strength
+
+    # A precomputed level is a plain buffer swap; otherwise reuse a recent result
+    combined = display_levels.get(blur_strength) if display_levels is not None else None
+    if combined is None:
+        combined = result_cache.get(blur_strength)
+    if combined is None:
+        # Ensure that the kernel size is odd and greater than or equal to 3
+        blur_stage.set_strength(blur_strength)
+
+        # Combine the original and blurred images side by side for comparison: apply the blur
+        # to reduce noise, writing it straight into the right half of the canvas
+        compositor.prepare(frame_resized.shape[0], frame_resized.shape[1], 1)
+        compositor.place(0, frame_resized)
+        pipeline.process(frame_resized, out=compositor.pane(1))
+
+        # The canvas is reused for the next strength, so the cache keeps its own copy
+        combined = compositor.canvas.copy()
+        result_cache.put(blur_strength, combined)
 
     # Display the combined image
     cv2.imshow('Noise Reduction', combined)
@@ -45,6 +103,27 @@ def get_image_path():
     # Return the selected file path
     return file_path
 
+# Function to report precomputation progress in the window title and on the console
+def report_progress():
+    finished, total = display_levels.progress()
+    if export_levels is not None:
+        export_finished, export_total = export_levels.progress()
+        finished += export_finished
+        total += export_total
+    title = 'Noise Reduction' if finished == total else f'Noise Reduction (precomputing {finished}/{total})'
+    cv2.setWindowTitle('Noise Reduction', title)
+    print(f"Precomputed {finished}/{total} blur levels")
+
+# Function to save the full-resolution blurred image for the current blur strength
+def export_current_level():
+    blur_strength = cv2.getTrackbarPos('Blur Strength', 'Noise Reduction')
+    blurred = export_levels.get(blur_strength) if export_levels is not None else None
+    if blurred is None:
+        blurred = render_export_level(blur_strength)
+    file_name = f'ultrasound_blur_{blur_strength}.png'
+    cv2.imwrite(file_name, blurred)
+    print(f"Full-resolution image saved as {file_name}")
+
 # Function to resize image to fit a window size limit
 def resize_image(image, max_width=600, max_height=600):
     height, width = image.shape[:2]
@@ -53,41 +132,86 @@ def resize_image(image, max_width=600, max_height=600):
         return cv2.resize(image, (int(width * scaling_factor), int(height * scaling_factor)))
     return image
 
-# Ask the user to select an ultrasound image file
-file_path = get_image_path()
-
-# Check if the selected file exists and load the image
-if os.path.exists(file_path):
-    # Load the image in grayscale mode
-    frame = cv2.imread(file_path, cv2.IMREAD_GRAYSCALE)
-
-    # Check if the image was loaded successfully
-    if frame is None:
-        print("Error: Could not load image")
+if __name__ == "__main__":
+    parser = lab_arg_parser("Lab 5: ultrasound noise reduction")
+    parser.add_argument('--blur', type=int, default=0, help='Blur strength (0 to 10)')
+    parser.add_argument('--cache-mb', type=int, default=256, help='Memory budget for remembered results (MB)')
+    parser.add_argument('--precompute', action='store_true', help='Render every blur level in the background')
+    parser.add_argument('--precompute-full', action='store_true',
+                        help='Also render every blur level at full resolution for export')
+    args = parser.parse_args()
+    profiler.configure(args)
+    result_cache.max_bytes = args.cache_mb * 1024 * 1024
+
+    # Headless mode: ultrasound images are blurred in grayscale at full resolution
+    if args.source:
+        ksize = blur_kernel_size(args.blur)
+
+        def process_ultrasound(image):
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            return apply_blur(gray, ksize)
+
+        run_headless(process_ultrasound, args.source, args.output, args.max_frames)
         exit()
-else:
-    # If no file was selected or file not found, exit
-    print("Error: No file selected or file not found")
-    exit()
-
-# Resize the image to fit within the window
-frame_resized = resize_image(frame)
-
-# Create a window to display the noise reduction effect
-cv2.namedWindow('Noise Reduction', cv2.WINDOW_NORMAL)
 
-# Create a trackbar to control the blur strength (0 to 10)
-cv2.createTrackbar('Blur Strength', 'Noise Reduction', 0, 10, update_blur)
+    # Ask the user to select an ultrasound image file
+    file_path = get_image_path()
 
-# Display the initial image
-update_blur(0)
+    # Check if the selected file exists and load the image
+    if os.path.exists(file_path):
+        # Load the image in grayscale mode
+        frame = cv2.imread(file_path, cv2.IMREAD_GRAYSCALE)
 
-# Display the original and noise-reduced images side by side
-while True:
-    # Wait for user input to adjust the trackbar and update the window
-    key = cv2.waitKey(1) & 0xFF
-    if key == ord('q'):
-        break
+        # Check if the image was loaded successfully
+        if frame is None:
+            print("Error: Could not load image")
+            exit()
+    else:
+        # If no file was selected or file not found, exit
+        print("Error: No file selected or file not found")
+        exit()
 
-# Release all OpenCV windows
-cv2.destroyAllWindows()
+    # Resize the image to fit within the window
+    frame_resized = resize_image(frame)
+
+    # Start rendering every blur level in the background (display size first, then export size)
+    if args.precompute or args.precompute_full:
+        display_levels = BackgroundPrecomputer(range(BLUR_LEVELS), render_display_level)
+    if args.precompute_full:
+        export_levels = BackgroundPrecomputer(range(BLUR_LEVELS), render_export_level)
+
+    # Create a window to display the noise reduction effect
+    cv2.namedWindow('Noise Reduction', cv2.WINDOW_NORMAL)
+
+    # Create a trackbar to control the blur strength (0 to 10)
+    cv2.createTrackbar('Blur Strength', 'Noise Reduction', 0, 10, update_blur)
+
+    # Display the initial image
+    update_blur(0)
+
+    # Display the original and noise-reduced images side by side
+    last_progress = None
+    while True:
+        # Report precomputation progress whenever it changes (never waits for the workers)
+        if display_levels is not None:
+            progress = (display_levels.progress(), export_levels.progress() if export_levels is not None else None)
+            if progress != last_progress:
+                last_progress = progress
+                report_progress()
+
+        # Wait for user input to adjust the trackbar and update the window
+        key = cv2.waitKey(1) & 0xFF
+
+        # Press 's' to save the full-resolution blurred image
+        if key == ord('s'):
+            export_current_level()
+
+        if key == ord('q'):
+            break
+
+    # Stop any unfinished precomputation and release all OpenCV windows
+    if display_levels is not None:
+        display_levels.shutdown()
+    if export_levels is not None:
+        export_levels.shutdown()
+    cv2.destroyAllWindows()
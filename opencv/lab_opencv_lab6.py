@@ -16,84 +16,171 @@
 import cv2
 import numpy as np
 
-# Load the pre-trained face detection model (Haar Cascade)
-face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+from compositor import Compositor
+from detection_cache import FrameDetectionCache
+from detector_registry import detectors
+from face_detectors import add_detector_args, face_backend_from_args
+from face_tracking import add_tracking_args, face_detector_from_args
+from frame_grabber import FrameGrabber
+from headless import lab_arg_parser, run_headless
+from instrumentation import profiler
+from motion_gate import add_gate_args, motion_gate_from_args
+from tiled_detection import add_tiling_args, tiled_cascade_from_args
+
+# The pre-trained face detection model (Haar Cascade), loaded on first use
+face_cascade = detectors.lazy('face')
 
 # Function to enhance the red channel of the detected face region
 def enhance_red_channel(image, enhancement_value):
-    # Convert image to RGB (OpenCV reads images as BGR by default)
-    img_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-
-    # Split the image into its color channels
-    r, g, b = cv2.split(img_rgb)
-
-    # Enhance the red channel by adding the enhancement value
-    r = cv2.add(r, enhancement_value)
+    # Saturating add on the red plane only (BGR order), without converting to RGB
+    return cv2.add(image, (0, 0, enhancement_value, 0))
+
+# Function to enhance the red channel of every face region in place
+# Each face is a view into image, and cv2.add writes the saturated sum straight back
+# into it, so there is no colour conversion, split/merge or temporary face image.
+# The faces stay a loop of per-ROI adds on purpose: one masked cv2.add over the frame
+# touches every pixel and was slower at every face count measured (1080p, 1/5/20/60
+# faces: loop 0.04/0.13/0.34/1.28 ms, mask build + masked add 1.6/1.6/1.3/1.8 ms)
+def enhance_red_regions(image, faces, enhancement_value):
+    if enhancement_value == 0:
+        return image
+    red_boost = (0, 0, enhancement_value, 0)
+    for (x, y, w, h) in faces:
+        face_roi = image[y:y+h, x:x+w]
+        cv2.add(face_roi, red_boost, dst=face_roi)
+    return image
+
+# Preallocated "original | enhanced" canvas
+compositor = Compositor()
+
+# Function to detect faces in a grayscale frame (the BGR frame for a colour backend)
+def detect_faces(gray_frame):
+    return face_cascade.detectMultiScale(gray_frame, 1.3, 5)
+
+# Face boxes of the current frame: the cascade runs once per captured frame, and
+# trackbar re-renders of the same frame reuse the boxes
+detection_cache = FrameDetectionCache(detect_faces)
+
+# Function to detect faces and enhance the red channel of each face region
+# The result is written into out (e.g. a compositor pane) when given; without out the
+# frame itself is enhanced in place, so callers that need the original pass an out.
+# Pass faces to reuse boxes that were already detected for this frame
+def enhance_faces(frame, gray_frame, enhancement_value, out=None, faces=None):
+    # Detect faces in the frame
+    if faces is None:
+        faces = detect_faces(gray_frame)
 
-    # Merge the channels back together
-    enhanced_img = cv2.merge([r, g, b])
+    if out is None:
+        out = frame
+    elif out is not frame:
+        np.copyto(out, frame)
 
-    # Convert back to BGR format for displaying with OpenCV
-    enhanced_img_bgr = cv2.cvtColor(enhanced_img, cv2.COLOR_RGB2BGR)
+    # Enhance the red channel of all face regions
+    enhance_red_regions(out, faces, enhancement_value)
 
-    return enhanced_img_bgr
+    return out, faces
 
 # Function to update the red enhancement using the trackbar
+# Only the colour step is redone here: the faces come from the detection cache, so
+# moving the trackbar never runs the cascade again
 def update_red_enhancement(val):
-    global frame
     enhancement_value = cv2.getTrackbarPos('Red Enhancement', 'Stress Detection')
-
-    # Detect faces in the frame
-    faces = face_cascade.detectMultiScale(gray_frame, 1.3, 5)
-
-    # Create a copy of the original frame to enhance red channel only on faces
-    frame_copy = frame.copy()
-
-    # Loop through all detected faces
-    for (x, y, w, h) in faces:
-        # Extract the face region from the original frame
-        face_roi = frame_copy[y:y+h, x:x+w]
-
-        # Enhance the red channel of the face region
-        enhanced_face = enhance_red_channel(face_roi, enhancement_value)
-
-        # Replace the face region in the frame with the enhanced face
-        frame_copy[y:y+h, x:x+w] = enhanced_face
-
-    # Combine original and enhanced images side by side
-    combined_frame = np.hstack((frame, frame_copy))
+    faces = detection_cache.latest()
+    if faces is None:
+        return
+
+    # Combine original and enhanced images side by side: the original is copied into the
+    # left half of the canvas and the faces are enhanced straight in the right half
+    with profiler.stage('compose'):
+        compositor.prepare(frame.shape[0], frame.shape[1])
+        compositor.place(0, frame)
+    with profiler.stage('enhance'):
+        enhance_faces(frame, None, enhancement_value, out=compositor.pane(1), faces=faces)
+    combined_frame = compositor.canvas
 
     # Display the combined image
-    cv2.imshow('Stress Detection', combined_frame)
-
-# Capture video from the webcam
-cap = cv2.VideoCapture(0)
-
-# Create a window for displaying the stress detection
-cv2.namedWindow('Stress Detection', cv2.WINDOW_NORMAL)
-
-# Create a trackbar to control the red enhancement value
-cv2.createTrackbar('Red Enhancement', 'Stress Detection', 0, 100, update_red_enhancement)
-
-# Main loop to process the video feed
-while True:
-    # Capture frame-by-frame from the webcam
-    ret, frame = cap.read()
-
-    # If frame was not captured successfully, exit the loop
-    if not ret:
-        break
-
-    # Convert the frame to grayscale for face detection
-    gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-    # Update the red enhancement
-    update_red_enhancement(0)
-
-    # Exit the loop if the user presses 'q'
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-# Release the webcam and close all OpenCV windows
-cap.release()
-cv2.destroyAllWindows()
+    profiler.draw_overlay(combined_frame)
+    with profiler.stage('imshow'):
+        cv2.imshow('Stress Detection', combined_frame)
+
+if __name__ == "__main__":
+    parser = lab_arg_parser("Lab 6: stress detection with red channel enhancement")
+    parser.add_argument('--red', type=int, default=0, help='Red enhancement value (0 to 100)')
+    add_tracking_args(parser)
+    add_tiling_args(parser)
+    add_detector_args(parser)
+    add_gate_args(parser)
+    args = parser.parse_args()
+    profiler.configure(args)
+    # The face detector backend, run on overlapping tiles in parallel threads with --tiles
+    backend = face_backend_from_args(args)
+    face_cascade = tiled_cascade_from_args(backend.name, args) or backend
+    # With --track the cache runs the detect-then-track update instead of the bare cascade;
+    # the cascade calls themselves are counted
+    detect = face_detector_from_args(detection_cache.counted(detect_faces), args)
+    # With --motion-gate the detector is skipped on frames without motion
+    gate = motion_gate_from_args(detect, args)
+    detection_cache.detect = gate.update if gate else detect
+
+    # Headless mode: enhance detected faces and record the face boxes per frame
+    if args.source:
+        state = {'frame_number': 0}
+
+        def process_stress(image):
+            state['frame_number'] += 1
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            faces = detection_cache.get(state['frame_number'], image if backend.color else gray)
+            return enhance_faces(image, gray, args.red, faces=faces)
+
+        run_headless(process_stress, args.source, args.output, args.max_frames)
+        print(detection_cache.summary())
+        if gate:
+            print(gate.summary())
+        exit()
+
+    # Capture video from the webcam
+    cap = FrameGrabber(0)
+
+    # Create a window for displaying the stress detection
+    cv2.namedWindow('Stress Detection', cv2.WINDOW_NORMAL)
+
+    # Create a trackbar to control the red enhancement value
+    cv2.createTrackbar('Red Enhancement', 'Stress Detection', 0, 100, update_red_enhancement)
+
+    # Main loop to process the video feed
+    frame_number = 0
+    while True:
+        # Capture frame-by-frame from the webcam
+        with profiler.stage('capture'):
+            ret, frame = cap.read()
+
+        # If frame was not captured successfully, exit the loop
+        if not ret:
+            break
+        frame_number += 1
+
+        # Convert the frame to grayscale for face detection
+        with profiler.stage('convert'):
+            gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        # Detect faces once for this frame (a colour backend such as the DNN gets the BGR frame)
+        with profiler.stage('detect'):
+            detection_cache.get(frame_number, frame if backend.color else gray_frame)
+
+        # Update the red enhancement
+        update_red_enhancement(0)
+
+        # Exit the loop if the user presses 'q'
+        with profiler.stage('waitkey'):
+            key = cv2.waitKey(1)
+        profiler.frame_done()
+        if key & 0xFF == ord('q'):
+            break
+
+    # Release the webcam and close all OpenCV windows
+    cap.release()
+    cv2.destroyAllWindows()
+    profiler.close()
+    print(detection_cache.summary())
+    if gate:
+        print(gate.summary())
@@ -13,83 +13,92 @@
 # 4. Display both the original frame and a motion-highlighted frame side by side.
 
 import cv2
-import numpy as np
 
-# Function to detect and highlight motion
-def detect_motion(prev_frame, current_frame):
-    # Convert both frames to grayscale
-    prev_gray = cv2.cvtColor(prev_frame, cv2.COLOR_BGR2GRAY)
-    current_gray = cv2.cvtColor(current_frame, cv2.COLOR_BGR2GRAY)
-
-    # Apply Gaussian blur to both frames to reduce noise
-    prev_blur = cv2.GaussianBlur(prev_gray, (21, 21), 0)
-    current_blur = cv2.GaussianBlur(current_gray, (21, 21), 0)
-
-    # Compute the absolute difference between the previous and current frames
-    diff_frame = cv2.absdiff(prev_blur, current_blur)
-
-    # Threshold the difference to get the regions with significant motion
-    _, thresh_frame = cv2.threshold(diff_frame, 25, 255, cv2.THRESH_BINARY)
-
-    # Dilate the thresholded frame to fill in gaps
-    dilated_frame = cv2.dilate(thresh_frame, None, iterations=2)
-
-    # Find contours of the motion
-    contours, _ = cv2.findContours(dilated_frame, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-    # Loop through the contours and highlight areas with significant motion
-    motion_frame = current_frame.copy()
-    for contour in contours:
-        if cv2.contourArea(contour) < 1000:
-            # Ignore small movements to reduce noise
-            continue
-        # Get the bounding box for the contour
-        (x, y, w, h) = cv2.boundingRect(contour)
-        # Draw a rectangle around the motion area
-        cv2.rectangle(motion_frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-
-    return motion_frame
-
-# Capture video from the webcam
-cap = cv2.VideoCapture(0)
-
-# Check if webcam opened successfully
-if not cap.isOpened():
-    print("Error: Could not open webcam")
-    exit()
-
-# Read the first frame to initialize the previous frame
-ret, prev_frame = cap.read()
-if not ret:
-    print("Error: Could not read video feed")
-    exit()
-
-# Create a window for displaying the monitoring feed
-cv2.namedWindow('Motion Detection', cv2.WINDOW_NORMAL)
-
-# Main loop to process the video feed
-while True:
-    # Capture the current frame
-    ret, current_frame = cap.read()
-    if not ret:
-        break
-
-    # Detect motion and highlight the areas
-    motion_highlighted_frame = detect_motion(prev_frame, current_frame)
-
-    # Combine the original and motion-highlighted frames side by side
-    combined_frame = np.hstack((current_frame, motion_highlighted_frame))
+from compositor import Compositor
+from frame_grabber import FrameGrabber
+from headless import lab_arg_parser, run_headless
+from instrumentation import profiler
+from motion_detection import MotionDetector, add_motion_args, draw_motion, motion_detector_from_args
 
-    # Display the combined frames
-    cv2.imshow('Motion Detection', combined_frame)
+# Preallocated "original | motion" canvas
+compositor = Compositor()
 
-    # Update the previous frame to the current frame for the next iteration
-    prev_frame = current_frame
+# Motion detector that keeps the blurred previous frame between calls
+motion_detector = MotionDetector()
 
-    # Break the loop if the user presses 'q'
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-# Release the webcam and close all OpenCV windows
-cap.release()
-cv2.destroyAllWindows()
+# Function to detect and highlight motion
+# Kept for callers that pass both frames; the previous frame's grayscale blur is reused
+# when prev_frame is the frame that was current on the last call
+def detect_motion(prev_frame, current_frame):
+    boxes = motion_detector.compare(prev_frame, current_frame)
+    return draw_motion(current_frame, boxes)
+
+if __name__ == "__main__":
+    parser = lab_arg_parser("Lab 7: bed motion monitoring")
+    add_motion_args(parser)
+    args = parser.parse_args()
+    profiler.configure(args)
+    motion_detector = motion_detector_from_args(args)
+
+    # Headless mode: compare each frame with the previous one from the file or directory
+    if args.source:
+        def process_motion(image):
+            return draw_motion(image, motion_detector.update(image))
+
+        run_headless(process_motion, args.source, args.output, args.max_frames)
+        exit()
+
+    # Capture video from the webcam
+    cap = FrameGrabber(0)
+
+    # Check if webcam opened successfully
+    if not cap.isOpened():
+        print("Error: Could not open webcam")
+        exit()
+
+    # Read the first frame to initialize the previous frame
+    ret, prev_frame = cap.read()
+    if not ret:
+        print("Error: Could not read video feed")
+        exit()
+    motion_detector.update(prev_frame)
+
+    # Create a window for displaying the monitoring feed
+    cv2.namedWindow('Motion Detection', cv2.WINDOW_NORMAL)
+
+    # Main loop to process the video feed
+    while True:
+        # Capture the current frame
+        with profiler.stage('capture'):
+            ret, current_frame = cap.read()
+        if not ret:
+            break
+
+        # Detect motion against the previous frame (its blur is kept by the detector)
+        with profiler.stage('detect'):
+            boxes = motion_detector.update(current_frame)
+
+        # Combine the original and motion-highlighted frames side by side, drawing the
+        # highlights straight into the right pane
+        with profiler.stage('compose'):
+            compositor.prepare(current_frame.shape[0], current_frame.shape[1])
+            compositor.place(0, current_frame)
+            draw_motion(current_frame, boxes, out=compositor.pane(1))
+            combined_frame = compositor.canvas
+
+        # Display the combined frames
+        profiler.draw_overlay(combined_frame)
+        with profiler.stage('imshow'):
+            cv2.imshow('Motion Detection', combined_frame)
+
+        # Break the loop if the user presses 'q'
+        with profiler.stage('waitkey'):
+            key = cv2.waitKey(1)
+        profiler.frame_done()
+        if key & 0xFF == ord('q'):
+            break
+
+    # Release the webcam and close all OpenCV windows
+    cap.release()
+    cv2.destroyAllWindows()
+    profiler.close()
@@ -14,68 +14,138 @@
 # student's face is detected.
 
 import cv2
+import numpy as np
 import time
 
-# Load the pre-trained face detection model (Haar Cascade)
-face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+from batched_inference import add_batching_args, batcher_from_args
+from cascade_search import CascadeSearch, add_search_args
+from detector_registry import detectors
+from face_detectors import add_detector_args, face_backend_from_args
+from face_tracking import add_tracking_args, face_detector_from_args
+from frame_grabber import FrameGrabber
+from headless import lab_arg_parser, run_headless, source_fps
+from identity_tracker import IdentityTracker
+from instrumentation import profiler
+from motion_gate import add_gate_args, motion_gate_from_args
+from tiled_detection import add_tiling_args, tiled_cascade_from_args
+
+# The pre-trained face detection model (Haar Cascade), loaded on first use
+face_cascade = detectors.lazy('face')
+
+# Face search front end: a plain full-frame detectMultiScale unless the downscale,
+# ROI or adaptive size options are given
+face_search = CascadeSearch(face_cascade, scale_factor=1.1, min_neighbors=5, min_size=(30, 30))
+
+# Function to detect faces in a grayscale frame (the BGR frame for a colour backend)
+def detect_faces(gray_frame):
+    return face_search(gray_frame)
 
 # Function to check face detection and monitor attention
-def monitor_attention(frame, last_seen_time, face_position, attention_threshold=2):
-    # Convert frame to grayscale for face detection
-    gray_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-
-    # Detect faces in the current frame
-    faces = face_cascade.detectMultiScale(gray_frame, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
-
-    # If faces are detected, update the last seen time and position
-    if len(faces) > 0:
-        last_seen_time = time.time()
-        face_position = faces[0]  # Assuming one face, update the position
-
-        # Draw a green rectangle around the detected face
-        for (x, y, w, h) in faces:
-            cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
-
-    # If no face is detected, check how long it's been since the last face was seen
-    else:
-        elapsed_time = time.time() - last_seen_time
-
-        # If the face hasn't been seen for a certain threshold, highlight absence
-        if elapsed_time > attention_threshold:
-            # Draw a red rectangle where the face was last seen
-            (x, y, w, h) = face_position
-            cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 0, 255), 2)
-            cv2.putText(frame, "No Face Detected", (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 255), 2)
-
-    return frame, last_seen_time, face_position
-
-# Capture video from the webcam
-cap = cv2.VideoCapture(0)
-
-# Initialize variables for face tracking
-last_seen_time = time.time()
-face_position = (0, 0, 0, 0)  # Initialize with no face position
-
-# Create a window for displaying the attention monitoring feed
-cv2.namedWindow('Attention Monitoring', cv2.WINDOW_NORMAL)
-
-# Main loop to process the video feed
-while True:
-    # Capture the current frame from the webcam
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    # Monitor attention using face detection
-    frame, last_seen_time, face_position = monitor_attention(frame, last_seen_time, face_position)
-
-    # Display the frame with attention monitoring
-    cv2.imshow('Attention Monitoring', frame)
-
-    # Break the loop if the user presses 'q'
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-# Release the webcam and close all OpenCV windows
-cap.release()
-cv2.destroyAllWindows()
+# Every face gets its own seat in tracker, and each seat whose face has been missing for
+# longer than attention_threshold seconds is highlighted independently.
+# detect can be swapped for a detect-then-track update function (--track)
+# color: detect on the BGR frame itself (colour-trained backends such as the DNN)
+def monitor_attention(frame, tracker, attention_threshold=2, detect=detect_faces, now=None, color=False):
+    if now is None:
+        now = time.time()
+
+    # Convert frame to grayscale for face detection (colour backends get the frame as is)
+    image = frame if color else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+    # Detect faces in the current frame and match them to the known seats
+    faces = detect(image)
+    tracker.update(faces, now)
+
+    # Draw a green rectangle around every detected face
+    for (x, y, w, h) in faces:
+        cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+
+    # Draw a red rectangle where each absent face was last seen
+    for row in np.flatnonzero(tracker.absent(now, attention_threshold)):
+        (x, y, w, h) = tracker.boxes[row].astype(int)
+        cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 0, 255), 2)
+        cv2.putText(frame, "No Face Detected", (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 255), 2)
+
+    return frame, tracker.seats(now)
+
+if __name__ == "__main__":
+    parser = lab_arg_parser("Lab 8: classroom attention monitoring")
+    parser.add_argument('--threshold', type=float, default=2, help='Seconds without a face before flagging absence')
+    parser.add_argument('--forget-after', type=float,
+                        help='Seconds after which an empty seat is dropped (default: 5 x --threshold)')
+    add_search_args(parser)
+    add_tracking_args(parser)
+    add_tiling_args(parser)
+    add_detector_args(parser)
+    add_batching_args(parser)
+    add_gate_args(parser)
+    args = parser.parse_args()
+    profiler.configure(args)
+    face_search.configure(args)
+    # The face detector backend, run on overlapping tiles in parallel threads with --tiles,
+    # or as one DNN batch of tiles per frame with --batch-tiles
+    backend = face_backend_from_args(args)
+    face_search.cascade = tiled_cascade_from_args(backend.name, args) or batcher_from_args(backend, args) or backend
+    detect = face_detector_from_args(detect_faces, args)
+    # With --motion-gate the detector is skipped on frames without motion
+    gate = motion_gate_from_args(detect, args)
+    detect = gate.update if gate else detect
+
+    # One seat per face, kept across the frames. Seats empty for longer than forget_after
+    # are dropped, so a spurious one-frame detection is not flagged absent forever
+    forget_after = args.forget_after if args.forget_after is not None else 5 * args.threshold
+    tracker = IdentityTracker(forget_after=forget_after)
+
+    # Headless mode: record every seat's box and absence time per frame
+    # Absence is timed in video time (frame number / fps), not by how fast frames are
+    # processed, so the results are the same on every run
+    if args.source:
+        fps = source_fps(args.source)
+        state = {'frame_number': 0}
+
+        def process_attention(image):
+            now = state['frame_number'] / fps
+            state['frame_number'] += 1
+            return monitor_attention(image, tracker, args.threshold, detect, now=now, color=backend.color)
+
+        run_headless(process_attention, args.source, args.output, args.max_frames)
+        if gate:
+            print(gate.summary())
+        exit()
+
+    # Capture video from the webcam
+    cap = FrameGrabber(0)
+
+    # Create a window for displaying the attention monitoring feed
+    cv2.namedWindow('Attention Monitoring', cv2.WINDOW_NORMAL)
+
+    # Main loop to process the video feed
+    while True:
+        # Capture the current frame from the webcam
+        with profiler.stage('capture'):
+            ret, frame = cap.read()
+        if not ret:
+            break
+
+        # Monitor attention using face detection
+        with profiler.stage('detect'):
+            frame, seats = monitor_attention(frame, tracker, args.threshold, detect, color=backend.color)
+
+        # Display the frame with attention monitoring
+        profiler.draw_overlay(frame)
+        with profiler.stage('imshow'):
+            cv2.imshow('Attention Monitoring', frame)
+
+        # Break the loop if the user presses 'q'
+        with profiler.stage('waitkey'):
+            key = cv2.waitKey(1)
+        profiler.frame_done()
+        if key & 0xFF == ord('q'):
+            break
+
+    # Release the webcam and close all OpenCV windows
+    cap.release()
+    cv2.destroyAllWindows()
+    profiler.close()
+    if gate:
+        print(gate.summary())
@@ -9,24 +9,38 @@
 
 import cv2
 
-# Initialize the HOG descriptor/person detector
-hog = cv2.HOGDescriptor()
-hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+from detector_registry import detectors
+from frame_grabber import FrameGrabber
+from headless import lab_arg_parser, run_headless
+from instrumentation import profiler
+from motion_gate import add_gate_args, motion_gate_from_args
+
+# The HOG descriptor/person detector, built on first use
+hog = detectors.lazy('people')
+
+# Size of the HOG people detection window (width, height); smaller images crash detectMultiScale
+HOG_WINDOW = (64, 128)
 
 # Initialize variables
 visitor_count = 0
 crossing_line = 250  # Line on the screen that people must cross
 frame_count = 0      # To track frames for detection frequency
 
+# Function to find people in a resized frame
+def find_people(frame_resized):
+    rects, _ = hog.detectMultiScale(frame_resized, winStride=(8, 8), padding=(16, 16), scale=1.05)
+    return rects
+
 # Function to detect people and update the count
-def detect_people(frame, visitor_count):
+# find can be swapped for a motion-gated version of find_people (--motion-gate)
+def detect_people(frame, visitor_count, find=find_people):
     global crossing_line
 
     # Resize the frame for faster processing
     frame_resized = cv2.resize(frame, (640, 480))
 
     # Detect people in the frame
-    rects, _ = hog.detectMultiScale(frame_resized, winStride=(8, 8), padding=(16, 16), scale=1.05)
+    rects = find(frame_resized)
 
     # Draw a horizontal line where people will be counted
     cv2.line(frame_resized, (0, crossing_line), (640, crossing_line), (0, 255, 255), 2)
@@ -47,38 +61,72 @@ def detect_people(frame, visitor_count):
 
     return frame_resized, visitor_count
 
-# Capture video from the webcam
-cap = cv2.VideoCapture(0)
-
-# Create a window for displaying the real-time visitor count
-cv2.namedWindow('Visitor Counter', cv2.WINDOW_NORMAL)
-
-# Main loop to process the video feed
-while True:
-    # Capture the current frame from the webcam
-    ret, frame = cap.read()
-    if not ret:
-        break
-
-    frame_count += 1
-
-    # Only run detection every 5 frames to reduce processing load
-    if frame_count % 5 == 0:
-        # Detect people and update the visitor count
-        frame, visitor_count = detect_people(frame, visitor_count)
-
-    # Display the visitor count on the frame
-    cv2.putText(frame, f"Visitors: {visitor_count}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 2)
-
-    # Display the frame with the visitor count
-    cv2.imshow('Visitor Counter', frame)
-
-    # Break the loop if the user presses 'q'
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-# Release the webcam and close all OpenCV windows
-cap.release()
-cv2.destroyAllWindows()
-
-
+if __name__ == "__main__":
+    parser = lab_arg_parser("Lab 9: museum visitor counter")
+    add_gate_args(parser)
+    args = parser.parse_args()
+    profiler.configure(args)
+    # With --motion-gate the HOG detector is skipped when nothing moved since its last run
+    # (motion region crops are grown to at least the 64x128 HOG window)
+    gate = motion_gate_from_args(find_people, args, min_region_size=HOG_WINDOW)
+    find = gate.update if gate else find_people
+
+    # Headless mode: run detection every 5 frames like the live loop and record the count
+    if args.source:
+        state = {'frame_count': 0, 'visitor_count': 0}
+
+        def process_visitors(image):
+            state['frame_count'] += 1
+            if state['frame_count'] % 5 == 0:
+                image, state['visitor_count'] = detect_people(image, state['visitor_count'], find)
+            return image, state['visitor_count']
+
+        run_headless(process_visitors, args.source, args.output, args.max_frames)
+        if gate:
+            print(gate.summary())
+        exit()
+
+    # Capture video from the webcam
+    cap = FrameGrabber(0)
+
+    # Create a window for displaying the real-time visitor count
+    cv2.namedWindow('Visitor Counter', cv2.WINDOW_NORMAL)
+
+    # Main loop to process the video feed
+    while True:
+        # Capture the current frame from the webcam
+        with profiler.stage('capture'):
+            ret, frame = cap.read()
+        if not ret:
+            break
+
+        frame_count += 1
+
+        # Only run detection every 5 frames to reduce processing load
+        if frame_count % 5 == 0:
+            # Detect people and update the visitor count
+            with profiler.stage('detect'):
+                frame, visitor_count = detect_people(frame, visitor_count, find)
+
+        # Display the visitor count on the frame
+        with profiler.stage('draw'):
+            cv2.putText(frame, f"Visitors: {visitor_count}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 0, 0), 2)
+
+        # Display the frame with the visitor count
+        profiler.draw_overlay(frame)
+        with profiler.stage('imshow'):
+            cv2.imshow('Visitor Counter', frame)
+
+        # Break the loop if the user presses 'q'
+        with profiler.stage('waitkey'):
+            key = cv2.waitKey(1)
+        profiler.frame_done()
+        if key & 0xFF == ord('q'):
+            break
+
+    # Release the webcam and close all OpenCV windows
+    cap.release()
+    cv2.destroyAllWindows()
+    profiler.close()
+    if gate:
+        print(gate.summary())
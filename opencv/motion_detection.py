@@ -0,0 +1,256 @@
+# Stateful Motion Detector
+# detect_motion() in lab7 converted and blurred both frames on every call, although
+# the previous frame had already been converted and blurred one call earlier.
+# MotionDetector keeps the state between frames, so each frame is converted and
+# blurred exactly once. The working images are allocated once and written with dst=;
+# they are reallocated only when the frame size changes.
+#   update(frame)            - motion boxes between the background and this frame
+#                              (none for the first frame)
+#   compare(previous, frame) - the old two-frame call; the cached state is reused when
+#                              previous is the frame that was passed last time
+# Boxes are returned as an (N, 4) int32 array of x, y, w, h.
+#
+# The foreground mask comes from one of several engines, all behind apply(gray, mask):
+#   diff    - difference with the previous frame (the original lab7 method); the
+#             background is always the last frame, so there is no learning rate
+#   average - difference with a running average of past frames (accumulateWeighted);
+#             learning_rate is the weight of each new frame
+#   mog2    - OpenCV's Gaussian mixture background subtractor
+#   knn     - OpenCV's k-nearest-neighbours background subtractor
+#             (learning_rate -1 lets OpenCV choose it from the history length)
+# Frame differencing needs a heavy blur and two dilations to be usable; the background
+# models are steadier and get by with much less, so blur and dilation default per engine.
+# With downscale < 1 the whole analysis (engine, threshold, dilation and blob labelling) runs
+# on a smaller grayscale copy of the frame, so at 1/4 scale it touches 1/16 of the
+# pixels. The blur kernel and the minimum area shrink with the image, and the boxes are
+# mapped back to full-resolution coordinates for drawing. min_area stays in
+# full-resolution pixels (lab7's original 1000 px threshold) unless a reference frame
+# size is given, in which case it is scaled to the frame's resolution.
+
+import cv2
+import numpy as np
+
+from blobs import find_blobs
+
+# Per-engine defaults: learning rate, blur kernel size (1 = no blur) and dilation iterations
+ENGINE_DEFAULTS = {
+    'diff': {'learning_rate': 1.0, 'blur_size': 21, 'dilate_iterations': 2},
+    'average': {'learning_rate': 0.05, 'blur_size': 11, 'dilate_iterations': 1},
+    'mog2': {'learning_rate': -1.0, 'blur_size': 5, 'dilate_iterations': 1},
+    'knn': {'learning_rate': -1.0, 'blur_size': 5, 'dilate_iterations': 1},
+}
+
+
+# Blur gray into out (a plain copy when blur_size is 1) and return out
+def _blurred(gray, blur_size, out):
+    if blur_size <= 1:
+        out[...] = gray
+    else:
+        cv2.GaussianBlur(gray, (blur_size, blur_size), 0, dst=out)
+    return out
+
+
+class FrameDiffEngine:
+    def __init__(self, threshold=25, blur_size=21):
+        self.threshold = threshold
+        self.blur_size = blur_size
+        self.shape = None
+
+    def reset(self):
+        self.shape = None
+
+    # Write the foreground mask of gray into mask; returns False while there is no background yet
+    def apply(self, gray, mask):
+        if gray.shape != self.shape:
+            self.current = np.empty_like(gray)
+            self.previous = np.empty_like(gray)
+            self.diff = np.empty_like(gray)
+            self.shape = gray.shape
+            _blurred(gray, self.blur_size, self.current)
+            return False
+        self.previous, self.current = self.current, self.previous
+        _blurred(gray, self.blur_size, self.current)
+        cv2.absdiff(self.previous, self.current, dst=self.diff)
+        cv2.threshold(self.diff, self.threshold, 255, cv2.THRESH_BINARY, dst=mask)
+        return True
+
+
+class RunningAverageEngine:
+    def __init__(self, learning_rate=0.05, threshold=25, blur_size=11):
+        self.learning_rate = learning_rate
+        self.threshold = threshold
+        self.blur_size = blur_size
+        self.shape = None
+
+    def reset(self):
+        self.shape = None
+
+    def apply(self, gray, mask):
+        if gray.shape != self.shape:
+            self.blur = np.empty_like(gray)
+            self.background_gray = np.empty_like(gray)
+            self.diff = np.empty_like(gray)
+            self.background = _blurred(gray, self.blur_size, self.blur).astype(np.float32)
+            self.shape = gray.shape
+            return False
+        current = _blurred(gray, self.blur_size, self.blur)
+        # Compare with the background before adding the frame to it, so a moving
+        # object does not fade into its own background
+        cv2.convertScaleAbs(self.background, dst=self.background_gray)
+        cv2.absdiff(current, self.background_gray, dst=self.diff)
+        cv2.threshold(self.diff, self.threshold, 255, cv2.THRESH_BINARY, dst=mask)
+        cv2.accumulateWeighted(current, self.background, self.learning_rate)
+        return True
+
+
+class BackgroundSubtractorEngine:
+    # kind: 'mog2' or 'knn'
+    def __init__(self, kind='mog2', learning_rate=-1.0, blur_size=5, history=500):
+        self.kind = kind
+        self.learning_rate = learning_rate
+        self.blur_size = blur_size
+        self.history = history
+        self.reset()
+
+    def reset(self):
+        if self.kind == 'knn':
+            self.subtractor = cv2.createBackgroundSubtractorKNN(history=self.history, detectShadows=False)
+        else:
+            self.subtractor = cv2.createBackgroundSubtractorMOG2(history=self.history, detectShadows=False)
+        self.shape = None
+
+    def apply(self, gray, mask):
+        first = gray.shape != self.shape
+        if first:
+            self.blur = np.empty_like(gray)
+            self.shape = gray.shape
+        self.subtractor.apply(_blurred(gray, self.blur_size, self.blur), mask, self.learning_rate)
+        return not first
+
+
+# A motion engine by name (see ENGINE_DEFAULTS); None picks the engine's default
+def create_motion_engine(name, learning_rate=None, threshold=25, blur_size=None):
+    defaults = ENGINE_DEFAULTS[name]
+    learning_rate = defaults['learning_rate'] if learning_rate is None else learning_rate
+    blur_size = defaults['blur_size'] if blur_size is None else blur_size
+    if name == 'diff':
+        return FrameDiffEngine(threshold, blur_size)
+    if name == 'average':
+        return RunningAverageEngine(learning_rate, threshold, blur_size)
+    return BackgroundSubtractorEngine(name, learning_rate, blur_size)
+
+
+class MotionDetector:
+    # min_area: smallest motion region that is reported, as a pixel count of the full
+    # resolution frame (mapped to the analysis size when downscaled)
+    # min_area_reference: (width, height) to give min_area in pixels of a frame that size
+    # instead, e.g. (640, 480) for the webcam lab7 was written for; it is then scaled to
+    # the frame, so it means the same share of the picture at any resolution
+    # downscale: run the whole analysis on the frame scaled by this factor
+    # blur_size / dilate_iterations / learning_rate: None uses the engine's default
+    def __init__(self, blur_size=None, threshold=25, dilate_iterations=None, min_area=1000,
+                 engine='diff', learning_rate=None, downscale=1.0, min_area_reference=None):
+        # The blur kernel shrinks with the image so it smooths the same part of the scene
+        blur_size = ENGINE_DEFAULTS[engine]['blur_size'] if blur_size is None else blur_size
+        if downscale != 1.0 and blur_size > 1:
+            blur_size = max(3, int(round(blur_size * downscale)) | 1)
+        self.engine_name = engine
+        self.engine = create_motion_engine(engine, learning_rate, threshold, blur_size)
+        self.dilate_iterations = (ENGINE_DEFAULTS[engine]['dilate_iterations']
+                                  if dilate_iterations is None else dilate_iterations)
+        self.min_area = min_area
+        self.min_area_reference = min_area_reference
+        self.downscale = downscale
+
+        self.shape = None
+        self.last_frame = None
+
+    # Forget the background; the next update() reports no motion
+    def reset(self):
+        self.engine.reset()
+        self.last_frame = None
+
+    def _allocate(self, shape):
+        height, width = shape[:2]
+        small_w, small_h = max(1, round(width * self.downscale)), max(1, round(height * self.downscale))
+        self.gray = np.empty((height, width), dtype=np.uint8)
+        self.small = np.empty((small_h, small_w), dtype=np.uint8)
+        self.mask = np.empty((small_h, small_w), dtype=np.uint8)
+        self.dilated = np.empty((small_h, small_w), dtype=np.uint8)
+        self.labels = np.empty((small_h, small_w), dtype=np.int32)
+        # Analysis pixel -> frame pixel factors, and the minimum area in analysis pixels
+        self.box_scale = np.array([width / small_w, height / small_h] * 2)
+        if self.min_area_reference is None:
+            self.area_threshold = self.min_area * (small_w * small_h) / (width * height)
+        else:
+            reference_w, reference_h = self.min_area_reference
+            self.area_threshold = self.min_area * (small_w * small_h) / (reference_w * reference_h)
+        self.shape = shape[:2]
+        self.engine.reset()
+
+    def update(self, frame):
+        if frame.shape[:2] != self.shape:
+            self._allocate(frame.shape)
+        self.last_frame = frame
+
+        if frame.ndim == 3:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self.gray)
+            gray = self.gray
+        else:
+            gray = frame
+        if self.downscale != 1.0:
+            cv2.resize(gray, self.small.shape[::-1], dst=self.small, interpolation=cv2.INTER_AREA)
+            gray = self.small
+
+        if not self.engine.apply(gray, self.mask):
+            return np.empty((0, 4), dtype=np.int32)
+        boxes = self._boxes(self.mask)
+        if self.downscale != 1.0 and len(boxes):
+            boxes = np.rint(boxes * self.box_scale).astype(np.int32)
+        return boxes
+
+    def compare(self, previous_frame, frame):
+        if previous_frame is not self.last_frame:
+            self.reset()
+            self.update(previous_frame)
+        return self.update(frame)
+
+    # Boxes around the large enough regions of the foreground mask
+    def _boxes(self, mask):
+        cv2.dilate(mask, None, dst=self.dilated, iterations=self.dilate_iterations)
+        return find_blobs(self.dilated, self.area_threshold, labels=self.labels).boxes
+
+
+# Draw a green rectangle around every motion box. The frame is copied into out (e.g. a
+# compositor pane) first, or into a new image when out is None
+def draw_motion(frame, boxes, out=None):
+    if out is None:
+        out = frame.copy()
+    elif out is not frame:
+        out[...] = frame
+    for x, y, w, h in boxes:
+        cv2.rectangle(out, (int(x), int(y)), (int(x + w), int(y + h)), (0, 255, 0), 2)
+    return out
+
+
+# Add the motion engine options to a motion lab's command line parser
+def add_motion_args(parser):
+    parser.add_argument('--motion-engine', default='diff', choices=list(ENGINE_DEFAULTS),
+                        help='How the background is modelled: previous frame, running average, MOG2 or KNN')
+    parser.add_argument('--learning-rate', type=float, default=None,
+                        help='Background learning rate (default per engine; -1 = automatic for mog2/knn)')
+    parser.add_argument('--motion-downscale', type=float, default=1.0,
+                        help='Run the motion analysis on the frame scaled by this factor (e.g. 0.25)')
+    parser.add_argument('--min-area', type=float, default=1000,
+                        help='Smallest motion region reported, in full-resolution pixels')
+    parser.add_argument('--min-area-reference', type=int, nargs=2, metavar=('WIDTH', 'HEIGHT'),
+                        help='Give --min-area in pixels of a frame this size, scaled to the actual frame (e.g. 640 480)')
+    return parser
+
+
+# A MotionDetector configured from the add_motion_args() options
+def motion_detector_from_args(args, **options):
+    reference = tuple(args.min_area_reference) if args.min_area_reference else None
+    return MotionDetector(engine=args.motion_engine, learning_rate=args.learning_rate,
+                          downscale=args.motion_downscale, min_area=args.min_area,
+                          min_area_reference=reference, **options)
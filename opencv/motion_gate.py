@@ -0,0 +1,225 @@
+# Motion-Gated Detection
+# The HOG people detector (lab9), the face cascades (lab6, lab8, lab10) and the hand
+# segmentation (lab12) ran on every frame, even though the cameras mostly watch empty
+# corridors and beds where nothing changes. MotionGate puts lab7's frame-difference
+# motion check, run at reduced resolution (well under a millisecond a frame), in front
+# of any detector:
+# - no motion since the previous frame: the detector is skipped and its last result is
+#   reused
+# - motion: the detector runs on the whole frame, or with regions=True only on the
+#   padded moving regions; the last boxes not inside those regions are kept as they were
+# - refresh_interval frames without a full run: the detector runs on the whole frame
+#   anyway, so slow changes the frame difference cannot see are still picked up
+# The first frame and every frame whose size changed run the detector in full.
+# Region mode needs a detector that returns x, y, w, h boxes; it is used when the
+# moving regions together cover at most max_region_fraction of the frame.
+# The counters (full_runs, region_runs, forced_runs, skipped) show how many detector
+# invocations the gate saved; summary() formats them. The motion check is recorded in
+# the profiler as the 'gate' stage.
+
+import numpy as np
+
+from boxes import as_boxes, remove_duplicates
+from instrumentation import profiler
+from motion_detection import MotionDetector
+
+
+# Grow x, y, w, h boxes into x0, y0, x1, y1 regions inside the frame: each side moves out
+# by margin times the box's larger side, and by at least min_margin pixels
+def pad_regions(boxes, shape, margin=0.5, min_margin=32):
+    boxes = as_boxes(boxes)
+    pad = np.maximum(margin * boxes[:, 2:].max(axis=1, initial=0), min_margin)[:, None]
+    regions = np.hstack([boxes[:, :2] - pad, boxes[:, :2] + boxes[:, 2:] + pad])
+    regions = np.clip(regions, 0, [shape[1], shape[0], shape[1], shape[0]])
+    return regions.astype(np.int32)
+
+
+# Grow x0, y0, x1, y1 regions about their centre to at least min_size (width, height),
+# shifted to stay inside the frame. Regions are left as they are when the frame itself
+# is smaller than min_size
+def grow_regions(regions, min_size, shape):
+    regions = np.array(regions, dtype=np.int32).reshape(-1, 4)
+    for axis, (size, limit) in enumerate(zip(min_size, (shape[1], shape[0]))):
+        if size > limit:
+            continue
+        start, end = regions[:, axis], regions[:, axis + 2]
+        short = np.maximum(size - (end - start), 0)
+        start -= short // 2
+        end += short - short // 2
+        shift = np.maximum(-start, 0) - np.maximum(end - limit, 0)
+        start += shift
+        end += shift
+    return regions
+
+
+# Merge overlapping x0, y0, x1, y1 regions until none overlap
+def merge_regions(regions):
+    regions = [list(region) for region in regions]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(regions)):
+            for j in range(i + 1, len(regions)):
+                a, b = regions[i], regions[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    regions[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    del regions[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return np.array(regions, dtype=np.int32).reshape(-1, 4)
+
+
+# Mask of the boxes whose centre lies inside any of the x0, y0, x1, y1 regions
+def centres_in(boxes, regions):
+    boxes = as_boxes(boxes)
+    centre_x = (boxes[:, 0] + boxes[:, 2] / 2)[:, None]
+    centre_y = (boxes[:, 1] + boxes[:, 3] / 2)[:, None]
+    inside = ((centre_x >= regions[:, 0]) & (centre_x < regions[:, 2]) &
+              (centre_y >= regions[:, 1]) & (centre_y < regions[:, 3]))
+    return inside.any(axis=1)
+
+
+# Mask of the boxes that lie entirely inside one of the x0, y0, x1, y1 regions
+def boxes_within(boxes, regions):
+    boxes = as_boxes(boxes)
+    inside = ((boxes[:, 0:1] >= regions[:, 0]) & (boxes[:, 0:1] + boxes[:, 2:3] <= regions[:, 2]) &
+              (boxes[:, 1:2] >= regions[:, 1]) & (boxes[:, 1:2] + boxes[:, 3:4] <= regions[:, 3]))
+    return inside.any(axis=1)
+
+
+class MotionGate:
+    # detect(image) is the gated detector (e.g. a bound detectMultiScale call); it gets
+    # the same image as update(), or crops of it in region mode
+    # downscale / min_area / threshold: the frame-difference check (see MotionDetector);
+    # min_area is in pixels of a 640x480 frame
+    # min_region_size: (width, height) every region crop is grown to, for detectors that
+    # need a minimum input (HOG crashes on images smaller than its 64x128 window)
+    def __init__(self, detect, refresh_interval=30, downscale=0.25, min_area=200, threshold=25,
+                 regions=False, region_margin=0.5, min_region_margin=32, max_region_fraction=0.5,
+                 min_region_size=(0, 0)):
+        self.detect = detect
+        self.min_region_size = tuple(min_region_size)
+        self.refresh_interval = refresh_interval
+        self.regions = regions
+        self.region_margin = region_margin
+        self.min_region_margin = min_region_margin
+        self.max_region_fraction = max_region_fraction
+        self.motion = MotionDetector(engine='diff', threshold=threshold, min_area=min_area, downscale=downscale,
+                                     min_area_reference=(640, 480))
+
+        self.shape = None
+        self.result = None
+        self.frames_since_run = 0
+
+        self.frames = 0
+        self.full_runs = 0
+        self.forced_runs = 0
+        self.region_runs = 0
+        self.region_calls = 0
+        self.skipped = 0
+
+    # Detector result for the next frame of the sequence
+    def update(self, image):
+        self.frames += 1
+        with profiler.stage('gate'):
+            motion = self.motion.update(image)
+
+        if image.shape[:2] != self.shape:
+            self.shape = image.shape[:2]
+            return self._run(image)
+        self.frames_since_run += 1
+        if self.frames_since_run >= self.refresh_interval:
+            self.forced_runs += 1
+            return self._run(image)
+        if len(motion) == 0:
+            self.skipped += 1
+            return self.result
+        if self.regions:
+            regions = self._motion_regions(motion, image.shape)
+            covered = ((regions[:, 2] - regions[:, 0]) * (regions[:, 3] - regions[:, 1])).sum()
+            if covered <= self.max_region_fraction * image.shape[0] * image.shape[1]:
+                return self._run_regions(image, regions)
+        return self._run(image)
+
+    # Run the detector on the whole frame
+    def _run(self, image):
+        self.result = self.detect(image)
+        self.full_runs += 1
+        self.frames_since_run = 0
+        return self.result
+
+    # Padded, merged regions around the motion boxes. A previous box whose centre falls
+    # in a region is searched again there, so the region grows to hold all of it
+    def _motion_regions(self, motion, shape):
+        regions = self._padded(motion, shape)
+        previous = np.asarray(self.result, dtype=np.int32).reshape(-1, 4)
+        claimed = previous[centres_in(previous, regions)]
+        if len(claimed) == 0:
+            return regions
+        return self._padded(np.concatenate([as_boxes(motion), as_boxes(claimed)]), shape)
+
+    # Boxes padded into regions of at least min_region_size, merged where they overlap
+    def _padded(self, boxes, shape):
+        regions = pad_regions(boxes, shape, self.region_margin, self.min_region_margin)
+        return merge_regions(grow_regions(regions, self.min_region_size, shape))
+
+    # Run the detector on every region and keep the previous boxes that were not searched
+    # in full (those lying entirely inside a region are replaced by what it found now)
+    def _run_regions(self, image, regions):
+        found = []
+        for x0, y0, x1, y1 in regions:
+            # Only possible when the whole frame is smaller than min_region_size
+            if x1 - x0 < self.min_region_size[0] or y1 - y0 < self.min_region_size[1]:
+                continue
+            boxes = np.asarray(self.detect(image[y0:y1, x0:x1]), dtype=np.int32).reshape(-1, 4)
+            found.append(boxes + (x0, y0, 0, 0))
+            self.region_calls += 1
+        previous = np.asarray(self.result, dtype=np.int32).reshape(-1, 4)
+        found.append(previous[~boxes_within(previous, regions)])
+        # A kept box that reaches into a region can be found again there; the new box wins
+        self.result = remove_duplicates(np.concatenate(found))
+        self.region_runs += 1
+        return self.result
+
+    # Fraction of frames on which the detector did not run at all
+    def skip_rate(self):
+        return self.skipped / self.frames if self.frames else 0.0
+
+    def summary(self):
+        return (f"Motion gate: detector ran on the whole frame for {self.full_runs} of {self.frames} frames "
+                f"({self.forced_runs} forced refreshes), on motion regions for {self.region_runs} "
+                f"({self.region_calls} calls), skipped {self.skipped} ({self.skip_rate():.0%})")
+
+
+# Add the motion gate options to a lab's command line parser; regions=False leaves out
+# --gate-regions for detectors that do not return boxes
+def add_gate_args(parser, regions=True):
+    parser.add_argument('--motion-gate', action='store_true',
+                        help='Skip the detector on frames without motion and reuse its last result')
+    parser.add_argument('--gate-refresh', type=int, default=30,
+                        help='Run the detector at least every this many frames, motion or not')
+    parser.add_argument('--gate-downscale', type=float, default=0.25,
+                        help='Scale of the frame-difference motion check')
+    parser.add_argument('--gate-min-area', type=float, default=200,
+                        help='Smallest change that counts as motion, in pixels of a 640x480 frame')
+    if regions:
+        parser.add_argument('--gate-regions', action='store_true',
+                            help='With --motion-gate, run the detector only on the moving regions')
+    return parser
+
+
+# A MotionGate around detect with --motion-gate, otherwise None
+# min_region_size: smallest crop detect accepts in region mode (width, height)
+def motion_gate_from_args(detect, args, min_region_size=(0, 0)):
+    if not args.motion_gate:
+        return None
+    regions = getattr(args, 'gate_regions', False)
+    # Stateful detectors keep boxes in frame coordinates, which region crops would break
+    for option, flag in (('track', '--track'), ('roi_search', '--roi-search')):
+        if regions and getattr(args, option, False):
+            print(f"Error: --gate-regions cannot be combined with {flag} (it needs whole frames)")
+            raise SystemExit(1)
+    return MotionGate(detect, refresh_interval=args.gate_refresh, downscale=args.gate_downscale,
+                      min_area=args.gate_min_area, regions=regions, min_region_size=min_region_size)
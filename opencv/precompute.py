@@ -0,0 +1,51 @@
+# Background Precomputation
+# When a trackbar has only a few discrete settings (lab5 has 11 blur strengths), every
+# setting can be rendered ahead of time. BackgroundPrecomputer renders all keys on a
+# thread pool as soon as it is created. get() only looks up a finished result and never
+# waits, so the UI loop stays responsive and can poll progress() to show how far it got.
+# OpenCV releases the GIL while filtering, so the workers really run in parallel.
+
+import concurrent.futures
+import threading
+
+
+class BackgroundPrecomputer:
+    # keys are rendered in the given order, so put the most likely ones first
+    def __init__(self, keys, render, max_workers=None):
+        self.keys = list(keys)
+        self.render = render
+        self.results = {}
+        self.errors = {}
+        self.lock = threading.Lock()
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers,
+                                                              thread_name_prefix='precompute')
+        for key in self.keys:
+            self.executor.submit(self._render_key, key)
+
+    def _render_key(self, key):
+        try:
+            value = self.render(key)
+        except Exception as error:
+            with self.lock:
+                self.errors[key] = error
+            return
+        with self.lock:
+            self.results[key] = value
+
+    # Finished result for key, or None if it is not ready yet (never blocks)
+    def get(self, key):
+        with self.lock:
+            return self.results.get(key)
+
+    # (finished, total) counts; failed keys count as finished
+    def progress(self):
+        with self.lock:
+            return len(self.results) + len(self.errors), len(self.keys)
+
+    def done(self):
+        finished, total = self.progress()
+        return finished == total
+
+    # Stop rendering; keys that have not started yet are cancelled
+    def shutdown(self, wait=False):
+        self.executor.shutdown(wait=wait, cancel_futures=True)
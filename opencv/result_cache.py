@@ -0,0 +1,59 @@
+# Byte-Limited Result Cache
+# The static-image labs (lab4, lab5) show the same image again and again while the user
+# moves a trackbar back and forth. ResultCache memoizes processed images by their
+# parameters and evicts the least recently used entries when the total size of the
+# cached arrays would exceed max_bytes. Going back to a recent setting is then only a lookup.
+# Cached arrays are shared with the caller and must not be modified after put().
+
+import collections
+
+
+class ResultCache:
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    # Return the cached value for key (marking it recently used), or None
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    # Store value under key, evicting old entries until it fits; values larger than
+    # the whole budget are not cached
+    def put(self, key, value):
+        size = value.nbytes
+        if size > self.max_bytes:
+            return
+        if key in self.entries:
+            self.total_bytes -= self.entries.pop(key).nbytes
+        while self.entries and self.total_bytes + size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.total_bytes -= evicted.nbytes
+        self.entries[key] = value
+        self.total_bytes += size
+
+    # Return the cached value for key, computing and storing it on a miss
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        self.entries.clear()
+        self.total_bytes = 0
@@ -0,0 +1,143 @@
+# Tiled Parallel Cascade Detection
+# One detectMultiScale call on a 4K frame runs on a single core and takes far longer
+# than a frame interval. TiledCascade splits the grayscale frame into a grid of tiles
+# and runs the cascade on them in a thread pool (OpenCV releases the GIL while it
+# detects). CascadeClassifier must not be shared between threads, so every worker
+# thread gets its own classifier from the detector registry (detectors.local()).
+# Each tile is its grid cell grown by an overlap margin on every side. A tile searches
+# faces up to twice the margin wide, so every such face lies wholly inside the tile
+# whose cell holds its centre, and a tile only keeps faces centred in its own cell.
+# Larger faces are found by one extra job on a downscaled copy of the whole frame; that
+# job also honours a caller's minSize, and the tiles are skipped when minSize is larger
+# than any face they may search.
+# The results are merged with vectorized non-maximum suppression (boxes.py), scored
+# by the number of neighbouring detections behind each box.
+# TiledCascade.detectMultiScale() takes the same arguments as the cascade's, so it can
+# stand in for a CascadeClassifier in the face labs and in CascadeSearch.
+
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from boxes import non_max_suppression
+from detector_registry import detectors
+
+
+# Split a frame of the given shape into a (columns, rows) grid of cells, each grown by
+# an overlap margin (default: a quarter of the smaller cell side). Returns the tiles as
+# (x0, y0, x1, y1, cell x0, y0, x1, y1) and the margin
+def grid_tiles(shape, grid, overlap=None):
+    height, width = shape[:2]
+    columns, rows = grid
+    cell_w, cell_h = math.ceil(width / columns), math.ceil(height / rows)
+    margin = overlap if overlap is not None else min(cell_w, cell_h) // 4
+
+    tiles = []
+    for row in range(rows):
+        for column in range(columns):
+            cx0, cy0 = column * cell_w, row * cell_h
+            cx1, cy1 = min(width, cx0 + cell_w), min(height, cy0 + cell_h)
+            tiles.append((max(0, cx0 - margin), max(0, cy0 - margin),
+                          min(width, cx1 + margin), min(height, cy1 + margin), cx0, cy0, cx1, cy1))
+    return tiles, margin
+
+
+# Mask of the (frame coordinate) boxes whose centre lies in the tile's cell
+def in_cell(boxes, tile):
+    cx0, cy0, cx1, cy1 = tile[4:]
+    centers = boxes[:, :2] + boxes[:, 2:] // 2
+    return (centers[:, 0] >= cx0) & (centers[:, 0] < cx1) & (centers[:, 1] >= cy0) & (centers[:, 1] < cy1)
+
+
+class TiledCascade:
+    # detector: cascade name in the detector registry ('face', 'eye', ...)
+    # grid: (columns, rows) of tiles; workers: thread pool size (default: one per core)
+    # overlap: margin added around each cell in pixels (default: a quarter of the smaller cell side)
+    def __init__(self, detector='face', grid=(2, 2), workers=None, overlap=None, coarse_scale=0.5, nms_threshold=0.3):
+        self.detector = detector
+        self.grid = tuple(grid)
+        self.workers = workers or os.cpu_count() or 1
+        self.overlap = overlap
+        self.coarse_scale = coarse_scale
+        self.nms_threshold = nms_threshold
+
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='tile')
+
+    # The calling thread's own classifier, loaded on first use
+    def _classifier(self):
+        return detectors.local(self.detector)
+
+    # Tiles as (x0, y0, x1, y1, cell x0, y0, x1, y1) and the overlap margin used
+    def tiles(self, shape):
+        return grid_tiles(shape, self.grid, self.overlap)
+
+    # Same arguments and result as CascadeClassifier.detectMultiScale
+    def detectMultiScale(self, image, scaleFactor=1.1, minNeighbors=3, flags=0, minSize=(0, 0), maxSize=(0, 0)):
+        tiles, margin = self.tiles(image.shape)
+        largest_tiled = 2 * margin
+        tile_max = largest_tiled if not maxSize or not maxSize[0] else min(largest_tiled, maxSize[0])
+
+        minSize = tuple(minSize) if minSize else (0, 0)
+        coarse_min = (max(largest_tiled, minSize[0]), max(largest_tiled, minSize[1]))
+
+        jobs = []
+        if minSize[0] <= tile_max and minSize[1] <= tile_max:
+            jobs = [self.executor.submit(self._detect_tile, image, tile, scaleFactor, minNeighbors,
+                                         minSize, (tile_max, tile_max))
+                    for tile in tiles]
+        if not maxSize or not maxSize[0] or maxSize[0] > largest_tiled:
+            jobs.append(self.executor.submit(self._detect_coarse, image, scaleFactor, minNeighbors,
+                                             coarse_min, maxSize))
+        if not jobs:
+            return np.empty((0, 4), dtype=np.int32)
+
+        results = [job.result() for job in jobs]
+        boxes = np.concatenate([found for found, _ in results])
+        scores = np.concatenate([weights for _, weights in results])
+        return boxes[non_max_suppression(boxes, scores, self.nms_threshold)]
+
+    # Faces of one tile whose centre lies in the tile's cell, in frame coordinates
+    def _detect_tile(self, image, tile, scale_factor, min_neighbors, min_size, max_size):
+        x0, y0, x1, y1 = tile[:4]
+        found, weights = self._classifier().detectMultiScale2(image[y0:y1, x0:x1], scaleFactor=scale_factor,
+                                                              minNeighbors=min_neighbors, minSize=tuple(min_size),
+                                                              maxSize=max_size)
+        boxes = np.asarray(found, dtype=np.int32).reshape(-1, 4) + (x0, y0, 0, 0)
+        weights = np.asarray(weights, dtype=np.float64).reshape(-1)
+        own = in_cell(boxes, tile)
+        return boxes[own], weights[own]
+
+    # Faces too large for the tiles, found on a downscaled copy of the whole frame
+    # min_size: (width, height) in frame pixels, at least the largest face the tiles search
+    def _detect_coarse(self, image, scale_factor, min_neighbors, min_size, max_size):
+        scale = self.coarse_scale
+        small = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        scaled_min = tuple(max(1, int(size * scale)) for size in min_size)
+        scaled_max = tuple(round(size * scale) for size in max_size) if max_size and max_size[0] else (0, 0)
+        found, weights = self._classifier().detectMultiScale2(small, scaleFactor=scale_factor,
+                                                              minNeighbors=min_neighbors,
+                                                              minSize=scaled_min, maxSize=scaled_max)
+        boxes = np.rint(np.asarray(found, dtype=np.float64).reshape(-1, 4) / scale).astype(np.int32)
+        return boxes, np.asarray(weights, dtype=np.float64).reshape(-1)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+# Add the tiled detection options to a face lab's command line parser
+def add_tiling_args(parser):
+    parser.add_argument('--tiles', type=int, nargs=2, metavar=('COLUMNS', 'ROWS'),
+                        help='Split each frame into a grid of overlapping tiles for the face cascade (e.g. 2 2)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Threads running the tiles in parallel with --tiles (default: one per core)')
+    return parser
+
+
+# A TiledCascade for the named registry detector if --tiles was given, otherwise None
+def tiled_cascade_from_args(detector, args):
+    if not args.tiles:
+        return None
+    return TiledCascade(detector, grid=args.tiles, workers=args.workers)